@@ -1,7 +1,14 @@
+import numpy as np
 import pandas as pd
+from core.instrumentation import traced
 
 
 def clean_numeric_series(series: pd.Series):
+    # Already numeric (the parser did the work): the string round trip
+    # below would return the same values, so skip it
+    if series.dtype.kind in "iuf":
+        return series, series.notna().mean()
+
     cleaned = (
         series.astype(str)
         .str.strip()
@@ -16,6 +23,67 @@ def clean_numeric_series(series: pd.Series):
     return numeric, success_ratio
 
 
+def downcast_numeric(series: pd.Series):
+    values = series.dropna()
+
+    if len(values) == 0:
+        return series
+
+    # Whole numbers with no gaps → smallest integer type that holds them
+    if series.dtype.kind == "i" or (
+        series.dtype.kind == "f"
+        and len(values) == len(series)
+        and np.abs(values).max() < 2**53
+        and np.array_equal(values, np.round(values))
+    ):
+        return pd.to_numeric(series.astype("int64"), downcast="integer")
+
+    # Floats → float32 only when every value survives the round trip
+    if series.dtype == "float64":
+        as32 = series.astype("float32")
+        if np.array_equal(as32.astype("float64").to_numpy(), series.to_numpy(), equal_nan=True):
+            return as32
+
+    return series
+
+
+def compact_dataframe(df: pd.DataFrame, max_category_ratio=0.5):
+
+    bytes_before = int(df.memory_usage(deep=True).sum())
+
+    categorical = 0
+    downcast = 0
+
+    for col in df.columns:
+
+        series = df[col]
+
+        if series.dtype.kind in "if":
+            compact = downcast_numeric(series)
+            if compact.dtype != series.dtype:
+                df[col] = compact
+                downcast += 1
+
+        elif series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+            non_null = series.count()
+            if non_null and series.nunique() <= max_category_ratio * non_null:
+                try:
+                    df[col] = series.astype("category")
+                except TypeError:
+                    continue
+                categorical += 1
+
+    bytes_after = int(df.memory_usage(deep=True).sum())
+
+    return df, {
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "categorical_columns": categorical,
+        "downcast_columns": downcast
+    }
+
+
+@traced()
 def clean_dataset(df: pd.DataFrame):
 
     df_clean = df.copy()
@@ -23,6 +91,7 @@ def clean_dataset(df: pd.DataFrame):
     numeric_fixes = 0
     whitespace_fixed = 0
     missing_filled = 0
+    numeric_share = {}
 
     # -------------------------
     # Normalize column names
@@ -49,6 +118,11 @@ def clean_dataset(df: pd.DataFrame):
         # Try numeric correction
         numeric_series, success_ratio = clean_numeric_series(series)
 
+        # Share of the observed values that read as numbers; type inference
+        # picks this up from attrs instead of coercing the column again
+        observed = series.count()
+        numeric_share[col] = float(numeric_series.count() / observed) if observed else 0.0
+
         # If most values convert → treat as numeric cleanup
         if success_ratio > 0.8:
             before_na = series.isna().sum()
@@ -79,4 +153,20 @@ def clean_dataset(df: pd.DataFrame):
     if not issues:
         issues.append("No major data quality issues detected.")
 
+    # -------------------------
+    # Compact storage
+    # -------------------------
+
+    df_clean, compaction = compact_dataframe(df_clean)
+    df_clean.attrs["numeric_share"] = numeric_share
+
+    if compaction["categorical_columns"] or compaction["downcast_columns"]:
+        saved = compaction["bytes_before"] - compaction["bytes_after"]
+        issues.append(
+            f"Compacted storage from {compaction['bytes_before'] / 2**20:.1f} MB "
+            f"to {compaction['bytes_after'] / 2**20:.1f} MB ({saved / 2**20:.1f} MB saved) by encoding "
+            f"{compaction['categorical_columns']} low-cardinality column(s) as categories and "
+            f"downcasting {compaction['downcast_columns']} numeric column(s)."
+        )
+
     return df_clean, issues
\ No newline at end of file
@@ -1,76 +1,155 @@
+import re
 import pandas as pd
 import numpy as np
 from scipy import stats
 from core.schemas import DataProfile, VariableProfile
+from core.instrumentation import traced
+from core.jobs import report_progress
+from core.outliers import detect_outliers
+from core.type_inference import classify, infer_variable_types, ordinal_levels
 
 
 def detect_variable_type(series):
-    # Try numeric conversion first
-    s_num = pd.to_numeric(series, errors="coerce")
-    numeric_ratio = s_num.notna().mean()
+    var_type, _ = classify(series)
+    return var_type
 
-    # If not mostly numeric → categorical
-    if numeric_ratio < 0.9:
-        return "categorical"
 
-    clean = s_num.dropna()
 
-    unique_count = clean.nunique()
-    n = len(clean)
-    unique_ratio = unique_count / n
+ID_HINTS = ("id", "subject", "patient", "participant", "mrn", "record")
+TIME_HINTS = ("visit", "time", "timepoint", "week", "day", "month", "period", "phase", "session", "wave", "cycle")
 
-    # Very few unique numeric values → encoded category or ordinal
-    if unique_count <= 10:
-        return "categorical"
 
-    # Discrete but many repeats (Likert-like)
-    if unique_ratio < 0.05:
-        return "categorical"
+def name_tokens(col):
+    return set(re.split(r"[^a-z0-9]+", re.sub(r"([a-z])([A-Z])", r"\1_\2", str(col)).lower())) - {""}
 
-    return "continuous"
 
+MAX_VISITS = 20    # measurements per subject in a long-format export
+MIN_SUBJECTS = 5
 
 
-def profile_dataset(df: pd.DataFrame) -> DataProfile:
-    variables = {}
-    warnings = []
-
+def detect_study_design(df):
+    # Long-format repeated measures: an ID-like column whose values repeat a
+    # few times each, usually alongside a visit/time column with a handful of
+    # levels. A subject ID has about rows / visits distinct values; sex, arm
+    # or site columns repeat too but have far too few levels to qualify
     for col in df.columns:
-        s = df[col]
-        missing_pct = s.isna().mean() * 100
-        var_type = detect_variable_type(s)
+        if not name_tokens(col) & set(ID_HINTS):
+            continue
+        counts = df[col].value_counts(dropna=True)
+        if not len(counts) or not 2 <= counts.median() <= MAX_VISITS:
+            continue
+
+        time_variable = next((
+            c for c in df.columns
+            if c != col and name_tokens(c) & set(TIME_HINTS) and 2 <= df[c].nunique() <= MAX_VISITS
+        ), None)
+        visits = df[time_variable].nunique() if time_variable else counts.median()
+        if len(counts) >= max(MIN_SUBJECTS, 0.5 * counts.sum() / visits):
+            return "repeated measures", col, time_variable
+
+    return "observational", None, None
+
+
+# ---------------------------
+# Lazy profiling
+# ---------------------------
+# Wide exports (omics panels, lab dumps) have thousands of columns of which
+# a handful are analysed. Above LAZY_MIN_COLUMNS the normality/outlier
+# tests run only for the columns a user actually picks (complete_profile).
+
+LAZY_MIN_COLUMNS = 100
+
+
+def column_statistics(series, var_type):
+    details = {"levels": None, "normality_p": None, "normal": None}
+
+    if var_type == "continuous":
+        clean = pd.to_numeric(series, errors="coerce").dropna()
+        if len(clean) >= 3:
+            details["normality_p"] = stats.shapiro(clean)[1]
+            details["normal"] = bool(details["normality_p"] > 0.05)
+
+    if var_type == "categorical":
+        details["levels"] = [str(x) for x in series.dropna().unique().tolist()]
+
+    if var_type == "ordinal":
+        levels = series.dropna().unique().tolist()
+        if pd.api.types.is_numeric_dtype(series.dtype):
+            ordered = sorted(levels)
+        elif isinstance(series.dtype, pd.CategoricalDtype) and series.dtype.ordered:
+            present = set(levels)
+            ordered = [c for c in series.cat.categories if c in present]
+        else:
+            ordered = ordinal_levels(levels) or sorted(levels, key=str)
+        details["levels"] = [str(x) for x in ordered]
 
-        outliers_present = False
-        normality_p = None
-        normal = None
-        levels = None
+    return details
 
-        if var_type == "continuous":
-            clean = s.dropna()
-            if len(clean) >= 3:
-                normality_p = stats.shapiro(clean)[1]
-                normal = bool(normality_p > 0.05)
 
-            z = np.abs(stats.zscore(clean))
-            outliers_present = bool((z > 3).any())
+def flag_outliers(df, variables, columns):
+    # Robust (median/MAD) screen over all continuous columns in one pass
+    continuous = [c for c in columns if variables[c].type == "continuous"]
+    screen = detect_outliers(df, continuous)["columns"]
 
+    for col in columns:
+        count = screen[col]["count"] if col in screen else None
+        variables[col].outlier_count = count
+        variables[col].outliers_present = bool(count)
 
-        if var_type == "categorical":
-            levels = [str(x) for x in s.dropna().unique().tolist()]
+
+def complete_profile(df, profile, columns):
+    # Fill in the deferred statistics for the given columns, in place
+    pending = [c for c in dict.fromkeys(columns) if c in profile.variables and not profile.variables[c].profiled]
+
+    for col in pending:
+        var = profile.variables[col]
+        for field, value in column_statistics(df[col], var.type).items():
+            setattr(var, field, value)
+        var.profiled = True
+
+    flag_outliers(df, profile.variables, pending)
+    return profile
+
+
+@traced()
+def profile_dataset(df: pd.DataFrame, lazy=None) -> DataProfile:
+    variables = {}
+    warnings = []
+
+    if lazy is None:
+        lazy = df.shape[1] >= LAZY_MIN_COLUMNS
+    types = infer_variable_types(df)
+    missing_pct = df.isna().mean() * 100
+
+    for i, col in enumerate(df.columns):
+        var_type = types[col]
+        details = {} if lazy else column_statistics(df[col], var_type)
+        if not lazy:
+            report_progress(i / len(df.columns), f"Profiling variable {i + 1} of {len(df.columns)}")
 
         variables[col] = VariableProfile(
             type=var_type,
-            levels=levels,
-            normality_p=normality_p,
-            normal=normal,
-            missing_pct=missing_pct,
-            outliers_present=outliers_present
+            missing_pct=float(missing_pct[col]),
+            profiled=not lazy,
+            **details
+        )
+
+    if not lazy:
+        flag_outliers(df, variables, list(variables))
+
+    study_design, subject_id, time_variable = detect_study_design(df)
+    if subject_id:
+        warnings.append(
+            f"'{subject_id}' repeats across rows; observations are likely repeated measures "
+            f"on the same subjects{f' over {time_variable!r}' if time_variable else ''}."
         )
 
     return DataProfile(
         variables=variables,
         sample_size=len(df),
         group_sizes=None,
-        study_design="observational",
+        study_design=study_design,
+        subject_id=subject_id,
+        time_variable=time_variable,
         warnings=warnings
     )
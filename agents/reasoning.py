@@ -3,6 +3,7 @@ import json
 from openai import OpenAI, RateLimitError, APIError, APITimeoutError
 from dotenv import load_dotenv
 import logging
+from core.instrumentation import traced
 load_dotenv()
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
@@ -28,6 +29,27 @@ RULES:
         Normal → Pearson correlation
         Not normal → Spearman correlation
 
+4. Covariates supplied (adjusted analysis):
+        Continuous outcome → Linear regression
+        Binary outcome → Logistic regression
+   The independent variable is the exposure; report its adjusted effect.
+
+5. Repeated measures (design.subject_id supplied; the independent variable
+   is the time point or condition measured on every subject):
+   - If 2 time points:
+        Normal → Paired t-test
+        Not normal → Wilcoxon signed-rank test
+   - If >2 time points:
+        Normal → Repeated measures ANOVA
+        Not normal → Friedman test
+   Never use independent-groups tests for repeated measures.
+
+6. Time-to-event outcome (design.event supplied; the dependent variable is
+   the follow-up time, the event column marks events vs censoring):
+        No covariates → Log-rank test (with Kaplan-Meier curves)
+        Covariates → Cox proportional hazards
+   Report hazard ratios, never means, for time-to-event outcomes.
+
 Always include:
 - test name
 - assumptions
@@ -51,6 +73,7 @@ Return format:
 """
 
 
+@traced()
 def select_statistical_test(payload):
     try:
         response = client.chat.completions.create(
@@ -2,6 +2,7 @@ import json
 from openai import OpenAI
 import os
 from dotenv import load_dotenv
+from core.instrumentation import traced
 
 load_dotenv()
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
@@ -28,6 +29,7 @@ Return JSON only:
 """
 
 
+@traced()
 def generate_results_text(test_plan, results):
     payload = {
         "test": test_plan["selected_test"],
@@ -1,22 +1,33 @@
 import os
 import json
+import logging
+from collections import Counter
 from openai import OpenAI
 from dotenv import load_dotenv
+from core.instrumentation import traced
+from core.literature import get_library
 
 load_dotenv()
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+logger = logging.getLogger(__name__)
+
+MAX_HITS = 6
+# Set MEDSTATS_LITERATURE_SUMMARY=0 to skip the language model entirely
+SUMMARIZE = os.getenv("MEDSTATS_LITERATURE_SUMMARY", "1") != "0"
+SUMMARY_TIMEOUT = 30
 
 SYSTEM_PROMPT = """
 You are an academic research assistant.
 
-Given a research objective and statistical context, suggest relevant prior studies.
+You are given a research objective, its statistical context and a numbered
+list of references retrieved from the user's local literature library.
 
 Rules:
-- Prefer well-known or highly cited research
-- Use realistic academic citation format (authors, year, journal)
-- Summarize key findings briefly
+- Use ONLY the references provided; never add, rename or invent sources
+- Refer to each reference by its "ref" number
+- Leave out references that are not relevant to the objective
+- Base each finding only on the title and abstract given
 - Relate each paper to the user's statistical comparison
-- Do NOT fabricate obscure sources
 
 Return JSON only:
 
@@ -24,7 +35,7 @@ Return JSON only:
   "research_theme": "...",
   "key_papers": [
     {
-      "citation": "...",
+      "ref": 1,
       "main_finding": "...",
       "relation_to_current_study": "..."
     }
@@ -34,17 +45,57 @@ Return JSON only:
 }
 """
 
-def get_research_context(objective, test_plan):
+
+def retrieval_query(objective, test_plan):
+    return " ".join([
+        objective,
+        test_plan["selected_test"],
+        str(test_plan.get("dependent_variable") or ""),
+        str(test_plan.get("independent_variable") or "")
+    ])
+
+
+def first_sentence(text):
+    if not text:
+        return None
+    return text.split(". ")[0].rstrip(".") + "."
+
+
+def extractive_context(objective, hits):
+    # Offline answer built from the library records alone
+    keywords = Counter(k for h in hits for k in h.get("keywords") or [])
+    return {
+        "research_theme": f"{len(hits)} reference(s) in the local library match: {objective}",
+        "key_papers": [
+            {
+                "citation": h["citation"],
+                "main_finding": first_sentence(h.get("abstract")) or "No abstract in the library record.",
+                "relation_to_current_study": "Matched on: " + ", ".join(h["matched_terms"]),
+                "source": h["source"]
+            }
+            for h in hits
+        ],
+        "common_methods_used": [k for k, _ in keywords.most_common(6)],
+        "typical_results_in_literature": "Abstracts are shown as stored in the library; no summary was generated.",
+        "summarized": False
+    }
+
+
+def summarize_hits(objective, test_plan, hits):
     payload = {
         "objective": objective,
         "test_used": test_plan["selected_test"],
         "variables": {
             "dependent": test_plan["dependent_variable"],
             "independent": test_plan["independent_variable"]
-        }
+        },
+        "references": [
+            {"ref": i, "citation": h["citation"], "abstract": h.get("abstract"), "keywords": h.get("keywords")}
+            for i, h in enumerate(hits, start=1)
+        ]
     }
 
-    response = client.chat.completions.create(
+    response = client.with_options(timeout=SUMMARY_TIMEOUT, max_retries=0).chat.completions.create(
         model="gpt-4o-mini",
         messages=[
             {"role": "system", "content": SYSTEM_PROMPT},
@@ -55,5 +106,48 @@ def get_research_context(objective, test_plan):
 
     content = response.choices[0].message.content.strip()
     content = content[content.find("{"):]
+    summary = json.loads(content)
+
+    # Citations are taken from the library by ref number, never from the model's text
+    papers = []
+    for paper in summary.get("key_papers", []):
+        ref = paper.get("ref")
+        if isinstance(ref, int) and 1 <= ref <= len(hits):
+            hit = hits[ref - 1]
+            papers.append({
+                "citation": hit["citation"],
+                "main_finding": paper.get("main_finding", ""),
+                "relation_to_current_study": paper.get("relation_to_current_study", ""),
+                "source": hit["source"]
+            })
+
+    return {
+        "research_theme": summary.get("research_theme", ""),
+        "key_papers": papers,
+        "common_methods_used": summary.get("common_methods_used", []),
+        "typical_results_in_literature": summary.get("typical_results_in_literature", ""),
+        "summarized": True
+    }
+
+
+@traced()
+def get_research_context(objective, test_plan, summarize=SUMMARIZE):
+    # Retrieval is local (BM25 over the literature library); the language
+    # model, when used, only summarizes the retrieved references
+    hits = get_library().search(retrieval_query(objective, test_plan), limit=MAX_HITS)
+    if not hits:
+        return {
+            "research_theme": "No references in the local library match this objective. Import a BibTeX or RIS library to search your own literature.",
+            "key_papers": [],
+            "common_methods_used": [],
+            "typical_results_in_literature": "",
+            "summarized": False
+        }
+
+    if summarize:
+        try:
+            return summarize_hits(objective, test_plan, hits)
+        except Exception:
+            logger.warning("Literature summary unavailable; showing retrieved references", exc_info=True)
 
-    return json.loads(content)
\ No newline at end of file
+    return extractive_context(objective, hits)
@@ -0,0 +1,442 @@
+import os
+import json
+import math
+import asyncio
+import logging
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+
+import pyarrow.feather as feather
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from agents.data_cleaning import clean_dataset
+from agents.data_profiling import profile_dataset
+from core.stats_engine import execute_test
+from core.datastore import get_store, content_key
+from core.result_cache import get_result_cache, dataset_fingerprint, result_key
+from core.history import get_history
+from utils.loaders import detect_format, load_dataset
+
+# ---------------------------
+# Service configuration
+# ---------------------------
+
+MAX_WORKERS = int(os.getenv("MEDSTATS_API_WORKERS", os.cpu_count() or 2))
+MAX_QUEUE = int(os.getenv("MEDSTATS_API_MAX_QUEUE", 32))
+CACHE_DIR = os.getenv(
+    "MEDSTATS_API_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "medstats_datasets")
+)
+CACHE_MAX_BYTES = int(float(os.getenv("MEDSTATS_API_CACHE_MAX_MB", 2048)) * 2 ** 20)
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================================
+# WORKER-SIDE JOBS (run inside the process pool)
+# ==========================================================
+
+def dataset_path(dataset_id):
+    return os.path.join(CACHE_DIR, f"{dataset_id}.arrow")
+
+
+def meta_path(path):
+    # Row count, columns, audit log and data hash, stored beside the frame
+    # so a restarted server still knows every dataset on disk
+    return f"{os.path.splitext(path)[0]}.json"
+
+
+def load_cached_frame(path):
+    # Each worker keeps its most recent frames resident up to the store's
+    # memory ceiling; the Arrow file is memory-mapped so a cold load does
+    # not re-parse the upload.
+    return get_store().frame_or_load(
+        path, lambda: feather.read_table(path, memory_map=True).to_pandas()
+    )
+
+
+def ingest_job(data, fmt, path, options):
+    df = load_dataset(data, fmt, **options)
+    df_clean, audit_log = clean_dataset(df)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    df_clean.reset_index(drop=True).to_feather(tmp_path)
+    os.replace(tmp_path, path)
+
+    meta = {
+        "n_rows": int(len(df_clean)),
+        "columns": df_clean.columns.tolist(),
+        "audit_log": audit_log,
+        "data_hash": dataset_fingerprint(df_clean)
+    }
+
+    # Written after the frame, so a dataset with metadata is always complete
+    tmp_meta = f"{meta_path(path)}.{os.getpid()}.tmp"
+    with open(tmp_meta, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_meta, meta_path(path))
+
+    return meta
+
+
+def profile_job(path):
+    df_clean = load_cached_frame(path)
+    return profile_dataset(df_clean).model_dump()
+
+
+def execute_job(path, test_plan, data_hash):
+    # Results persist across restarts and are shared with the Streamlit app
+    cache = get_result_cache()
+    key = result_key(data_hash, test_plan)
+    cached = cache.get(key)
+    if cached:
+        return {**cached["results"], "cached": True}
+
+    results = execute_test(load_cached_frame(path), test_plan)
+    cache.put(key, results)
+    return {**results, "cached": False}
+
+
+# ==========================================================
+# DATASET CACHE LIMIT
+# ==========================================================
+# Uploads are kept on disk so repeat requests skip parsing, but not without
+# bound: over the size limit the least recently used datasets go first,
+# down to 90% so the next upload does not evict again (as the result cache
+# does). known_dataset refreshes the metadata file's mtime on every use.
+
+def touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def prune_cache_dir(datasets, keep=None, max_bytes=None):
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+
+    # dataset id → [bytes, last use, files]; temp files group with their dataset
+    groups = {}
+    with os.scandir(CACHE_DIR) as entries:
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            group = groups.setdefault(entry.name.split(".", 1)[0], [0, 0.0, []])
+            group[0] += stat.st_size
+            group[1] = max(group[1], stat.st_mtime)
+            group[2].append(entry.path)
+
+    total = sum(size for size, _, _ in groups.values())
+    if total <= max_bytes:
+        return []
+
+    removed = []
+    for dataset_id, (size, _, paths) in sorted(groups.items(), key=lambda item: item[1][1]):
+        if total <= 0.9 * max_bytes:
+            break
+        if dataset_id == keep:
+            continue
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        datasets.pop(dataset_id, None)
+        total -= size
+        removed.append(dataset_id)
+    return removed
+
+
+# ==========================================================
+# REQUEST QUEUE WITH BACKPRESSURE
+# ==========================================================
+
+class QueueFull(Exception):
+    pass
+
+
+class JobQueue:
+
+    def __init__(self, max_workers, max_queue):
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+        self.slots = asyncio.Semaphore(max_workers)
+        self.max_pending = max_workers + max_queue
+        self.pending = 0
+
+    async def run(self, fn, *args):
+
+        # Reject instead of queueing without bound; clients retry later
+        if self.pending >= self.max_pending:
+            raise QueueFull()
+
+        self.pending += 1
+        try:
+            async with self.slots:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    def stats(self):
+        return {
+            "pending": self.pending,
+            "max_pending": self.max_pending
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# ---------------------------
+# Helpers
+# ---------------------------
+
+def json_safe(obj):
+    # NaN / inf (e.g. SD of a single-observation group) are not valid JSON
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return None
+    if isinstance(obj, dict):
+        return {k: json_safe(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [json_safe(v) for v in obj]
+    return obj
+
+
+def error(message, status_code):
+    return JSONResponse({"error": message}, status_code=status_code)
+
+
+async def read_upload(request):
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise ValueError("Multipart uploads must include a 'file' field.")
+        data = await upload.read()
+        fmt = detect_format(upload.filename, upload.content_type)
+    else:
+        data = await request.body()
+        fmt = request.query_params.get("format") or detect_format(content_type=content_type)
+
+    if not data:
+        raise ValueError("Empty upload.")
+
+    return data, fmt
+
+
+def load_options(request):
+    # ?sheet=Visits&header_row=2&columns=id,sbp,arm
+    params = request.query_params
+    options = {}
+    if params.get("sheet"):
+        options["sheet"] = params["sheet"]
+    if params.get("header_row"):
+        options["header_row"] = int(params["header_row"])
+    if params.get("columns"):
+        options["columns"] = [c.strip() for c in params["columns"].split(",") if c.strip()]
+    return options
+
+
+def busy():
+    return JSONResponse(
+        {"error": "Server busy. Please retry shortly."},
+        status_code=503,
+        headers={"Retry-After": "5"}
+    )
+
+
+async def run_job(request, fn, *args, on_result=None):
+    try:
+        result = await request.app.state.jobs.run(fn, *args)
+    except QueueFull:
+        return busy()
+    except BrokenProcessPool:
+        raise
+    except (KeyError, ValueError) as e:
+        return error(str(e), 422)
+    except Exception as e:
+        # Numerical failures in the engine (singular matrices, degenerate
+        # groups, ...) are about the request's data, not the server
+        logger.warning("Job %s failed", fn.__name__, exc_info=True)
+        return error(f"{type(e).__name__}: {e}", 422)
+
+    if on_result is not None:
+        result = on_result(result)
+    return JSONResponse(json_safe(result))
+
+
+def known_dataset(request, dataset_id=None):
+    # Metadata for a dataset on disk, or None; the in-memory map is only a
+    # cache, refilled from the stored JSON after a restart
+    dataset_id = dataset_id or request.path_params["dataset_id"]
+    path = dataset_path(dataset_id)
+    if not os.path.exists(path):
+        return None
+
+    datasets = request.app.state.datasets
+    if dataset_id not in datasets:
+        try:
+            with open(meta_path(path)) as f:
+                datasets[dataset_id] = json.load(f)
+        except (OSError, ValueError):
+            return None
+    touch(meta_path(path))
+    return datasets[dataset_id]
+
+
+# ==========================================================
+# ENDPOINTS
+# ==========================================================
+
+async def health(request):
+    return JSONResponse({"status": "ok", **request.app.state.jobs.stats()})
+
+
+async def upload_dataset(request):
+    try:
+        data, fmt = await read_upload(request)
+        options = load_options(request)
+    except ValueError as e:
+        return error(str(e), 400)
+
+    dataset_id = content_key(data, *options.items())
+    path = dataset_path(dataset_id)
+
+    # Identical uploads resolve to the same handle and skip re-parsing
+    meta = known_dataset(request, dataset_id)
+    if meta is not None:
+        return JSONResponse({"dataset_id": dataset_id, "cached": True, **meta})
+
+    try:
+        meta = await request.app.state.jobs.run(ingest_job, data, fmt, path, options)
+    except QueueFull:
+        return busy()
+    except BrokenProcessPool:
+        raise
+    except Exception as e:
+        return error(f"Could not parse upload: {e}", 422)
+
+    request.app.state.datasets[dataset_id] = meta
+    await run_in_threadpool(prune_cache_dir, request.app.state.datasets, dataset_id)
+    return JSONResponse({"dataset_id": dataset_id, "cached": False, **meta})
+
+
+async def get_dataset(request):
+    dataset_id = request.path_params["dataset_id"]
+    meta = known_dataset(request)
+    if meta is None:
+        return error(f"Unknown dataset: {dataset_id}", 404)
+    return JSONResponse({"dataset_id": dataset_id, **meta})
+
+
+async def profile(request):
+    if known_dataset(request) is None:
+        return error(f"Unknown dataset: {request.path_params['dataset_id']}", 404)
+
+    return await run_job(request, profile_job, dataset_path(request.path_params["dataset_id"]))
+
+
+async def run_test(request):
+    meta = known_dataset(request)
+    if meta is None:
+        return error(f"Unknown dataset: {request.path_params['dataset_id']}", 404)
+    path = dataset_path(request.path_params["dataset_id"])
+
+    try:
+        test_plan = await request.json()
+    except ValueError:
+        return error("Request body must be a JSON test plan.", 400)
+
+    missing = [
+        k for k in ["dependent_variable", "independent_variable", "selected_test"]
+        if k not in test_plan
+    ]
+    if missing:
+        return error(f"Test plan is missing: {', '.join(missing)}", 422)
+
+    data_hash = meta["data_hash"]
+
+    def record(results):
+        # History is written by this process's background writer, not the worker
+        run_id = get_history().record(
+            data_hash,
+            test_plan,
+            results,
+            user=request.headers.get("x-user", "api"),
+            dataset_name=request.path_params["dataset_id"],
+            audit_log=meta["audit_log"],
+            cached=results["cached"]
+        )
+        return {**results, "run_id": run_id}
+
+    return await run_job(request, execute_job, path, test_plan, data_hash, on_result=record)
+
+
+async def list_runs(request):
+    params = request.query_params
+    try:
+        since = float(params["since"]) if "since" in params else None
+        until = float(params["until"]) if "until" in params else None
+        limit = int(params.get("limit", 500))
+    except ValueError:
+        return error("since and until must be Unix timestamps and limit an integer.", 400)
+
+    history = get_history()
+    # flush() blocks on the writer thread, so it waits off the event loop
+    await run_in_threadpool(history.flush, timeout=1)
+    runs = history.runs(
+        dataset=params.get("dataset"),
+        test=params.get("test"),
+        variable=params.get("variable"),
+        user=params.get("user"),
+        since=since,
+        until=until,
+        limit=limit
+    )
+    return JSONResponse(json_safe(runs))
+
+
+async def get_run(request):
+    history = get_history()
+    await run_in_threadpool(history.flush, timeout=1)
+    run = history.run(request.path_params["run_id"])
+    if run is None:
+        return error(f"Unknown run: {request.path_params['run_id']}", 404)
+    return JSONResponse(json_safe(run))
+
+
+# ---------------------------
+# App
+# ---------------------------
+
+@asynccontextmanager
+async def lifespan(app):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    app.state.jobs = JobQueue(MAX_WORKERS, MAX_QUEUE)
+    app.state.datasets = {}
+    prune_cache_dir(app.state.datasets)
+    yield
+    app.state.jobs.shutdown()
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health, methods=["GET"]),
+        Route("/datasets", upload_dataset, methods=["POST"]),
+        Route("/datasets/{dataset_id}", get_dataset, methods=["GET"]),
+        Route("/datasets/{dataset_id}/profile", profile, methods=["POST"]),
+        Route("/datasets/{dataset_id}/tests", run_test, methods=["POST"]),
+        Route("/runs", list_runs, methods=["GET"]),
+        Route("/runs/{run_id}", get_run, methods=["GET"]),
+    ],
+    lifespan=lifespan
+)
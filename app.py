@@ -1,26 +1,103 @@
 import streamlit as st
 import pandas as pd
-from agents.data_profiling import profile_dataset
+from agents.data_profiling import profile_dataset, complete_profile
 from agents.data_cleaning import clean_dataset
 from copy import deepcopy
-from scipy import stats
 import numpy as np
-from core.stats_engine import execute_test
+from core.stats_engine import execute_test, ENGINE_VERSION
 from agents.reporting import generate_results_text
-from core.visuals import boxplot_by_group, distribution_plot
-from core.apa_tables import format_group_table, format_test_table
+from core.visuals import boxplot_by_group, distribution_plot, km_plot
+from core.apa_tables import format_group_table, format_test_table, format_regression_table, format_strata_table, format_survival_table
+from core.survival import km_by_group
 from agents.citations import get_citations
 from core.report_export import generate_word, generate_pdf
 from agents.research_context import get_research_context
+from core.instrumentation import start_trace, span
+from core.incremental import StudyState, plan_key
+from core.datastore import get_store, content_key
+from core.outliers import detect_outliers, mahalanobis_outliers
+from utils.loaders import excel_sheets, excel_columns, read_excel
+from core.result_cache import get_result_cache, dataset_fingerprint, result_key
+from core.history import get_history
+from core.visuals import trace_waterfall, power_curve_plot, volcano_plot
+from core.screening import screen_outcomes, FDR_METHODS
+from core.power import power_grid, required_sample_size
+from core.jobs import get_jobs, QUEUED, ERROR
+from core.literature import get_library
+import io
+import json
+import os
+import time
+import uuid
+import matplotlib.pyplot as plt
 
 # ---------------------------
 # Streamlit state init
 # ---------------------------
 
-for key in ["test_plan", "confirmed_schema", "results", "report_text", "df_clean"]:
+for key in ["test_plan", "confirmed_schema", "results", "report_text", "dataset"]:
     if key not in st.session_state:
         st.session_state[key] = None
 
+if "traces" not in st.session_state:
+    st.session_state.traces = []
+
+if "jobs" not in st.session_state:
+    # stage → {"id": job id, ...context needed when the job finishes}
+    st.session_state.jobs = {}
+    st.session_state.session_id = uuid.uuid4().hex
+
+# One trace per script run; spans from agents/core functions land here
+run_trace = start_trace(label=f"run {len(st.session_state.traces) + 1}")
+
+# ---------------------------
+# Background jobs
+# ---------------------------
+# Heavy stages run on the server's job pool; the script only submits them
+# and polls, so the page stays usable while they run.
+
+def submit_job(stage, key, fn, *args, label=None, **context):
+    # Stages submitted on every rerun (profile) keep the job they already
+    # track for this key until finished_job collects it; finished jobs are
+    # not deduplicated, so anything else would start the work again
+    entry = st.session_state.jobs.get(stage)
+    if entry is not None and entry["key"] == key:
+        return get_jobs().get(entry["id"])
+    job = get_jobs().submit(key, fn, *args, label=label, session=st.session_state.session_id)
+    st.session_state.jobs[stage] = {"id": job.id, "key": key, **context}
+    return job
+
+
+@st.fragment(run_every=1)
+def job_progress(job_id):
+    job = get_jobs().get(job_id)
+    if job is None or not job.active:
+        st.rerun(scope="app")
+    text = job.message or ("Queued..." if job.state == QUEUED else f"{job.label}...")
+    st.progress(job.progress, text=f"{text} ({job.elapsed():.0f} s)")
+
+
+def finished_job(stage):
+    # The stage's job once it has finished (and forgets it), else None; shows
+    # a progress bar while it is still queued or running
+    entry = st.session_state.jobs.get(stage)
+    job = get_jobs().get(entry["id"]) if entry else None
+    if job is None:
+        st.session_state.jobs.pop(stage, None)
+        return None, None
+    if job.active:
+        job_progress(job.id)
+        return None, None
+
+    st.session_state.jobs.pop(stage)
+    if job.trace is not None and job.trace.spans and not any(t is job.trace for t in st.session_state.traces):
+        st.session_state.traces = (st.session_state.traces + [job.trace])[-20:]
+    if job.state == ERROR:
+        st.error(f"❌ {job.label} failed: {job.error}")
+        return None, None
+    return job, entry
+
+
 # ---------------------------
 # Page config
 # ---------------------------
@@ -170,7 +247,7 @@ st.markdown("""
 # Tabs
 # ---------------------------
 
-tab1, tab2 = st.tabs(["🔬 Statistical Analysis", "📚 Research Context"])
+tab1, tab2, tab3, tab4 = st.tabs(["🔬 Statistical Analysis", "📚 Research Context", "📐 Power & Sample Size", "🗂️ Analysis History"])
 
 # ==========================================================
 # TAB 1 — STATISTICAL ANALYSIS
@@ -191,9 +268,73 @@ with tab1:
         help="Upload your clinical research dataset (CSV or Excel format)"
     )
 
+    data_profile = None
     if uploaded_file:
-        df = pd.read_csv(uploaded_file) if uploaded_file.name.endswith(".csv") else pd.read_excel(uploaded_file)
-        df.columns = df.columns.astype(str).str.strip().str.replace("\u00a0", " ")
+        upload_format = uploaded_file.name.rsplit(".", 1)[-1].lower()
+        load_options = {}
+
+        # Workbooks: the first sheet loads straight away; another sheet,
+        # header row or column subset is applied on "Load Sheet"
+        if upload_format == "xlsx":
+            data = uploaded_file.getvalue()
+            # Sheet names and header rows are read once per upload, not on every rerun
+            scan = st.session_state.get("excel_scan")
+            if scan is None or scan["file_id"] != uploaded_file.file_id:
+                scan = {"file_id": uploaded_file.file_id, "sheets": excel_sheets(data), "columns": {}}
+                st.session_state.excel_scan = scan
+            sheets = scan["sheets"]
+            if st.session_state.get("excel_options", {}).get("file_id") != uploaded_file.file_id:
+                st.session_state.excel_options = {"file_id": uploaded_file.file_id, "sheet": sheets[0], "header_row": 0, "columns": None}
+
+            col1, col2 = st.columns(2)
+            with col1:
+                sheet = st.selectbox("📑 Sheet", sheets, index=sheets.index(st.session_state.excel_options["sheet"]))
+            with col2:
+                header_row = st.number_input(
+                    "Header Row", min_value=1, value=st.session_state.excel_options["header_row"] + 1,
+                    help="Spreadsheet row holding the column names; rows above it are skipped"
+                ) - 1
+            if (sheet, header_row) not in scan["columns"]:
+                scan["columns"][(sheet, header_row)] = excel_columns(data, sheet, header_row)
+            selected_columns = st.multiselect(
+                "Columns to Load",
+                scan["columns"][(sheet, header_row)],
+                help="Leave empty to load every column"
+            )
+            if st.button("📥 Load Sheet"):
+                st.session_state.excel_options.update(sheet=sheet, header_row=header_row, columns=selected_columns or None)
+
+            load_options = {k: v for k, v in st.session_state.excel_options.items() if k != "file_id"}
+
+        # Shared store: an extract opened in several sessions is parsed,
+        # cleaned and profiled once and held in memory once
+        dataset_key = content_key(uploaded_file.getvalue(), upload_format, *load_options.values())
+        handle = st.session_state.dataset
+        if handle is None or handle.key != dataset_key:
+            handle = get_store().acquire(dataset_key)
+            if handle is None:
+                with span("parse_upload"):
+                    if upload_format == "xlsx":
+                        preview_slot, status_slot = st.empty(), st.empty()
+
+                        def show_progress(chunks):
+                            if len(chunks) == 1:
+                                preview_slot.dataframe(chunks[0].head(), width="stretch")
+                            status_slot.caption(f"⏳ Loading sheet… {sum(len(c) for c in chunks):,} rows read")
+
+                        df = read_excel(data, on_chunk=show_progress, **load_options)
+                        preview_slot.empty()
+                        status_slot.empty()
+                    else:
+                        df = pd.read_csv(uploaded_file)
+                df.columns = df.columns.astype(str).str.strip().str.replace("\u00a0", " ")
+                df_clean, audit_log = clean_dataset(df)
+                handle = get_store().put(dataset_key, df_clean, preview=df.head(), audit_log=audit_log)
+            st.session_state.dataset = handle
+            st.session_state.type_overrides = {}
+
+        df_clean = handle.frame()
+        audit_log = list(handle.meta["audit_log"])
 
         st.markdown("""
         <div class="medical-banner">
@@ -201,15 +342,12 @@ with tab1:
             <p style="margin: 5px 0 0 0; color: #616161;">First 5 rows of your uploaded dataset</p>
         </div>
         """, unsafe_allow_html=True)
-        st.dataframe(df.head(), width="stretch")
+        st.dataframe(handle.meta["preview"], width="stretch")
 
         # ---------------------------
         # Cleaning
         # ---------------------------
 
-        df_clean, audit_log = clean_dataset(df)
-        st.session_state.df_clean = df_clean
-
         st.markdown("""
         <div class="medical-banner">
             <h4 style="margin: 0; color: #1565c0;">⚕️ Data Quality Assessment</h4>
@@ -229,7 +367,71 @@ with tab1:
             <p style="margin: 5px 0 0 0; color: #616161;">AI-powered analysis of variable characteristics and distributions</p>
         </div>
         """, unsafe_allow_html=True)
-        data_profile = profile_dataset(df_clean)
+        if "profile" not in handle.meta:
+            # Keyed by dataset, so sessions opening the same extract share one job
+            submit_job("profile", ("profile", dataset_key), profile_dataset, df_clean, label="🔬 Profiling variables")
+            job, _ = finished_job("profile")
+            if job:
+                handle.meta["profile"] = job.result
+        data_profile = handle.meta.get("profile")
+
+    # Everything below needs the profile; while it runs the progress fragment
+    # reruns the page once the job is done
+    if data_profile is not None:
+
+        # ---------------------------
+        # Append mode
+        # ---------------------------
+
+        append_files = st.file_uploader(
+            "➕ Append new rows to this study",
+            type=["csv", "xlsx"],
+            accept_multiple_files=True,
+            help="Upload new registry exports; only the new rows are cleaned and folded into the existing results"
+        )
+
+        if append_files:
+
+            if st.session_state.get("study_key") != uploaded_file.file_id:
+                st.session_state.study = StudyState(df_clean, data_profile)
+                st.session_state.study_key = uploaded_file.file_id
+                st.session_state.study_profile = data_profile
+                st.session_state.appended_files = []
+                st.session_state.append_audit = []
+                if st.session_state.results and st.session_state.test_plan:
+                    st.session_state.study.track(st.session_state.test_plan)
+
+            study = st.session_state.study
+
+            for f in append_files:
+                if f.file_id in st.session_state.appended_files:
+                    continue
+
+                with span("parse_append"):
+                    new_rows = pd.read_csv(f) if f.name.endswith(".csv") else read_excel(f.getvalue(), **load_options)
+
+                update = study.append(new_rows)
+                st.session_state.study_profile = update["profile"]
+                st.session_state.appended_files.append(f.file_id)
+                st.session_state.append_audit.extend(update["audit_log"])
+                # A test still running on the previous rows would overwrite the tracked results
+                st.session_state.jobs.pop("execute", None)
+
+                tp = st.session_state.test_plan
+                if st.session_state.results and tp:
+                    st.session_state.results = update["results"].get(plan_key(tp)) or study.track(tp)
+                    st.session_state.result_key = None
+                    st.session_state.result_cached = False
+                    st.session_state.figures = {}
+                    st.session_state.run = None
+                st.session_state.report_text = None
+
+            # The table is rebuilt once per append; the profile only changes on one
+            df_clean = study.frame
+            data_profile = st.session_state.study_profile
+            audit_log = audit_log + st.session_state.append_audit
+
+            st.info(" ".join(st.session_state.append_audit))
 
         # ---------------------------
         # Confirm datatypes
@@ -244,10 +446,30 @@ with tab1:
 
         type_options = ["continuous", "categorical", "ordinal", "datetime"]
 
-        confirm_df = pd.DataFrame([
-            {"Feature": v, "Suggested Type": d.type, "Confirmed Type": d.type}
-            for v, d in data_profile.variables.items()
-        ])
+        # Edits live in type_overrides so they survive searching/filtering
+        # the editor down to the few columns of interest
+        overrides = st.session_state.setdefault("type_overrides", {})
+
+        col1, col2 = st.columns([3, 2])
+        with col1:
+            search = st.text_input("🔎 Search Variables", placeholder="Part of a column name")
+        with col2:
+            type_filter = st.multiselect("Suggested Type", type_options, help="Show only variables with these suggested types")
+
+        shown = [
+            v for v, d in data_profile.variables.items()
+            if search.strip().lower() in v.lower() and (not type_filter or d.type in type_filter)
+        ]
+        if len(shown) < len(data_profile.variables):
+            st.caption(f"Showing {len(shown)} of {len(data_profile.variables)} variables; hidden variables keep their current type.")
+
+        confirm_df = pd.DataFrame(
+            [
+                {"Feature": v, "Suggested Type": data_profile.variables[v].type, "Confirmed Type": overrides.get(v, data_profile.variables[v].type)}
+                for v in shown
+            ],
+            columns=["Feature", "Suggested Type", "Confirmed Type"]
+        )
 
         edited_df = st.data_editor(
             confirm_df,
@@ -256,12 +478,22 @@ with tab1:
                     "Confirmed Type", options=type_options
                 )
             },
+            disabled=["Feature", "Suggested Type"],
             hide_index=True,
             width="stretch"
         )
 
+        for v, typ in zip(edited_df["Feature"], edited_df["Confirmed Type"]):
+            if typ and typ != data_profile.variables[v].type:
+                overrides[v] = typ
+            else:
+                overrides.pop(v, None)
+
         if st.button("🔒 Confirm Data Types"):
-            st.session_state.confirmed_schema = edited_df.copy()
+            st.session_state.confirmed_schema = pd.DataFrame([
+                {"Feature": v, "Suggested Type": d.type, "Confirmed Type": overrides.get(v, d.type)}
+                for v, d in data_profile.variables.items()
+            ])
 
         if st.session_state.confirmed_schema is not None:
 
@@ -269,21 +501,125 @@ with tab1:
             # Reprofiling
             # ---------------------------
 
-            final_profile = deepcopy(data_profile)
+            with span("reprofile"):
+
+                final_profile = deepcopy(data_profile)
+
+                # Only retyped columns are re-tested, and only once they are used
+                schema = st.session_state.confirmed_schema
+                for var, typ in zip(schema["Feature"], schema["Confirmed Type"]):
+                    if final_profile.variables[var].type != typ:
+                        final_profile.variables[var].type = typ
+                        final_profile.variables[var].profiled = False
+
+            # ---------------------------
+            # Outlier screen
+            # ---------------------------
+
+            continuous_vars = [v for v, d in final_profile.variables.items() if d.type == "continuous"]
+
+            with st.expander("🚩 Outlier Screen"):
+                col1, col2 = st.columns(2)
+                with col1:
+                    outlier_method = st.radio(
+                        "Fences", ["mad", "iqr"], horizontal=True,
+                        format_func={"mad": "Median ± 3.5 MAD", "iqr": "Tukey 1.5 × IQR"}.get,
+                        help="Both fences use medians/quartiles, so the outliers themselves do not widen them"
+                    )
+                with col2:
+                    mahalanobis_vars = st.multiselect(
+                        "Multivariate (Mahalanobis) Across", continuous_vars,
+                        help="Optional: flag rows that are unusual in combination, e.g. height and weight together"
+                    )
+
+                if st.toggle("Run outlier screen"):
+                    with span("outlier_screen"):
+                        screen = detect_outliers(df_clean, continuous_vars, method=outlier_method)
+                        multi = mahalanobis_outliers(df_clean, mahalanobis_vars) if len(mahalanobis_vars) > 1 else None
+
+                    flagged = pd.DataFrame([
+                        {
+                            "Variable": v,
+                            "Outliers": r["count"],
+                            "Lower Fence": r["lower"],
+                            "Upper Fence": r["upper"],
+                            "Rows": ", ".join(map(str, r["rows"][:20])) + (" …" if r["count"] > 20 else "")
+                        }
+                        for v, r in screen["columns"].items() if r["count"]
+                    ], columns=["Variable", "Outliers", "Lower Fence", "Upper Fence", "Rows"])
+
+                    st.caption(f"{len(flagged)} of {len(continuous_vars)} continuous variable(s) have values outside the fences.")
+                    st.dataframe(flagged, hide_index=True, width="stretch")
+
+                    if multi:
+                        st.caption(
+                            f"Mahalanobis: {multi['count']} of {multi['n_complete']} complete row(s) beyond "
+                            f"χ²({len(mahalanobis_vars)}) = {multi['cutoff']:.1f}"
+                            + (f": rows {', '.join(map(str, multi['rows'][:20]))}" if multi["count"] else "")
+                        )
 
-            for _, row in st.session_state.confirmed_schema.iterrows():
-                var = row["Feature"]
-                typ = row["Confirmed Type"]
-                final_profile.variables[var].type = typ
+            # ---------------------------
+            # Outcome screening
+            # ---------------------------
+
+            group_vars = [v for v, d in final_profile.variables.items() if d.type in ("categorical", "ordinal")]
+
+            with st.expander("🧬 Outcome Screening (many outcomes, one grouping variable)"):
+                if not group_vars or not continuous_vars:
+                    st.info("Screening needs at least one categorical grouping variable and one continuous outcome.")
+                else:
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        screen_iv = st.selectbox("Grouping Variable", group_vars, key="screen_iv")
+                    with col2:
+                        screen_rank = st.radio(
+                            "Tests", [False, True], horizontal=True, key="screen_rank",
+                            format_func=lambda r: "Rank (Mann-Whitney / Kruskal)" if r else "Parametric (Welch t / ANOVA)"
+                        )
+                    with col3:
+                        screen_fdr = st.radio("FDR Control", ["bh", "by"], horizontal=True, key="screen_fdr", format_func=FDR_METHODS.get)
+
+                    screen_dvs = st.multiselect(
+                        "Outcomes", continuous_vars, key="screen_dvs",
+                        placeholder="All continuous variables",
+                        help="Leave empty to screen every continuous variable"
+                    ) or continuous_vars
+                    screen_covariates = st.multiselect(
+                        "Adjust for (Covariates)",
+                        [v for v in final_profile.variables if v != screen_iv],
+                        key="screen_covariates", disabled=screen_rank,
+                        help="Optional, parametric tests only: each outcome gets an OLS model with these covariates (HC3 SEs), all fitted together; covariates are not screened themselves"
+                    )
+                    screen_covariates = [] if screen_rank else screen_covariates
+                    q_threshold = st.slider("q-value threshold", 0.001, 0.25, 0.05, 0.001, key="screen_q")
+
+                    screen_params = (
+                        dataset_key, len(df_clean), screen_iv, screen_rank, screen_fdr,
+                        tuple(screen_dvs), tuple(screen_covariates)
+                    )
+                    if st.button(f"🔎 Screen {len(screen_dvs)} Outcome(s)"):
+                        st.session_state.screen = None
+                        submit_job(
+                            "screen", ("screen",) + screen_params, screen_outcomes,
+                            df_clean, screen_iv, list(screen_dvs), screen_rank, screen_fdr, screen_covariates,
+                            label="🧬 Screening outcomes", params=screen_params
+                        )
 
-                if typ == "continuous":
-                    s = df_clean[var].dropna()
-                    if len(s) >= 3:
-                        p = stats.shapiro(s)[1]
-                        final_profile.variables[var].normality_p = float(p)
-                        final_profile.variables[var].normal = bool(p > 0.05)
-                        z = np.abs(stats.zscore(s))
-                        final_profile.variables[var].outliers_present = bool((z > 3).any())
+                    job, entry = finished_job("screen")
+                    if job:
+                        st.session_state.screen = (entry["params"], job.result)
+
+                    screen = st.session_state.get("screen")
+                    if screen and screen[0] == screen_params:
+                        screen_table = screen[1]
+                        hits = int((screen_table["q_value"] < q_threshold).sum())
+                        st.caption(
+                            f"{screen_table['test'].iloc[0]} on {len(screen_table)} outcome(s); "
+                            f"{hits} with q < {q_threshold:g} ({screen_table.attrs['fdr']}). Click a column header to sort."
+                        )
+                        st.dataframe(screen_table, hide_index=True, width="stretch")
+                        st.pyplot(volcano_plot(screen_table, q_threshold), width="stretch")
+                        st.download_button("⬇ Download screen (CSV)", screen_table.to_csv(index=False), "outcome_screen.csv")
 
             # ---------------------------
             # Agent 2 – Test suggestion
@@ -296,15 +632,98 @@ with tab1:
             </div>
             """, unsafe_allow_html=True)
 
-            continuous_vars = [v for v, d in final_profile.variables.items() if d.type == "continuous"]
             all_vars = list(final_profile.variables.keys())
 
+            # Adjusted (logistic) models also accept binary outcomes
+            outcome_vars = continuous_vars
+            if st.session_state.get("covariates"):
+                outcome_vars = continuous_vars + [
+                    v for v, d in final_profile.variables.items()
+                    if d.type == "categorical" and df_clean[v].nunique() == 2
+                ]
+
+            survival = st.checkbox(
+                "⏱️ Time-to-Event Outcome (Survival Analysis)",
+                help="The outcome is a follow-up time and a separate column marks whether the event happened or the subject was censored"
+            )
+
             col1, col2 = st.columns(2)
             with col1:
-                dv = st.selectbox("🎯 Outcome Variable (Dependent)", continuous_vars, help="Select the continuous outcome variable you want to analyze")
+                if survival:
+                    dv = st.selectbox("🎯 Follow-up Time (Dependent)", continuous_vars, help="Time from baseline to the event or last follow-up")
+                else:
+                    dv = st.selectbox("🎯 Outcome Variable (Dependent)", outcome_vars, help="Select the outcome variable you want to analyze")
             with col2:
                 iv = st.selectbox("📈 Predictor Variable (Independent)", all_vars, help="Select the grouping or predictor variable")
 
+            with span("profile_selected"):
+                complete_profile(df_clean, final_profile, [dv, iv])
+
+            event = None
+            survival_strata = []
+            subject = None
+
+            if survival:
+                col1, col2 = st.columns(2)
+                with col1:
+                    event = st.selectbox(
+                        "🏁 Event Indicator",
+                        [v for v in all_vars if v not in (dv, iv) and df_clean[v].nunique() == 2],
+                        help="Binary column: 1/0, Yes/No or e.g. Dead/Alive (the second sorted level counts as the event)"
+                    )
+                with col2:
+                    survival_strata = st.multiselect(
+                        "🧱 Stratify Baseline Hazard By",
+                        [v for v in all_vars if v not in (dv, iv, event) and final_profile.variables[v].type in ("categorical", "ordinal")],
+                        help="Optional: stratified log-rank test / stratified Cox model, e.g. by study site"
+                    )
+            else:
+                # Repeated measures: rows of the same subject are paired by this ID
+                no_subject = "None (independent observations)"
+                subject_options = [no_subject] + [v for v in all_vars if v not in (dv, iv)]
+                # The detected ID is only a guess from names and repeats, so it
+                # is used only once the user confirms it
+                detected = final_profile.subject_id if final_profile.subject_id in subject_options else None
+                confirmed = detected and st.checkbox(
+                    f"🧍 Rows repeat per subject: pair them by '{detected}'",
+                    help="Detected from the column name and how often its values repeat; tick only if each value is one subject measured several times"
+                )
+                subject = st.selectbox(
+                    "🧍 Subject ID (Repeated Measures)",
+                    subject_options,
+                    index=subject_options.index(detected) if confirmed else 0,
+                    help="Choose the subject/patient ID when each subject is measured at every level of the predictor (e.g. visits)"
+                )
+                subject = None if subject == no_subject else subject
+
+            covariates = st.multiselect(
+                "⚖️ Adjust for Confounders (Covariates)",
+                [v for v in all_vars if v not in (dv, iv)],
+                key="covariates",
+                help="Optional: covariates switch the analysis to linear or logistic regression"
+            )
+
+            stratify_by = st.multiselect(
+                "🧩 Stratify Results By (Subgroups)",
+                [v for v in all_vars if v not in (dv, iv) and final_profile.variables[v].type in ("categorical", "ordinal")],
+                help="Optional: repeat the selected test within each subgroup, e.g. sex, age band or site"
+            )
+
+            # Multiple imputation is offered only when the analysis variables have gaps
+            missing_vars = [
+                v for v in dict.fromkeys([dv, iv] + covariates)
+                if final_profile.variables[v].missing_pct > 0
+            ]
+            imputations = 0
+            if missing_vars and not subject and not survival:
+                if st.checkbox(
+                    "🩹 Impute Missing Values (Multiple Imputation)",
+                    help=f"Missing values in {', '.join(missing_vars)} are imputed m times and the results pooled with Rubin's rules instead of dropping incomplete rows"
+                ):
+                    imputations = st.number_input("Number of imputed datasets (m)", min_value=5, max_value=100, value=20, step=5)
+                    if stratify_by:
+                        st.caption("Subgroup results are not produced when imputing; the pooled overall result is shown.")
+
             if st.button("🧠 Ask Comix for Recommendation", use_container_width=True):
 
                 from agents.reasoning import select_statistical_test
@@ -312,7 +731,7 @@ with tab1:
                 st.session_state.results = None
                 st.session_state.report_text = None
 
-                group_count = df_clean[iv].nunique() if final_profile.variables[iv].type == "categorical" else None
+                group_count = df_clean[iv].nunique() if final_profile.variables[iv].type in ("categorical", "ordinal") else None
 
                 payload = {
                     "dependent_variable": {
@@ -327,8 +746,39 @@ with tab1:
                     }
                 }
 
+                if covariates:
+                    payload["dependent_variable"]["levels"] = int(df_clean[dv].nunique())
+                    payload["covariates"] = [
+                        {"name": c, "type": final_profile.variables[c].type}
+                        for c in covariates
+                    ]
+
+                if event:
+                    payload["design"] = {
+                        "type": "time to event",
+                        "event": event,
+                        "events": int((df_clean[event] == sorted(df_clean[event].dropna().unique(), key=str)[1]).sum())
+                    }
+
+                if subject:
+                    payload["design"] = {
+                        "type": "repeated measures",
+                        "subject_id": subject,
+                        "timepoints": int(df_clean[iv].nunique())
+                    }
+
                 st.session_state.test_plan = select_statistical_test(payload)
 
+                if subject and "error" not in st.session_state.test_plan:
+                    st.session_state.test_plan["subject_id"] = subject
+
+                if event and "error" not in st.session_state.test_plan:
+                    st.session_state.test_plan["event"] = event
+                    st.session_state.test_plan["strata"] = survival_strata
+
+                if covariates and "error" not in st.session_state.test_plan:
+                    st.session_state.test_plan["covariates"] = covariates
+
             # ---------------------------
             # Suggested test explanation
             # ---------------------------
@@ -365,11 +815,68 @@ with tab1:
                 # Agent 3 – Run test
                 # ---------------------------
 
+                outcome = cached = None
                 if st.button("🧪 Execute Statistical Test", use_container_width=True, type="primary"):
-                    st.session_state.results = execute_test(
-                        df_clean,
-                        st.session_state.test_plan
+                    st.session_state.test_plan["stratify_by"] = stratify_by
+                    st.session_state.test_plan["imputations"] = imputations
+
+                    # Same cleaned data + same plan + same engine version →
+                    # stored results, report text and figures
+                    with span("result_cache_lookup"):
+                        if append_files:
+                            fingerprint = dataset_fingerprint(df_clean)
+                        else:
+                            if "fingerprint" not in handle.meta:
+                                handle.meta["fingerprint"] = dataset_fingerprint(df_clean)
+                            fingerprint = handle.meta["fingerprint"]
+                        plan = deepcopy(st.session_state.test_plan)
+                        cache_key = result_key(fingerprint, plan)
+                        cached = get_result_cache().get(cache_key)
+
+                    if cached:
+                        outcome = cached
+                    else:
+                        def run_analysis(df, plan, key):
+                            results = execute_test(df, plan)
+                            get_result_cache().put(key, results)
+                            return results
+
+                        # Same key while running (double click, rerun) joins the running job
+                        submit_job(
+                            "execute", ("execute", cache_key), run_analysis,
+                            df_clean, plan, cache_key,
+                            label="Statistical test", plan=plan, fingerprint=fingerprint, cache_key=cache_key
+                        )
+
+                job, entry = finished_job("execute")
+                if job:
+                    outcome = {"results": job.result, "report_text": None, "figures": {}}
+                    plan, fingerprint, cache_key = entry["plan"], entry["fingerprint"], entry["cache_key"]
+
+                if outcome:
+                    st.session_state.results = outcome["results"]
+                    st.session_state.report_text = outcome["report_text"]
+                    st.session_state.figures = outcome["figures"]
+                    st.session_state.result_key = cache_key
+                    st.session_state.result_cached = outcome is cached
+
+                    # Queued for the history writer; does not wait on disk
+                    run_id = get_history().record(
+                        fingerprint,
+                        plan,
+                        st.session_state.results,
+                        user=st.user.get("email") or "anonymous",
+                        dataset_name=uploaded_file.name,
+                        audit_log=audit_log,
+                        schema=st.session_state.confirmed_schema.to_dict("records"),
+                        cached=outcome is cached
                     )
+                    st.session_state.run = {
+                        "id": run_id,
+                        "created": time.time(),
+                        "dataset": fingerprint,
+                        "engine": ENGINE_VERSION
+                    }
 
             # ---------------------------
             # Summary output
@@ -394,7 +901,35 @@ with tab1:
                 with col3:
                     st.metric("p-value", f"{r['p_value']:.3f}")
                 with col4:
-                    st.metric("Effect Size", r.get('effect_size', 'N/A'))
+                    st.metric(
+                        f"Effect Size ({r['effect_measure']})" if r.get("effect_measure") else "Effect Size",
+                        f"{r['effect_size']:.3f}" if r.get("effect_size") is not None else "N/A"
+                    )
+
+                if st.session_state.get("result_cached"):
+                    st.badge("Cached result", icon="⚡", color="green")
+                    st.caption("Identical cleaned data, test plan and engine version were analysed before; stored results are shown.")
+
+                if r.get("design") == "repeated measures":
+                    note = (
+                        f"Repeated measures on {r['n_subjects']} subjects with complete data"
+                        + (f"; {r['excluded_subjects']} subject(s) with a missing time point excluded" if r["excluded_subjects"] else "")
+                    )
+                    if r.get("sphericity"):
+                        note += f"; Greenhouse-Geisser ε = {r['sphericity']['epsilon_gg']:.2f} applied to p"
+                    st.caption(note)
+
+                contingency = r.get("contingency")
+                if contingency and contingency["warning"]:
+                    st.warning(f"⚠️ {contingency['warning']}")
+
+                mi = r.get("imputation")
+                if mi and mi["m"]:
+                    cells = ", ".join(f"{c}: {n}" for c, n in mi["imputed_cells"].items())
+                    st.caption(
+                        f"Pooled over m = {mi['m']} imputed datasets ({mi['method']}); "
+                        f"imputed cells: {cells}; fraction of missing information = {mi['fmi']:.2f}"
+                    )
 
                 if r["p_value"] < 0.05:
                     st.success("✅ **Statistically Significant Result** (p < 0.05) - Clinical significance should be evaluated")
@@ -406,11 +941,23 @@ with tab1:
                 # ---------------------------
 
                 if st.button("📄 Generate Publication-Ready Results", use_container_width=True):
-                    st.session_state.report_text = generate_results_text(
-                        st.session_state.test_plan,
-                        st.session_state.results
+                    def write_report(plan, results, key):
+                        report_text = generate_results_text(plan, results)
+                        if key:
+                            get_result_cache().put_report(key, report_text)
+                        return report_text
+
+                    result_id = st.session_state.get("result_key")
+                    submit_job(
+                        "report", ("report", result_id or (st.session_state.session_id, id(r))), write_report,
+                        deepcopy(st.session_state.test_plan), r, result_id,
+                        label="Publication-ready results"
                     )
 
+                job, _ = finished_job("report")
+                if job:
+                    st.session_state.report_text = job.result
+
             # ---------------------------
             # Academic display
             # ---------------------------
@@ -442,7 +989,12 @@ with tab1:
 
                 group_stats = st.session_state.results.get("group_statistics")
 
-                if group_stats:
+                if st.session_state.results.get("design") == "time to event":
+
+                    if group_stats:
+                        st.dataframe(format_survival_table(st.session_state.results), width="stretch", hide_index=True)
+
+                elif group_stats:
 
                     group_df = format_group_table(group_stats)
                     st.dataframe(group_df, width="stretch")
@@ -453,9 +1005,48 @@ with tab1:
                 test_df = format_test_table(st.session_state.results)
                 st.dataframe(test_df, width="stretch")
 
-                # Figures once (safe reuse)
-                fig1 = distribution_plot(df_clean, dv)
-                fig2 = boxplot_by_group(df_clean, dv, iv)
+                if st.session_state.results.get("strata"):
+                    st.markdown(f"**Results by subgroup** ({', '.join(st.session_state.results['stratify_by'])}):")
+                    st.dataframe(format_strata_table(st.session_state.results), width="stretch", hide_index=True)
+
+                    het = st.session_state.results.get("heterogeneity")
+                    if het:
+                        st.caption(
+                            f"Heterogeneity across strata: Q({het['df']}) = {het['q']:.2f}, "
+                            f"p = {het['p_value']:.3f}, I² = {het['i_squared'] * 100:.0f}%; "
+                            f"inverse-variance pooled effect {het['pooled_effect']:.3f} "
+                            f"[{het['pooled_ci'][0]:.3f}, {het['pooled_ci'][1]:.3f}]"
+                        )
+                    else:
+                        st.caption("Heterogeneity test not available for this effect size.")
+
+                if st.session_state.results.get("coefficients"):
+                    cov_type = st.session_state.results["cov_type"]
+                    st.markdown(f"**Adjusted model coefficients** ({cov_type} {'robust ' if cov_type.startswith('HC') else ''}SEs):")
+                    st.dataframe(format_regression_table(st.session_state.results), width="stretch", hide_index=True)
+
+                # Figures are rendered to PNG once per result and cached with it
+                figures = st.session_state.setdefault("figures", {})
+                if "distribution" not in figures or "comparison" not in figures:
+                    with span("render_figures"):
+                        fig1 = distribution_plot(df_clean, dv)
+                        if st.session_state.results.get("design") == "time to event":
+                            fig2 = km_plot(
+                                km_by_group(df_clean, dv, st.session_state.results["event"], iv if st.session_state.results["group_statistics"] else None),
+                                time_label=dv
+                            )
+                        else:
+                            fig2 = boxplot_by_group(df_clean, dv, iv)
+
+                        for name, fig in [("distribution", fig1), ("comparison", fig2)]:
+                            buf = io.BytesIO()
+                            fig.savefig(buf, format="png", bbox_inches="tight")
+                            plt.close(fig)
+                            figures[name] = buf.getvalue()
+                            if st.session_state.get("result_key"):
+                                get_result_cache().put_figure(st.session_state.result_key, name, figures[name])
+
+                fig1, fig2 = figures["distribution"], figures["comparison"]
 
                 st.markdown("""
                 <div class="medical-banner">
@@ -467,9 +1058,9 @@ with tab1:
                 # Display figures side by side
                 col_fig1, col_fig2 = st.columns(2)
                 with col_fig1:
-                    st.pyplot(fig1, use_container_width=True)
+                    st.image(fig1, width="stretch")
                 with col_fig2:
-                    st.pyplot(fig2, use_container_width=True)
+                    st.image(fig2, width="stretch")
 
                 st.markdown("""
                 <div class="medical-banner">
@@ -478,12 +1069,22 @@ with tab1:
                 </div>
                 """, unsafe_allow_html=True)
 
-                citation_data = get_citations(
-                    st.session_state.test_plan["selected_test"]
-                )
+                # Looked up once per test and library version, then kept for the session
+                selected_test = st.session_state.test_plan["selected_test"]
+                citations_key = ("citations", selected_test, get_library().version())
+                citations = st.session_state.get("citations")
+                if citations is None or citations[0] != citations_key:
+                    submit_job(
+                        "citations", citations_key, get_citations, selected_test,
+                        label="📚 Looking up method references"
+                    )
+                    job, _ = finished_job("citations")
+                    if job:
+                        citations = st.session_state.citations = (citations_key, job.result)
 
-                for c in citation_data["citations"]:
-                    st.write(c)
+                if citations is not None and citations[0] == citations_key:
+                    for c in citations[1]["citations"]:
+                        st.write(c)
 
                 # ---------------------------
                 # Export
@@ -496,34 +1097,48 @@ with tab1:
                 </div>
                 """, unsafe_allow_html=True)
 
+                # One export per report text, plan and run; repeated clicks join it
+                export_key = (st.session_state.get("result_key") or id(st.session_state.results), rt["results_text"], (st.session_state.get("run") or {}).get("id"))
+
                 col1, col2 = st.columns(2)
 
                 with col1:
                     if st.button("📄 Download Word Report", use_container_width=True):
-                        path = generate_word(
+                        submit_job(
+                            "word", ("word",) + export_key, generate_word,
                             rt,
                             fig1,
                             fig2,
                             st.session_state.results,
-                            st.session_state.confirmed_schema,
-                            audit_log,
-                            st.session_state.test_plan
+                            st.session_state.confirmed_schema.copy(),
+                            list(audit_log),
+                            deepcopy(st.session_state.test_plan),
+                            st.session_state.get("run"),
+                            label="Word report"
                         )
-                        with open(path, "rb") as f:
+
+                    job, _ = finished_job("word")
+                    if job:
+                        with open(job.result, "rb") as f:
                             st.download_button("⬇ Download Word Document", f, "clinical_analysis_report.docx", use_container_width=True)
 
                 with col2:
                     if st.button("📑 Download PDF Report", use_container_width=True):
-                        path = generate_pdf(
+                        submit_job(
+                            "pdf", ("pdf",) + export_key, generate_pdf,
                             rt,
                             fig1,
                             fig2,
                             st.session_state.results,
-                            st.session_state.confirmed_schema,
-                            audit_log,
-                            st.session_state.test_plan
+                            st.session_state.confirmed_schema.copy(),
+                            list(audit_log),
+                            deepcopy(st.session_state.test_plan),
+                            label="PDF report"
                         )
-                        with open(path, "rb") as f:
+
+                    job, _ = finished_job("pdf")
+                    if job:
+                        with open(job.result, "rb") as f:
                             st.download_button("⬇ Download PDF Document", f, "clinical_analysis_report.pdf", use_container_width=True)
 
 # ==========================================================
@@ -539,7 +1154,44 @@ with tab2:
     </div>
     """, unsafe_allow_html=True)
 
-    if st.session_state.df_clean is None or st.session_state.test_plan is None:
+    # ---------------------------
+    # Local literature library
+    # ---------------------------
+
+    with st.expander("📚 Literature Library"):
+        library = get_library()
+        st.caption(
+            "Citations and research context are retrieved from this local library: bundled method references "
+            "plus any BibTeX (.bib) or RIS (.ris) exports you import from a reference manager."
+        )
+
+        if "imported_libraries" not in st.session_state:
+            st.session_state.imported_libraries = []
+
+        for f in st.file_uploader("Import references", type=["bib", "ris"], accept_multiple_files=True) or []:
+            if f.file_id in st.session_state.imported_libraries:
+                continue
+            try:
+                added = library.import_library(f.getvalue(), f.name)
+                st.success(f"✅ Indexed {added} reference(s) from {f.name}")
+            except ValueError as e:
+                st.error(f"❌ {e}")
+            st.session_state.imported_libraries.append(f.file_id)
+
+        sources = library.sources()
+        st.dataframe(
+            pd.DataFrame({"Library": list(sources), "References": list(sources.values())}),
+            width="stretch", hide_index=True
+        )
+
+        imported = [name for name in sources if name != "bundled"]
+        if imported:
+            remove = st.selectbox("Imported library", imported)
+            if st.button("🗑️ Remove library"):
+                library.remove_source(remove)
+                st.rerun()
+
+    if st.session_state.dataset is None or st.session_state.test_plan is None:
         st.warning("⚠️ Please complete the statistical analysis in the Statistical Analysis tab first to explore research context.")
     else:
 
@@ -559,12 +1211,19 @@ with tab2:
         if objective:
 
             if st.button("🔍 Ask Comex for Relevant Clinical Literature", use_container_width=True, type="primary"):
+                submit_job(
+                    "context",
+                    # Keyed on the library version too, so an import is searched again
+                    ("context", objective, json.dumps(st.session_state.test_plan, sort_keys=True, default=str), get_library().version()),
+                    get_research_context,
+                    objective,
+                    deepcopy(st.session_state.test_plan),
+                    label="🔬 Searching the literature library"
+                )
 
-                with st.spinner("🔬 I'm searching the clinical research landscape and identifying relevant literature for you..."):
-                    context = get_research_context(
-                        objective,
-                        st.session_state.test_plan
-                    )
+            job, _ = finished_job("context")
+            if job:
+                context = job.result
 
                 st.markdown("""
                 <div class="medical-banner">
@@ -573,6 +1232,12 @@ with tab2:
                 </div>
                 """, unsafe_allow_html=True)
                 st.write(context["research_theme"])
+                if context["key_papers"]:
+                    st.caption(
+                        f"📚 {len(context['key_papers'])} reference(s) retrieved from the local library; "
+                        + ("findings summarized by the language model from their abstracts." if context["summarized"]
+                           else "findings are the stored abstracts (no language model used).")
+                    )
 
                 st.markdown("""
                 <div class="medical-banner">
@@ -612,4 +1277,216 @@ with tab2:
                     <p style="margin: 5px 0 0 0; color: #616161;">Common findings and patterns in published research</p>
                 </div>
                 """, unsafe_allow_html=True)
-                st.write(context["typical_results_in_literature"])
\ No newline at end of file
+                st.write(context["typical_results_in_literature"])
+
+
+# ==========================================================
+# TAB 3 — POWER & SAMPLE SIZE
+# ==========================================================
+
+with tab3:
+
+    st.markdown("""
+    <div class="medical-banner">
+        <h4 style="margin: 0; color: #1565c0;">📐 Power & Sample Size Planning</h4>
+        <p style="margin: 5px 0 0 0; color: #616161;">Power curves across effect sizes, sample sizes and significance levels</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    power_tests = {
+        "Independent t-test": "Cohen's d",
+        "ANOVA": "Cohen's f",
+        "Chi-square": "Cohen's w",
+        "Pearson correlation": "r",
+        "Spearman correlation": "r",
+        "Mann-Whitney U": "Shift in SD units (simulated)",
+        "Kruskal-Wallis": "Shift between extreme groups in SD units (simulated)",
+    }
+
+    power_test = st.selectbox("🧪 Planned test", list(power_tests))
+    simulated = power_test in ("Mann-Whitney U", "Kruskal-Wallis")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        effect_range = st.slider(f"Effect size ({power_tests[power_test]})", 0.05, 1.5, (0.2, 0.8), 0.05)
+        effect_steps = st.number_input("Effect size steps", 2, 20, 4)
+    with col2:
+        n_range = st.slider(
+            "Sample size (per group)" if power_test in ("Independent t-test", "ANOVA") or simulated else "Sample size (total)",
+            5, 2000, (10, 300)
+        )
+        n_steps = st.number_input("Sample size steps", 5, 200, 30)
+    with col3:
+        power_alphas = st.multiselect("α levels", [0.001, 0.01, 0.05, 0.10], default=[0.05])
+        target_power = st.slider("Target power", 0.5, 0.99, 0.8, 0.01)
+
+    k_groups = 3
+    chi_df = 1
+    n_sims = 1000
+    if power_test in ("ANOVA", "Kruskal-Wallis"):
+        k_groups = st.number_input("Number of groups", 3, 12, 3)
+    if power_test == "Chi-square":
+        chi_df = st.number_input("Degrees of freedom ((rows − 1) × (columns − 1))", 1, 50, 1)
+    if simulated:
+        n_sims = st.select_slider("Monte Carlo replicates per point", [200, 500, 1000, 2000, 5000], 1000)
+        sim_distribution = st.selectbox("Outcome distribution", ["normal", "lognormal", "exponential"])
+
+    effects = np.linspace(effect_range[0], min(effect_range[1], 0.99) if "correlation" in power_test else effect_range[1], int(effect_steps))
+    ns = np.unique(np.linspace(n_range[0], n_range[1], int(n_steps)).astype(int))
+    power_params = (
+        power_test, tuple(effects.tolist()), tuple(ns.tolist()), tuple(sorted(power_alphas)),
+        int(k_groups), int(chi_df), int(n_sims), sim_distribution if simulated else "normal"
+    )
+
+    if power_alphas and st.button("📈 Compute Power Surface", use_container_width=True, type="primary"):
+        submit_job(
+            "power", ("power",) + power_params, power_grid,
+            # power_grid(test, effects, ns, alphas, k, df, n_sims, distribution)
+            power_test, effects, ns, sorted(power_alphas),
+            int(k_groups), int(chi_df), int(n_sims), power_params[-1],
+            label="📈 Computing power surface", params=power_params
+        )
+
+    job, entry = finished_job("power")
+    if job:
+        st.session_state.power = (entry["params"], job.result)
+
+    power = st.session_state.get("power")
+    if power and power[0] == power_params:
+        grid = power[1]
+        st.pyplot(power_curve_plot(grid, target_power), use_container_width=True)
+
+        if not simulated:
+            st.markdown("**Required sample size for target power:**")
+            st.dataframe(pd.DataFrame([
+                {
+                    "Effect size": round(e, 3),
+                    "α": a,
+                    "Required n": required_sample_size(power_test, e, target_power, a, int(k_groups), int(chi_df))
+                }
+                for e in effects for a in sorted(power_alphas)
+            ]), width="stretch", hide_index=True)
+
+        st.download_button("⬇ Download power grid (CSV)", grid.to_csv(index=False), "power_grid.csv", use_container_width=True)
+
+# ==========================================================
+# TAB 4 — ANALYSIS HISTORY
+# ==========================================================
+
+with tab4:
+
+    st.markdown("""
+    <div class="medical-banner">
+        <h4 style="margin: 0; color: #1565c0;">🗂️ Analysis History</h4>
+        <p style="margin: 5px 0 0 0; color: #616161;">Every executed analysis, searchable by dataset, test, variable, user and date</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    history = get_history()
+    # A run recorded earlier in this script run may still be queued
+    history.flush(timeout=1)
+    current_run = st.session_state.get("run")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        this_dataset = st.toggle("Current dataset only", value=current_run is not None, disabled=current_run is None)
+        history_test = st.text_input("Test starts with")
+    with col2:
+        history_variable = st.text_input("Variable")
+        history_user = st.selectbox("User", ["All"] + history.users())
+    with col3:
+        history_dates = st.date_input("Date range", value=())
+
+    since = until = None
+    if len(history_dates) == 2:
+        since = time.mktime(history_dates[0].timetuple())
+        until = time.mktime(history_dates[1].timetuple()) + 86400
+
+    runs = history.runs(
+        dataset=current_run["dataset"] if this_dataset and current_run else None,
+        test=history_test.strip() or None,
+        variable=history_variable.strip() or None,
+        user=None if history_user == "All" else history_user,
+        since=since,
+        until=until
+    )
+
+    if runs:
+        history_df = pd.DataFrame(runs)
+        history_df["created"] = pd.to_datetime(history_df["created"], unit="s").dt.strftime("%Y-%m-%d %H:%M")
+        history_df["dataset"] = history_df["dataset"].str[:12]
+        history_df["cached"] = history_df["cached"].astype(bool)
+        st.dataframe(history_df.drop(columns=["id"]), width="stretch", hide_index=True)
+        st.caption(f"{len(runs)} run(s), newest first.")
+        st.download_button("⬇ Download history (CSV)", pd.DataFrame(runs).to_csv(index=False), "analysis_history.csv")
+    else:
+        st.info("No recorded analyses match these filters.")
+
+# ==========================================================
+# DIAGNOSTICS
+# ==========================================================
+
+st.session_state.traces = (st.session_state.traces + [run_trace])[-20:]
+
+# Optional offline analysis: persist every run's trace as JSON
+if os.getenv("MEDSTATS_TRACE_DIR") and run_trace.spans:
+    os.makedirs(os.environ["MEDSTATS_TRACE_DIR"], exist_ok=True)
+    run_trace.dump(os.path.join(os.environ["MEDSTATS_TRACE_DIR"], f"trace_{run_trace.started_at:.0f}_{id(run_trace)}.json"))
+
+session_jobs = get_jobs().jobs(session=st.session_state.session_id)
+running = [j.label for j in session_jobs if j.active]
+if running:
+    st.sidebar.caption(f"⏳ Running in the background: {', '.join(running)}")
+
+if st.sidebar.toggle("🩺 Diagnostics", help="Show per-stage timing and memory for this session"):
+
+    with st.expander("🩺 Diagnostics", expanded=True):
+
+        traces = st.session_state.traces
+        labels = [t.label for t in traces]
+        selected = st.selectbox("Script run", labels, index=len(labels) - 1)
+        trace = traces[labels.index(selected)]
+
+        if trace.spans:
+            st.caption(f"Total wall time: {trace.total_wall():.3f} s")
+            fig = trace_waterfall(trace.spans)
+            st.pyplot(fig, use_container_width=True)
+
+            st.dataframe(pd.DataFrame([
+                {
+                    "Stage": ("  " * sp["depth"]) + sp["name"],
+                    "Wall (s)": round(sp["wall"], 4),
+                    "CPU (s)": round(sp["cpu"], 4),
+                    "Peak RSS Δ (MB)": (
+                        round(sp["peak_rss_delta"] / 2**20, 2)
+                        if sp["peak_rss_delta"] is not None else None
+                    ),
+                }
+                for sp in trace.to_dict()["spans"]
+            ]), width="stretch", hide_index=True)
+        else:
+            st.info("No instrumented stages ran in this script run.")
+
+        if session_jobs:
+            pool = get_jobs().stats()
+            st.caption(
+                f"Background jobs — server pool: {pool['running']} running, "
+                f"{pool['queued']} queued on {pool['workers']} worker(s)"
+            )
+            st.dataframe(pd.DataFrame([
+                {
+                    "Job": j.label,
+                    "State": j.state,
+                    "Progress": round(j.progress, 2),
+                    "Elapsed (s)": round(j.elapsed(), 2),
+                    "Error": j.error
+                }
+                for j in session_jobs
+            ]), width="stretch", hide_index=True)
+
+        st.download_button(
+            "⬇ Download traces (JSON)",
+            json.dumps([t.to_dict() for t in traces], indent=2),
+            "medstats_traces.json",
+            mime="application/json"
+        )
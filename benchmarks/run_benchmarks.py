@@ -0,0 +1,243 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import warnings
+import platform
+import statistics
+import subprocess
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Exporters import the citation agent, which builds an OpenAI client on import.
+# Benchmarks never call the network, so a placeholder key is enough.
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-offline")
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from agents.data_cleaning import clean_dataset
+from agents.data_profiling import profile_dataset
+from core.stats_engine import execute_test
+from core.visuals import boxplot_by_group, distribution_plot
+from core.word_report import generate_word_report
+import core.report_export as report_export
+from benchmarks.synthetic import make_clinical_dataset, PRESETS
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+# ---------------------------
+# Benchmark cases
+# ---------------------------
+
+TEST_PLANS = {
+    "t-test": ("outcome", "arm"),
+    "Mann-Whitney U": ("outcome", "arm"),
+    "ANOVA": ("outcome", "site"),
+    "Kruskal-Wallis": ("outcome", "site"),
+    "Chi-square": ("sex", "arm"),
+    "Pearson correlation": ("outcome", "age"),
+    "Spearman correlation": ("outcome", "age"),
+}
+
+REPORT_TEXT = {
+    "results_text": "Benchmark results paragraph.",
+    "interpretation": "Benchmark interpretation paragraph.",
+    "limitations": "Benchmark limitations paragraph.",
+}
+
+STUB_CITATIONS = {"test": "benchmark", "citations": ["Benchmark, A. (2024). Offline citation."]}
+
+
+def make_plan(test, dv, iv):
+    return {
+        "dependent_variable": dv,
+        "independent_variable": iv,
+        "selected_test": test,
+        "assumptions": [],
+        "effect_size": "",
+        "justification": "",
+        "alpha": 0.05
+    }
+
+
+def build_cases(df):
+    df_clean, audit_log = clean_dataset(df)
+    cases = {
+        "clean_dataset": lambda: clean_dataset(df),
+        "profile_dataset": lambda: profile_dataset(df_clean, lazy=False),
+        "profile_dataset[lazy]": lambda: profile_dataset(df_clean, lazy=True),
+    }
+
+    for test, (dv, iv) in TEST_PLANS.items():
+        plan = make_plan(test, dv, iv)
+        cases[f"execute_test[{test}]"] = lambda plan=plan: execute_test(df_clean, plan)
+
+    plan = make_plan("t-test", "outcome", "arm")
+    results = execute_test(df_clean, plan)
+
+    def export(kind):
+        fig1 = distribution_plot(df_clean, "outcome")
+        fig2 = boxplot_by_group(df_clean, "outcome", "arm")
+        try:
+            if kind == "word_report":
+                paths = []
+                temp_dir = tempfile.mkdtemp()
+                for i, fig in enumerate([fig1, fig2]):
+                    path = os.path.join(temp_dir, f"fig{i}.png")
+                    fig.savefig(path, bbox_inches="tight")
+                    paths.append(path)
+                return generate_word_report(plan, results, REPORT_TEXT, paths)
+            if kind == "word":
+                return report_export.generate_word(REPORT_TEXT, fig1, fig2, results, pd.DataFrame(), audit_log, plan)
+            return report_export.generate_pdf(REPORT_TEXT, fig1, fig2, results, pd.DataFrame(), audit_log, plan)
+        finally:
+            plt.close(fig1)
+            plt.close(fig2)
+
+    cases["export[word_report]"] = lambda: export("word_report")
+    cases["export[word]"] = lambda: export("word")
+    cases["export[pdf]"] = lambda: export("pdf")
+
+    return cases
+
+
+def time_case(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+# ---------------------------
+# Run metadata
+# ---------------------------
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(RESULTS_DIR),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_metadata(preset, repeats, seed):
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "preset": preset,
+        "repeats": repeats,
+        "seed": seed,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+# ---------------------------
+# Commands
+# ---------------------------
+
+def run(args):
+    sizes = PRESETS[args.preset]
+    if args.rows and args.cols:
+        sizes = [(args.rows, args.cols)]
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+
+    # Exporters otherwise fetch references over the network
+    report_export.get_citations = lambda test_name: STUB_CITATIONS
+
+    # e.g. Shapiro-Wilk p-value accuracy warnings above 5000 rows
+    warnings.filterwarnings("ignore")
+
+    records = []
+
+    for n_rows, n_cols in sizes:
+        df = make_clinical_dataset(n_rows, n_cols, seed=args.seed)
+        print(f"== {n_rows:,} rows x {n_cols} columns")
+
+        for name, fn in build_cases(df).items():
+            if args.only and not any(k in name for k in args.only):
+                continue
+
+            times = time_case(fn, args.repeats)
+            records.append({
+                "benchmark": name,
+                "rows": n_rows,
+                "cols": n_cols,
+                "times_s": times,
+                "min_s": min(times),
+                "median_s": statistics.median(times),
+            })
+            print(f"  {name:<40} {min(times):>10.4f} s")
+
+    meta = run_metadata(args.preset, args.repeats, args.seed)
+    output = args.output or os.path.join(RESULTS_DIR, f"{meta['commit']}_{args.preset}.json")
+
+    with open(output, "w") as f:
+        json.dump({"meta": meta, "results": records}, f, indent=2)
+
+    print(f"Saved {len(records)} results to {output}")
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    key = lambda r: (r["benchmark"], r["rows"], r["cols"])
+    base = {key(r): r["min_s"] for r in baseline["results"]}
+
+    print(f"{'benchmark':<40} {'rows':>10} {'cols':>5} {'base s':>10} {'new s':>10} {'ratio':>7}")
+
+    for r in candidate["results"]:
+        if key(r) not in base:
+            continue
+        ratio = r["min_s"] / base[key(r)] if base[key(r)] else float("nan")
+        print(
+            f"{r['benchmark']:<40} {r['rows']:>10,} {r['cols']:>5} "
+            f"{base[key(r)]:>10.4f} {r['min_s']:>10.4f} {ratio:>7.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cleaning, profiling, stats and export pipeline.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="Run benchmarks on synthetic clinical datasets")
+    p_run.add_argument("--preset", choices=sorted(PRESETS), default="quick")
+    p_run.add_argument("--rows", type=int, help="Override the preset with a single size")
+    p_run.add_argument("--cols", type=int)
+    p_run.add_argument("--repeats", type=int, default=3)
+    p_run.add_argument("--seed", type=int, default=0)
+    p_run.add_argument("--only", nargs="*", help="Substrings of benchmark names to run")
+    p_run.add_argument("--output", help="Result JSON path (default: benchmarks/results/<commit>_<preset>.json)")
+    p_run.set_defaults(func=run)
+
+    p_cmp = sub.add_parser("compare", help="Compare two result files")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("candidate")
+    p_cmp.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
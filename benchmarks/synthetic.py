@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+
+# ---------------------------
+# Column templates
+# ---------------------------
+
+WARDS = ["ICU", "Cardiology", "Oncology", "Surgery", "Neurology", "Pediatrics", "Geriatrics", "ED"]
+
+# Skewed allocation: one dominant arm / site, as in most real registries
+ARM_LEVELS = ["Control", "Intervention"]
+ARM_P = [0.75, 0.25]
+
+SITE_LEVELS = ["Site A", "Site B", "Site C", "Site D"]
+SITE_P = [0.55, 0.25, 0.15, 0.05]
+
+
+def _dirty_strings(values, rng, dirty_rate):
+    # Numeric column exported as text: some cells carry thousands separators,
+    # some have the letter O typed instead of zero (both fixed by clean_dataset)
+    out = pd.Series(values).round(1).astype(str).to_numpy(dtype=object)
+
+    n_dirty = int(len(values) * dirty_rate)
+    if n_dirty == 0:
+        return out
+
+    idx = rng.choice(len(values), size=n_dirty, replace=False)
+    half = n_dirty // 2
+
+    for i in idx[:half]:
+        out[i] = f"{values[i] * 1000:,.1f}"
+
+    for i in idx[half:]:
+        out[i] = out[i].replace("0", "O")
+
+    return out
+
+
+def _inject_missing(df, rng, missing_rate):
+    if missing_rate <= 0:
+        return df
+
+    # Core design columns stay complete so every test has groups to compare
+    protected = {"arm", "site", "outcome"}
+
+    for col in df.columns:
+        if col in protected:
+            continue
+        mask = rng.random(len(df)) < missing_rate
+        if mask.any():
+            df[col] = df[col].where(~mask)
+
+    return df
+
+
+def make_clinical_dataset(
+    n_rows,
+    n_cols=10,
+    seed=0,
+    dirty_rate=0.02,
+    missing_rate=0.05
+):
+    rng = np.random.default_rng(seed)
+
+    arm = rng.choice(len(ARM_LEVELS), size=n_rows, p=ARM_P)
+    site = rng.choice(len(SITE_LEVELS), size=n_rows, p=SITE_P)
+
+    age = rng.normal(58, 15, n_rows).clip(18, 99).round()
+    outcome = rng.lognormal(mean=3.0 + 0.15 * arm, sigma=0.5)
+
+    data = {
+        "arm": np.array(ARM_LEVELS, dtype=object)[arm],
+        "site": np.array(SITE_LEVELS, dtype=object)[site],
+        "sex": np.where(rng.random(n_rows) < 0.52, "F", "M").astype(object),
+        "age": age,
+        "outcome": outcome,
+        "sbp": rng.normal(130 + 4 * arm, 18, n_rows).round(),
+        "ward": np.array(WARDS, dtype=object)[rng.integers(0, len(WARDS), n_rows)],
+        "pain_score": rng.integers(0, 11, n_rows).astype(float),
+        "crp_text": _dirty_strings(rng.gamma(2.0, 6.0, n_rows), rng, dirty_rate),
+        "diagnosis_code": np.char.add("I", rng.integers(10, 80, n_rows).astype(str)).astype(object),
+    }
+
+    # Pad to the requested width with alternating lab panels and flags
+    extra = n_cols - len(data)
+    for j in range(max(extra, 0)):
+        if j % 4 == 3:
+            data[f"flag_{j}"] = np.where(rng.random(n_rows) < 0.3, "Yes", "No").astype(object)
+        elif j % 4 == 2:
+            data[f"lab_{j}_text"] = _dirty_strings(rng.normal(100, 25, n_rows), rng, dirty_rate)
+        else:
+            data[f"lab_{j}"] = rng.lognormal(1.0, 0.6, n_rows)
+
+    df = pd.DataFrame(data).iloc[:, :max(n_cols, 1)]
+
+    return _inject_missing(df, rng, missing_rate)
+
+
+# ---------------------------
+# Size presets (rows, columns)
+# ---------------------------
+
+PRESETS = {
+    "quick": [(1_000, 10), (10_000, 50)],
+    "standard": [(1_000, 10), (100_000, 10), (100_000, 100), (10_000, 1000)],
+    "full": [
+        (1_000, 10),
+        (100_000, 10),
+        (1_000_000, 10),
+        (10_000_000, 10),
+        (100_000, 100),
+        (100_000, 1000),
+    ],
+}
@@ -20,14 +20,94 @@ def format_group_table(group_stats: dict):
     return pd.DataFrame(rows)
 
 
+def format_regression_table(results):
+
+    coefficients = results.get("coefficients")
+    if not coefficients:
+        return pd.DataFrame()
+
+    measure = results.get("model", {}).get("effect_measure")
+    est_label = {"odds ratio": "OR", "hazard ratio": "HR"}.get(measure, "B")
+    stat_label = "t" if est_label == "B" else "z"
+    # OR/HR are exponentiated; their SE stays on the log scale of the fit
+    se_label = "SE" if est_label == "B" else "SE (log)"
+
+    return pd.DataFrame([{
+        "Predictor": c["term"],
+        est_label: round(c["estimate"], 2),
+        se_label: round(c["se"], 2),
+        "95% CI": f"[{c['ci_low']:.2f}, {c['ci_high']:.2f}]",
+        stat_label: round(c["statistic"], 2),
+        "p": f"{c['p_value']:.3f}".replace("0.", ".")
+    } for c in coefficients])
+
+
+def format_survival_table(results):
+
+    group_stats = results.get("group_statistics")
+    if not group_stats or results.get("design") != "time to event":
+        return pd.DataFrame()
+
+    rows = []
+    for group, g in group_stats.items():
+        lo, hi = g.get("median_ci") or [None, None]
+        median = f"{g['median']:.1f}" if g["median"] is not None else "NR"
+        ci = f"[{lo:.1f}, {hi:.1f}]" if lo is not None and hi is not None else (
+            f"[{lo:.1f}, NR]" if lo is not None else "[NR, NR]"
+        )
+        rows.append({
+            "Group": group,
+            "n": g["n"],
+            "Events": g["events"],
+            "Median survival": median,
+            "95% CI": ci
+        })
+
+    return pd.DataFrame(rows)
+
+
+def format_strata_table(results):
+
+    strata = results.get("strata")
+    if not strata:
+        return pd.DataFrame()
+
+    rows = []
+    for s in strata:
+        if s.get("error"):
+            rows.append({"Stratum": s["stratum"], "n": s["n"], "Statistic": "", "p": "", "Effect size": "", "Note": s["error"]})
+            continue
+        ci = s.get("confidence_interval")
+        rows.append({
+            "Stratum": s["stratum"],
+            "n": s["n"],
+            "Statistic": round(s["statistic"], 3),
+            "p": f"{s['p_value']:.3f}".replace("0.", "."),
+            "Effect size": (
+                f"{s['effect_size']:.2f}" + (f" [{ci[0]:.2f}, {ci[1]:.2f}]" if ci else "")
+                if s.get("effect_size") is not None else ""
+            ),
+            "Note": ""
+        })
+
+    return pd.DataFrame(rows)
+
+
 def format_test_table(results):
 
+    effect = ""
+    if results.get("effect_size") is not None:
+        measure = results.get("effect_measure")
+        ci = results.get("confidence_interval")
+        effect = (
+            (f"{measure} = " if measure else "")
+            + f"{results['effect_size']:.2f}"
+            + (f" [{ci[0]:.2f}, {ci[1]:.2f}]" if ci and None not in ci else "")
+        )
+
     return pd.DataFrame([{
         "Test": results["test"],
         "Statistic": round(results["statistic"], 3),
         "p": f"{results['p_value']:.3f}".replace("0.", "."),
-        "Effect size": (
-            f"{results['effect_size']:.2f}"
-            if results.get("effect_size") is not None else ""
-        )
+        "Effect size": effect
     }])
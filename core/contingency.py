@@ -0,0 +1,128 @@
+import numpy as np
+from scipy import stats
+
+from core.effect_sizes import cramers_v
+
+MIN_EXPECTED = 5            # Cochran: at most 20% of cells below this ...
+SPARSE_SHARE = 0.2
+MIN_EXPECTED_ANY = 1        # ... and none below this
+MONTE_CARLO_SIMULATIONS = 10000
+MONTE_CARLO_SEED = 0        # fixed so cached and fresh results agree
+MONTE_CARLO_CELLS = 2_000_000   # simulated cells held in memory at once
+
+
+# ---------------------------
+# Table construction
+# ---------------------------
+
+def contingency_table(row_codes, col_codes, n_rows, n_cols):
+    # One bincount over the combined code r * n_cols + c; rows where either
+    # code is missing (-1) are dropped first
+    keep = (row_codes >= 0) & (col_codes >= 0)
+    combined = row_codes[keep] * n_cols + col_codes[keep]
+    table = np.bincount(combined, minlength=n_rows * n_cols).reshape(n_rows, n_cols)
+
+    # Levels that only occur alongside a missing partner leave empty margins
+    return table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+
+
+def expected_counts(table):
+    n = table.sum()
+    return np.outer(table.sum(axis=1), table.sum(axis=0)) / n
+
+
+def pearson_chi2(tables, expected):
+    # Works on one table or a stack of them (…, r, c)
+    return (((tables - expected) ** 2) / expected).sum(axis=(-2, -1))
+
+
+def is_sparse(expected):
+    return bool((expected < MIN_EXPECTED_ANY).any() or (expected < MIN_EXPECTED).mean() > SPARSE_SHARE)
+
+
+# ==========================================================
+# MONTE CARLO EXACT TEST
+# ==========================================================
+# Tables with the observed margins are drawn from their exact conditional
+# (multiple hypergeometric) distribution cell by cell, every simulation at
+# once: each cell is one vectorised hypergeometric draw over all B tables,
+# so the cost is O(r · c · B) whatever the sample size.
+
+def simulate_tables(row_totals, col_totals, n_sims, rng):
+    n_rows, n_cols = len(row_totals), len(col_totals)
+    tables = np.zeros((n_sims, n_rows, n_cols), dtype=np.int64)
+    col_left = np.tile(np.asarray(col_totals, dtype=np.int64), (n_sims, 1))
+
+    for i in range(n_rows - 1):
+        need = np.full(n_sims, row_totals[i], dtype=np.int64)
+        after = col_left.sum(axis=1)
+        for j in range(n_cols - 1):
+            after -= col_left[:, j]
+            draw = rng.hypergeometric(col_left[:, j], after, need)
+            tables[:, i, j] = draw
+            col_left[:, j] -= draw
+            need -= draw
+        tables[:, i, -1] = need
+        col_left[:, -1] -= need
+
+    tables[:, -1, :] = col_left
+    return tables
+
+
+def monte_carlo_p(table, n_sims=MONTE_CARLO_SIMULATIONS, seed=MONTE_CARLO_SEED):
+    expected = expected_counts(table)
+    observed = pearson_chi2(table, expected)
+    rng = np.random.default_rng(seed)
+    rows, cols = table.sum(axis=1), table.sum(axis=0)
+
+    hits = 0
+    chunk = max(1, MONTE_CARLO_CELLS // table.size)
+    for start in range(0, n_sims, chunk):
+        simulated = pearson_chi2(simulate_tables(rows, cols, min(chunk, n_sims - start), rng), expected)
+        # Tolerance as in R's chisq.test(simulate.p.value = TRUE)
+        hits += int(np.sum(simulated >= observed * (1 - 1e-7)))
+
+    # +1 in both counts the observed table as one draw, so p is never 0
+    return float((hits + 1) / (n_sims + 1))
+
+
+# ==========================================================
+# ENTRY POINT
+# ==========================================================
+
+def contingency_test(table):
+    # Pearson χ² with Cramér's V; sparse tables get an exact p-value
+    # (Fisher for 2×2, Monte Carlo otherwise) in place of the asymptotic one
+    table = np.asarray(table, dtype=np.int64)
+    if min(table.shape) < 2:
+        raise ValueError("Chi-square needs at least two observed levels in each variable.")
+
+    stat, p, _, expected = stats.chi2_contingency(table)
+    sparse = is_sparse(expected)
+
+    method = "Pearson chi-square"
+    if sparse and table.shape == (2, 2):
+        _, p = stats.fisher_exact(table)
+        method = "Fisher's exact test"
+    elif sparse:
+        p = monte_carlo_p(table)
+        method = f"Monte Carlo exact test ({MONTE_CARLO_SIMULATIONS} tables)"
+
+    v, ci = cramers_v(stat, int(table.sum()), table.shape)
+
+    low = float((expected < MIN_EXPECTED).mean())
+    warning = None
+    if low > 0:
+        warning = (
+            f"{low:.0%} of cells have expected counts below {MIN_EXPECTED} (smallest {expected.min():.2f}); "
+            + (f"p-value from {method}." if sparse else "within Cochran's limit, so the χ² approximation is kept.")
+        )
+
+    details = {
+        "method": method,
+        "shape": list(table.shape),
+        "min_expected": float(expected.min()),
+        "share_expected_below_5": low,
+        "warning": warning
+    }
+    return stat, float(p), v, ci, details
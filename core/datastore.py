@@ -0,0 +1,246 @@
+import os
+import hashlib
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict, deque
+
+import pyarrow.feather as feather
+
+# ---------------------------
+# Store configuration
+# ---------------------------
+
+STORE_MAX_BYTES = int(float(os.getenv("MEDSTATS_STORE_MAX_MB", 2048)) * 2 ** 20)
+SPILL_DIR = os.getenv(
+    "MEDSTATS_STORE_SPILL_DIR",
+    os.path.join(tempfile.gettempdir(), "medstats_store")
+)
+
+
+def content_key(data, *parts):
+    # Same bytes (and same parse options) → same dataset, whoever uploads it
+    h = hashlib.sha256(data)
+    for part in parts:
+        h.update(b"\0" + str(part).encode())
+    return h.hexdigest()
+
+
+def frame_nbytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+# ==========================================================
+# PROCESS-WIDE DATASET STORE
+# ==========================================================
+# One cleaned frame per distinct upload, shared by every session in the
+# process. Sessions hold DatasetHandles; each handle is one reference and
+# is released when the handle is garbage collected (e.g. the session ends
+# or uploads another file). Over the memory ceiling, unreferenced entries
+# are dropped in LRU order, then referenced ones are spilled to
+# memory-mapped Arrow files and reloaded on next use.
+#
+# Frames are handed out as shallow copies: with pandas copy-on-write a
+# session can add or overwrite columns, or edit cells in place, on its copy
+# without touching the shared data. Copy-on-write is only always on from
+# pandas 3, hence the pandas>=3 pin in requirements.txt.
+
+class Entry:
+
+    def __init__(self, frame, meta):
+        self.frame = frame
+        self.attrs = dict(frame.attrs)
+        self.meta = meta
+        self.nbytes = frame_nbytes(frame)
+        self.refs = 0
+        self.path = None
+        self.index = None
+
+
+class DatasetHandle:
+
+    def __init__(self, store, key):
+        self.key = key
+        self._store = store
+        self._finalizer = weakref.finalize(self, store._defer_release, key)
+
+    def frame(self):
+        return self._store.frame(self.key)
+
+    @property
+    def meta(self):
+        return self._store.meta(self.key)
+
+    def release(self):
+        self._finalizer()
+
+
+class DatasetStore:
+
+    def __init__(self, max_bytes=STORE_MAX_BYTES, spill_dir=SPILL_DIR):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        # Finalizers can fire inside any allocation, so releases are queued
+        # and applied at the next store call instead of under the lock
+        self._pending = deque()
+        self.hits = 0
+        self.misses = 0
+        self.spills = 0
+        self.evictions = 0
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+
+    def __contains__(self, key):
+        with self._lock:
+            self._drain()
+            return key in self._entries
+
+    def put(self, key, frame, **meta):
+        with self._lock:
+            self._drain()
+            if key not in self._entries:
+                self._entries[key] = Entry(frame.copy(deep=False), meta)
+            else:
+                self._entries[key].meta.update(meta)
+            self._entries.move_to_end(key)
+            self._evict(keep=key)
+            return self.acquire(key)
+
+    def acquire(self, key):
+        with self._lock:
+            self._drain()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry.refs += 1
+            self._entries.move_to_end(key)
+            return DatasetHandle(self, key)
+
+    def frame(self, key):
+        with self._lock:
+            self._drain()
+            entry = self._entries[key]
+            if entry.frame is None:
+                self._reload(entry)
+                self._evict(keep=key)
+            self._entries.move_to_end(key)
+            return entry.frame.copy(deep=False)
+
+    def meta(self, key):
+        with self._lock:
+            return self._entries[key].meta
+
+    def frame_or_load(self, key, loader):
+        # Unreferenced use (e.g. API workers): load on a miss, let LRU evict
+        with self._lock:
+            self._drain()
+            if key not in self._entries:
+                self.misses += 1
+                self._entries[key] = Entry(loader(), {})
+                self._evict(keep=key)
+            else:
+                self.hits += 1
+            return self.frame(key)
+
+    def resident_bytes(self):
+        with self._lock:
+            return sum(e.nbytes for e in self._entries.values() if e.frame is not None)
+
+    def stats(self):
+        with self._lock:
+            self._drain()
+            return {
+                "entries": len(self._entries),
+                "resident_bytes": self.resident_bytes(),
+                "max_bytes": self.max_bytes,
+                "spilled": sum(e.frame is None for e in self._entries.values()),
+                "references": sum(e.refs for e in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "spills": self.spills,
+                "evictions": self.evictions
+            }
+
+    def clear(self):
+        with self._lock:
+            for entry in self._entries.values():
+                self._remove_spill(entry)
+            self._entries.clear()
+
+    # ---------------------------
+    # Internals
+    # ---------------------------
+
+    def _defer_release(self, key):
+        self._pending.append(key)
+
+    def _drain(self):
+        released = False
+        while self._pending:
+            entry = self._entries.get(self._pending.popleft())
+            if entry is not None and entry.refs > 0:
+                entry.refs -= 1
+                released = True
+        if released:
+            self._evict()
+
+    def _evict(self, keep=None):
+        if self.resident_bytes() <= self.max_bytes:
+            return
+
+        # Unreferenced entries go first, oldest first
+        for key in [k for k, e in self._entries.items() if e.refs == 0 and k != keep]:
+            self._remove_spill(self._entries.pop(key))
+            self.evictions += 1
+            if self.resident_bytes() <= self.max_bytes:
+                return
+
+        # Still over: spill referenced frames to disk, oldest first
+        for key, entry in list(self._entries.items()):
+            if key != keep and entry.frame is not None:
+                self._spill(entry, key)
+                if self.resident_bytes() <= self.max_bytes:
+                    return
+
+    def _spill(self, entry, key):
+        if entry.path is None:
+            # Per-process directory: another process may evict the same key
+            spill_dir = os.path.join(self.spill_dir, str(os.getpid()))
+            os.makedirs(spill_dir, exist_ok=True)
+            path = os.path.join(spill_dir, f"{key}.arrow")
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            entry.frame.reset_index(drop=True).to_feather(tmp_path)
+            os.replace(tmp_path, path)
+            entry.path = path
+            entry.index = entry.frame.index
+        entry.frame = None
+        self.spills += 1
+
+    def _reload(self, entry):
+        frame = feather.read_table(entry.path, memory_map=True).to_pandas()
+        frame.index = entry.index
+        frame.attrs.update(entry.attrs)
+        entry.frame = frame
+
+    def _remove_spill(self, entry):
+        if entry.path and os.path.exists(entry.path):
+            os.remove(entry.path)
+        entry.path = None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DatasetStore()
+        return _store
@@ -0,0 +1,161 @@
+import numpy as np
+from scipy import stats, optimize
+
+CI_LEVEL = 0.95
+
+# Name of the effect_size each test reports
+EFFECT_MEASURES = {
+    "Mann-Whitney": "rank-biserial r",
+    "t-test": "Hedges' g",
+    "ANOVA": "ω²",
+    "Kruskal": "ε²",
+    "Chi-square": "Cramér's V",
+    "Pearson": "r",
+    "Spearman": "ρ"
+}
+
+
+def effect_measure(test):
+    return next((name for key, name in EFFECT_MEASURES.items() if key in test), None)
+
+
+# ==========================================================
+# EFFECT SIZES FROM TEST STATISTICS
+# ==========================================================
+# Every function works from numbers a test has already produced (χ², H, F,
+# U, r, group means/SDs), so no estimator takes another pass over the data.
+# Each returns (estimate, [lower, upper]) with ci None when it is undefined.
+#
+# Bounded effects (V, ε², ω²) get CIs by inverting the noncentral
+# distribution of the observed statistic: each noncentrality bound λ is
+# mapped to the expected statistic it implies and through the same formula
+# as the point estimate. A lower λ of 0 (no effect cannot be excluded)
+# maps to an effect of 0.
+
+
+def z_crit(level=CI_LEVEL):
+    return stats.norm.isf((1 - level) / 2)
+
+
+def noncentrality_bounds(cdf, level=CI_LEVEL):
+    # cdf(λ) = P(statistic ≤ observed | λ) falls as λ grows
+    def solve(target):
+        if cdf(0.0) <= target:
+            return 0.0
+        hi = 1.0
+        while cdf(hi) > target:
+            hi *= 2
+        return optimize.brentq(lambda lam: cdf(lam) - target, 0.0, hi)
+
+    alpha = 1 - level
+    return solve(1 - alpha / 2), solve(alpha / 2)
+
+
+def chi2_bounds(chi2, df, level=CI_LEVEL):
+    def cdf(lam):
+        return stats.chi2.cdf(chi2, df) if lam == 0 else stats.ncx2.cdf(chi2, df, lam)
+    return noncentrality_bounds(cdf, level)
+
+
+def f_bounds(f, df1, df2, level=CI_LEVEL):
+    def cdf(lam):
+        return stats.f.cdf(f, df1, df2) if lam == 0 else stats.ncf.cdf(f, df1, df2, lam)
+    return noncentrality_bounds(cdf, level)
+
+
+def fisher_z_interval(r, se, level=CI_LEVEL):
+    z = np.arctanh(np.clip(r, -1 + 1e-12, 1 - 1e-12))
+    half = z_crit(level) * se
+    return [float(np.tanh(z - half)), float(np.tanh(z + half))]
+
+
+# ---------------------------
+# Contingency tables
+# ---------------------------
+
+def cramers_v(chi2, n, shape, level=CI_LEVEL):
+    m = min(shape) - 1
+    if n == 0 or m < 1:
+        return None, None
+
+    df = (shape[0] - 1) * (shape[1] - 1)
+    lo, hi = chi2_bounds(chi2, df, level)
+
+    def v(x):
+        return float(np.sqrt(min(1.0, x / (n * m))))
+
+    return v(chi2), [v(lo + df) if lo > 0 else 0.0, v(hi + df)]
+
+
+# ---------------------------
+# Rank tests
+# ---------------------------
+
+def epsilon_squared(h, n, k, level=CI_LEVEL):
+    # Tomczak & Tomczak (2014): ε² = H / (n − 1)
+    if n < 2:
+        return None, None
+
+    lo, hi = chi2_bounds(h, k - 1, level)
+
+    def eps(x):
+        return float(min(1.0, x / (n - 1)))
+
+    return eps(h), [eps(lo + k - 1) if lo > 0 else 0.0, eps(hi + k - 1)]
+
+
+def rank_biserial_r(u1, n1, n2, level=CI_LEVEL):
+    # Positive when the first group tends to have larger values; Fisher-z
+    # interval with SE √((n1 + n2 + 1) / (3 n1 n2))
+    r = 2 * u1 / (n1 * n2) - 1
+    se = np.sqrt((n1 + n2 + 1) / (3 * n1 * n2))
+    return float(r), fisher_z_interval(r, se, level)
+
+
+# ---------------------------
+# Mean differences
+# ---------------------------
+
+def hedges_g(mean1, mean2, sd1, sd2, n1, n2, level=CI_LEVEL):
+    df = n1 + n2 - 2
+    if df < 1:
+        return None, None
+
+    pooled = np.sqrt(((n1 - 1) * sd1 ** 2 + (n2 - 1) * sd2 ** 2) / df)
+    if not pooled > 0:
+        return None, None
+
+    # Small-sample correction J(df) ≈ 1 − 3 / (4 df − 1)
+    g = (mean1 - mean2) / pooled * (1 - 3 / (4 * df - 1))
+    se = np.sqrt((n1 + n2) / (n1 * n2) + g ** 2 / (2 * (n1 + n2)))
+    half = z_crit(level) * se
+    return float(g), [float(g - half), float(g + half)]
+
+
+def omega_squared(f, df1, df2, level=CI_LEVEL):
+    # One-way between-subjects ω² = df1 (F − 1) / (df1 (F − 1) + N)
+    n = df1 + df2 + 1
+    lo, hi = f_bounds(f, df1, df2, level)
+
+    def omega(x):
+        return float(max(0.0, df1 * (x - 1) / (df1 * (x - 1) + n)))
+
+    return omega(f), [omega(1 + lo / df1), omega(1 + hi / df1)]
+
+
+# ---------------------------
+# Correlations
+# ---------------------------
+
+def correlation_ci(r, n, method="pearson", level=CI_LEVEL):
+    if n <= 3:
+        return None
+    if abs(r) >= 1:
+        return [float(r), float(r)]
+
+    if method == "spearman":
+        # Bonett & Wright (2000)
+        se = np.sqrt((1 + r ** 2 / 2) / (n - 3))
+    else:
+        se = 1 / np.sqrt(n - 3)
+    return fisher_z_interval(r, se, level)
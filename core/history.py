@@ -0,0 +1,265 @@
+import os
+import json
+import time
+import uuid
+import queue
+import atexit
+import sqlite3
+import logging
+import tempfile
+import threading
+from contextlib import closing
+
+from core.stats_engine import ENGINE_VERSION
+from core.result_cache import to_json
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# History configuration
+# ---------------------------
+
+HISTORY_PATH = os.getenv(
+    "MEDSTATS_HISTORY_DB",
+    os.path.join(tempfile.gettempdir(), "medstats_history.sqlite")
+)
+BATCH_SIZE = 200        # most runs committed in one transaction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    user TEXT,
+    dataset TEXT NOT NULL,
+    dataset_name TEXT,
+    test TEXT NOT NULL,
+    dependent TEXT,
+    independent TEXT,
+    n INTEGER,
+    statistic REAL,
+    p_value REAL,
+    effect_size REAL,
+    cached INTEGER NOT NULL DEFAULT 0,
+    engine TEXT,
+    plan TEXT,
+    audit_log TEXT,
+    schema TEXT
+);
+CREATE TABLE IF NOT EXISTS run_variables (
+    run_id TEXT NOT NULL,
+    variable TEXT NOT NULL,
+    role TEXT NOT NULL,
+    PRIMARY KEY (run_id, variable, role)
+);
+CREATE INDEX IF NOT EXISTS runs_dataset ON runs (dataset, created);
+CREATE INDEX IF NOT EXISTS runs_test ON runs (test, created);
+CREATE INDEX IF NOT EXISTS runs_user ON runs (user, created);
+CREATE INDEX IF NOT EXISTS runs_created ON runs (created);
+CREATE INDEX IF NOT EXISTS run_variables_variable ON run_variables (variable, run_id);
+"""
+
+SUMMARY_COLUMNS = [
+    "id", "created", "user", "dataset", "dataset_name", "test", "dependent", "independent",
+    "n", "statistic", "p_value", "effect_size", "cached", "engine"
+]
+
+# Plan keys that name variables, and the role each is indexed under
+VARIABLE_ROLES = {
+    "dependent_variable": "dependent",
+    "independent_variable": "independent",
+    "covariates": "covariate",
+    "subject_id": "subject",
+    "measures": "measure",
+    "event": "event",
+    "strata": "strata",
+    "stratify_by": "subgroup"
+}
+
+
+def plan_variables(test_plan):
+    pairs = []
+    for key, role in VARIABLE_ROLES.items():
+        value = test_plan.get(key)
+        for name in ([value] if isinstance(value, str) else value or []):
+            pairs.append((name, role))
+    return list(dict.fromkeys(pairs))
+
+
+def sample_size(results):
+    if results.get("n_subjects") is not None:
+        return int(results["n_subjects"])
+    groups = results.get("group_statistics")
+    if groups:
+        return int(sum(g["n"] for g in groups.values()))
+    return None if results.get("n") is None else int(results["n"])
+
+
+def number(value):
+    # numpy scalars do not bind to SQLite parameters
+    return None if value is None else float(value)
+
+
+# ==========================================================
+# RUN HISTORY STORE
+# ==========================================================
+# record() only builds the row and puts it on a queue; a single writer
+# thread commits queued runs in batches (one transaction per batch), so
+# recording never waits on disk. Reads open their own connection and see
+# everything up to the last committed batch; flush() waits for the queue.
+
+class HistoryStore:
+
+    def __init__(self, path=HISTORY_PATH, batch_size=BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.flush, timeout=5)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # ---------------------------
+    # Writes
+    # ---------------------------
+
+    def record(self, dataset, test_plan, results, user=None, dataset_name=None,
+               audit_log=None, schema=None, cached=False):
+        run_id = uuid.uuid4().hex
+        row = (
+            run_id,
+            time.time(),
+            user,
+            dataset,
+            dataset_name,
+            results.get("test") or test_plan["selected_test"],
+            test_plan.get("dependent_variable"),
+            test_plan.get("independent_variable"),
+            sample_size(results),
+            number(results.get("statistic")),
+            number(results.get("p_value")),
+            number(results.get("effect_size")),
+            int(bool(cached)),
+            ENGINE_VERSION,
+            to_json(test_plan),
+            to_json(list(audit_log or [])),
+            to_json(schema or [])
+        )
+        variables = [(run_id, name, role) for name, role in plan_variables(test_plan)]
+        self._queue.put((row, variables))
+        return run_id
+
+    def flush(self, timeout=None):
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _run(self):
+        while True:
+            # Block for the first item, then take whatever else is already
+            # queued: a lone run is written at once, a burst in one transaction
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size and not isinstance(batch[-1], threading.Event):
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            runs = [item for item in batch if not isinstance(item, threading.Event)]
+            if runs:
+                # Any failure is logged and the batch dropped; the writer
+                # thread must survive, or every later record() is lost
+                try:
+                    self._write(runs)
+                except Exception:
+                    logger.exception("Could not record %d analysis run(s)", len(runs))
+
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def _write(self, runs):
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO runs VALUES ({', '.join('?' * 17)})",
+                [row for row, _ in runs]
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO run_variables (run_id, variable, role) VALUES (?, ?, ?)",
+                [v for _, variables in runs for v in variables]
+            )
+
+    # ---------------------------
+    # Queries
+    # ---------------------------
+
+    def runs(self, dataset=None, test=None, variable=None, user=None, since=None, until=None, limit=500):
+        # e.g. runs(dataset=h) → every analysis of one dataset;
+        # runs(test="Kruskal", since=time.time() - 30 * 86400) → last month's Kruskal runs.
+        # test matches a name prefix (case-sensitive) as a range on runs_test
+        where, params = [], []
+        if dataset:
+            where.append("r.dataset = ?")
+            params.append(dataset)
+        if test:
+            where.append("r.test >= ? AND r.test < ?")
+            params.extend([test, test + "\U0010ffff"])
+        if user:
+            where.append("r.user = ?")
+            params.append(user)
+        if since is not None:
+            where.append("r.created >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("r.created < ?")
+            params.append(until)
+        if variable:
+            where.append("r.id IN (SELECT run_id FROM run_variables WHERE variable = ?)")
+            params.append(variable)
+
+        sql = f"SELECT {', '.join('r.' + c for c in SUMMARY_COLUMNS)} FROM runs r"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY r.created DESC LIMIT ?"
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql, params + [limit]).fetchall()
+        return [dict(zip(SUMMARY_COLUMNS, row)) for row in rows]
+
+    def run(self, run_id):
+        with closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+            if row is None:
+                return None
+            variables = conn.execute(
+                "SELECT variable, role FROM run_variables WHERE run_id = ?", (run_id,)
+            ).fetchall()
+
+        run = dict(row)
+        for field in ("plan", "audit_log", "schema"):
+            run[field] = json.loads(run[field]) if run[field] else None
+        run["variables"] = [dict(v) for v in variables]
+        return run
+
+    def users(self):
+        with closing(self._connect()) as conn:
+            return [u for (u,) in conn.execute("SELECT DISTINCT user FROM runs WHERE user IS NOT NULL ORDER BY user")]
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_history():
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = HistoryStore()
+        return _history
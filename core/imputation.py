@@ -0,0 +1,542 @@
+import warnings
+from functools import partial
+import numpy as np
+import pandas as pd
+from scipy import stats
+import statsmodels.api as sm
+from concurrent.futures import ProcessPoolExecutor
+
+from core.stats_engine import execute_test, factorize_groups, analysis_columns
+from core.instrumentation import traced
+from core.jobs import report_progress
+
+# Below this many rows the process start-up costs more than the imputations
+PARALLEL_MIN_ROWS = 10_000
+
+PMM_DONORS = 5
+RIDGE = 1e-5
+# Categorical predictors with more levels than this are left out of the models
+MAX_PREDICTOR_LEVELS = 30
+
+
+# ==========================================================
+# IMPUTED CELLS
+# ==========================================================
+# Only the analysis columns are kept, once, with their gaps. Each of the m
+# imputations is stored as {column: values for the missing rows}, so memory
+# grows with m × missing cells rather than m × full datasets.
+
+class ImputationSet:
+
+    def __init__(self, base, kinds):
+        self.base = base
+        self.kinds = kinds
+        self.missing_rows = {
+            col: np.flatnonzero(base[col].isna().to_numpy())
+            for col in base.columns
+        }
+        self.missing_rows = {col: rows for col, rows in self.missing_rows.items() if len(rows)}
+        self.cells = []
+
+    @property
+    def m(self):
+        return len(self.cells)
+
+    def add(self, cells):
+        self.cells.append(cells)
+
+    def complete(self, i):
+        return fill_cells(self.base, self.cells[i])
+
+    def imputed_counts(self):
+        return {col: int(len(rows)) for col, rows in self.missing_rows.items()}
+
+
+def fill_cells(base, cells):
+    frame = base.copy()
+    for col, values in cells.items():
+        rows = frame[col].isna().to_numpy()
+        column = frame[col].copy()
+        column[rows] = values
+        frame[col] = column
+    return frame
+
+
+# ==========================================================
+# COLUMN MODELS
+# ==========================================================
+
+def column_kinds(df, test_plan, columns):
+    # Grouping roles are categorical even when coded as numbers (e.g. 0/1)
+    test = test_plan["selected_test"]
+    roles = set()
+    if any(t in test for t in ["t-test", "ANOVA", "Mann-Whitney", "Kruskal", "Chi-square"]):
+        roles.add(test_plan["independent_variable"])
+    if "Chi-square" in test or "Logistic" in test:
+        roles.add(test_plan["dependent_variable"])
+
+    kinds = {}
+    for col in columns:
+        s = df[col]
+        categorical = not pd.api.types.is_numeric_dtype(s) or isinstance(s.dtype, pd.CategoricalDtype)
+        kinds[col] = "categorical" if categorical or col in roles else "continuous"
+    return kinds
+
+
+def encode_columns(base, kinds):
+    # Categoricals become integer codes (-1 = missing), continuous float arrays
+    arrays, labels = {}, {}
+    for col, kind in kinds.items():
+        if kind == "categorical":
+            codes, labs = factorize_groups(base[col])
+            arrays[col] = codes
+            labels[col] = labs
+        else:
+            arrays[col] = pd.to_numeric(base[col], errors="coerce").to_numpy(dtype=float)
+    return arrays, labels
+
+
+def predictor_block(values, kind, n_levels=None):
+    if kind == "categorical":
+        if n_levels is None or n_levels < 2 or n_levels > MAX_PREDICTOR_LEVELS:
+            return np.empty((len(values), 0))
+        return (values[:, None] == np.arange(1, n_levels)[None, :]).astype(float)
+    sd = values.std()
+    return ((values - values.mean()) / (sd if sd > 0 else 1.0))[:, None]
+
+
+def draw_continuous(rng, y, X, miss):
+    # Bayesian linear regression draw, then predictive mean matching so
+    # imputed values are always values actually observed in the column
+    Xo, yo = X[~miss], y[~miss]
+    xtx = Xo.T @ Xo
+    xtx += np.eye(len(xtx)) * RIDGE * np.maximum(np.diag(xtx), 1.0)
+    chol = np.linalg.cholesky(xtx)
+    beta = np.linalg.solve(xtx, Xo.T @ yo)
+
+    resid = yo - Xo @ beta
+    df = max(len(yo) - X.shape[1], 1)
+    sigma = np.sqrt(resid @ resid / rng.chisquare(df))
+    beta_star = beta + sigma * np.linalg.solve(chol.T, rng.standard_normal(len(beta)))
+
+    yhat_obs = Xo @ beta
+    yhat_mis = X[miss] @ beta_star
+
+    order = np.argsort(yhat_obs, kind="stable")
+    sorted_obs = yhat_obs[order]
+    pos = np.searchsorted(sorted_obs, yhat_mis)
+    window = np.clip(pos[:, None] + np.arange(-PMM_DONORS, PMM_DONORS)[None, :], 0, len(sorted_obs) - 1)
+    dist = np.sort(np.abs(sorted_obs[window] - yhat_mis[:, None]), axis=1)
+    reach = dist[:, min(PMM_DONORS, dist.shape[1]) - 1]
+
+    # Donors are every observed row within the k-th nearest distance, so
+    # ties (e.g. a categorical-only model) are shared out at random
+    lo = np.searchsorted(sorted_obs, yhat_mis - reach, side="left")
+    hi = np.searchsorted(sorted_obs, yhat_mis + reach, side="right")
+    pick = lo + (rng.random(len(lo)) * np.maximum(hi - lo, 1)).astype(np.int64)
+    return yo[order[np.minimum(pick, len(order) - 1)]]
+
+
+def draw_categorical(rng, codes, X, miss):
+    # Multinomial logit on a bootstrap sample of the observed rows, then one
+    # draw per missing cell from its predicted level probabilities
+    obs = np.flatnonzero(~miss)
+    boot = rng.choice(obs, size=len(obs))
+    y = codes[boot]
+    levels = np.unique(y)
+    probs = None
+
+    if len(levels) > 1:
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                fit = sm.MNLogit(np.searchsorted(levels, y), X[boot]).fit(disp=0, maxiter=50)
+            probs = np.asarray(fit.predict(X[miss]))
+            if not np.isfinite(probs).all():
+                probs = None
+        except Exception:
+            probs = None
+
+    if probs is None:
+        freq = np.bincount(np.searchsorted(levels, y), minlength=len(levels)) / len(y)
+        probs = np.broadcast_to(freq, (int(miss.sum()), len(levels)))
+
+    u = rng.random(len(probs))[:, None]
+    idx = np.minimum((np.cumsum(probs, axis=1) < u).sum(axis=1), len(levels) - 1)
+    return levels[idx]
+
+
+# ==========================================================
+# CHAINED EQUATIONS
+# ==========================================================
+
+@traced()
+def draw_imputation(base, kinds, seed, iterations=5):
+    rng = np.random.default_rng(seed)
+    arrays, labels = encode_columns(base, kinds)
+    missing = {
+        col: (arr < 0) if kinds[col] == "categorical" else np.isnan(arr)
+        for col, arr in arrays.items()
+    }
+    incomplete = [col for col in arrays if missing[col].any()]
+
+    for col in incomplete:
+        miss = missing[col]
+        if (~miss).sum() < 2:
+            raise ValueError(f"'{col}' has fewer than 2 observed values and cannot be imputed.")
+        # Start from random draws of observed values
+        arrays[col] = arrays[col].copy()
+        arrays[col][miss] = rng.choice(arrays[col][~miss], size=int(miss.sum()))
+
+    n_levels = {col: len(labels[col]) for col in labels}
+    blocks = {col: predictor_block(arr, kinds[col], n_levels.get(col)) for col, arr in arrays.items()}
+    intercept = np.ones((len(base), 1))
+
+    # One sweep is exact when only a single column has gaps
+    for _ in range(iterations if len(incomplete) > 1 else 1):
+        for col in incomplete:
+            X = np.hstack([intercept] + [blocks[c] for c in arrays if c != col])
+            miss = missing[col]
+            if kinds[col] == "categorical":
+                arrays[col][miss] = draw_categorical(rng, arrays[col], X, miss)
+            else:
+                arrays[col][miss] = draw_continuous(rng, arrays[col], X, miss)
+            blocks[col] = predictor_block(arrays[col], kinds[col], n_levels.get(col))
+
+    cells = {}
+    for col in incomplete:
+        values = arrays[col][missing[col]]
+        if kinds[col] == "categorical":
+            values = np.asarray(labels[col], dtype=object)[values]
+        cells[col] = values
+    return cells
+
+
+# ==========================================================
+# POOLING
+# ==========================================================
+
+def rubin_pool(estimates, variances, df_complete=None):
+    q = np.asarray(estimates, dtype=float)
+    u = np.asarray(variances, dtype=float)
+    m = len(q)
+
+    q_bar = q.mean()
+    w = u.mean()
+    b = q.var(ddof=1) if m > 1 else 0.0
+    t = w + (1 + 1 / m) * b
+
+    riv = (1 + 1 / m) * b / w if w > 0 else 0.0
+    lam = (1 + 1 / m) * b / t if t > 0 else 0.0
+
+    # Barnard-Rubin small-sample degrees of freedom
+    df_old = (m - 1) / lam ** 2 if lam > 0 else np.inf
+    if df_complete is None:
+        df = df_old
+    else:
+        df_obs = (df_complete + 1) / (df_complete + 3) * df_complete * (1 - lam)
+        df = df_obs if np.isinf(df_old) else df_old * df_obs / (df_old + df_obs)
+
+    fmi = (riv + 2 / (df + 3)) / (1 + riv) if np.isfinite(df) else lam
+
+    return {
+        "estimate": float(q_bar),
+        "se": float(np.sqrt(t)),
+        "df": float(df),
+        "within": float(w),
+        "between": float(b),
+        "riv": float(riv),
+        "fmi": float(fmi)
+    }
+
+
+def pool_chi_square(statistics, k):
+    # D2 rule (Li, Meng, Raghunathan & Rubin 1991) for χ²-type statistics
+    d = np.asarray(statistics, dtype=float)
+    m = len(d)
+    d_bar = d.mean()
+    r = (1 + 1 / m) * np.sqrt(d).var(ddof=1) if m > 1 else 0.0
+
+    if r == 0:
+        return d_bar / k, float(stats.chi2.sf(d_bar, k)), np.inf, 0.0
+
+    stat = max(0.0, (d_bar / k - (m + 1) / (m - 1) * r) / (1 + r))
+    df2 = k ** (-3 / m) * (m - 1) * (1 + 1 / r) ** 2
+    return stat, float(stats.f.sf(stat, k, df2)), float(df2), float(r)
+
+
+def pooling_inputs(result, frame, test_plan):
+    # Reduce one completed-data result to what Rubin's rules or D2 need
+    test = test_plan["selected_test"]
+    iv = test_plan["independent_variable"]
+
+    if result.get("coefficients") is not None:
+        logistic = result["model"]["effect_measure"] == "odds ratio"
+        exposure = [c for c in result["coefficients"] if c["term"] == iv or c["term"].startswith(f"{iv}[")]
+        if len(exposure) == 1:
+            c = exposure[0]
+            est = np.log(c["estimate"]) if logistic else c["estimate"]
+            return {
+                "kind": "scalar",
+                "estimate": est,
+                "variance": c["se"] ** 2,
+                "df_complete": None if logistic else result["n"] - len(result["coefficients"]),
+                "back": "exp" if logistic else "identity"
+            }
+        chi2 = result["statistic"] if logistic else result["statistic"] * len(exposure)
+        return {"kind": "chi2", "statistic": chi2, "k": len(exposure), "scale": "chi2" if logistic else "F"}
+
+    if "Mann-Whitney" in test:
+        return {"kind": "chi2", "statistic": stats.norm.isf(result["p_value"] / 2) ** 2, "k": 1, "scale": "chi2"}
+
+    if "t-test" in test:
+        (g1, g2) = result["group_statistics"].values()
+        return {
+            "kind": "scalar",
+            "estimate": g1["mean"] - g2["mean"],
+            "variance": g1["sd"] ** 2 / g1["n"] + g2["sd"] ** 2 / g2["n"],
+            "df_complete": g1["n"] + g2["n"] - 2,
+            "back": "identity"
+        }
+
+    if "Pearson" in test or "Spearman" in test:
+        n = int(frame[[test_plan["dependent_variable"], iv]].notna().all(axis=1).sum())
+        scale = 1.06 if "Spearman" in test else 1.0
+        r = float(np.clip(result["statistic"], -0.999999, 0.999999))
+        return {
+            "kind": "scalar",
+            "estimate": np.arctanh(r),
+            "variance": scale / (n - 3),
+            "df_complete": None,
+            "back": "tanh"
+        }
+
+    if "ANOVA" in test or "Kruskal" in test:
+        k = len(result["group_statistics"]) - 1
+        chi2 = result["statistic"] * k if "ANOVA" in test else result["statistic"]
+        return {"kind": "chi2", "statistic": chi2, "k": k, "scale": "F" if "ANOVA" in test else "chi2"}
+
+    if "Chi-square" in test:
+        sub = frame[[test_plan["dependent_variable"], iv]].dropna()
+        k = (sub.iloc[:, 0].nunique() - 1) * (sub.iloc[:, 1].nunique() - 1)
+        return {"kind": "chi2", "statistic": result["statistic"], "k": max(k, 1), "scale": "chi2"}
+
+    raise ValueError(f"Unsupported test: {test}")
+
+
+def back_transform(value, how):
+    if how == "exp":
+        return float(np.exp(value))
+    if how == "tanh":
+        return float(np.tanh(value))
+    return float(value)
+
+
+def pool_group_statistics(results):
+    first = results[0].get("group_statistics")
+    if not first:
+        return None
+
+    pooled = {}
+    for group, g in first.items():
+        entries = [r["group_statistics"][group] for r in results if group in (r["group_statistics"] or {})]
+        pooled[group] = {
+            key: (float(np.mean([e[key] for e in entries])) if g[key] is not None else None)
+            for key in ["mean", "median", "sd"]
+        }
+        pooled[group]["n"] = int(round(np.mean([e["n"] for e in entries])))
+    return pooled
+
+
+def pool_coefficients(results):
+    logistic = results[0]["model"]["effect_measure"] == "odds ratio"
+    # Residual df of the complete-data model, as in pooling_inputs
+    df_complete = None if logistic else results[0]["n"] - len(results[0]["coefficients"])
+    rows = []
+    for i, first in enumerate(results[0]["coefficients"]):
+        est = [r["coefficients"][i]["estimate"] for r in results]
+        est = np.log(est) if logistic else np.asarray(est)
+        var = [r["coefficients"][i]["se"] ** 2 for r in results]
+        pooled = rubin_pool(est, var, df_complete)
+
+        crit = stats.t.isf(0.025, pooled["df"]) if np.isfinite(pooled["df"]) else stats.norm.isf(0.025)
+        stat = pooled["estimate"] / pooled["se"]
+        lo, hi = pooled["estimate"] - crit * pooled["se"], pooled["estimate"] + crit * pooled["se"]
+        how = "exp" if logistic else "identity"
+
+        rows.append({
+            "term": first["term"],
+            "estimate": back_transform(pooled["estimate"], how),
+            "se": pooled["se"],
+            "statistic": float(stat),
+            "p_value": float(2 * stats.t.sf(abs(stat), pooled["df"])),
+            "ci_low": back_transform(lo, how),
+            "ci_high": back_transform(hi, how),
+            "fmi": pooled["fmi"]
+        })
+    return rows
+
+
+def pool_results(results, inputs, test_plan):
+    m = len(results)
+    first = results[0]
+    effects = [r["effect_size"] for r in results if r.get("effect_size") is not None]
+    effect = float(np.mean(effects)) if effects else None
+    ci = None
+
+    if inputs[0]["kind"] == "scalar":
+        pooled = rubin_pool(
+            [x["estimate"] for x in inputs],
+            [x["variance"] for x in inputs],
+            inputs[0]["df_complete"]
+        )
+        df = pooled["df"]
+        crit = stats.t.isf(0.025, df) if np.isfinite(df) else stats.norm.isf(0.025)
+        z = pooled["estimate"] / pooled["se"]
+        p = float(2 * stats.t.sf(abs(z), df)) if np.isfinite(df) else float(2 * stats.norm.sf(abs(z)))
+        how = inputs[0]["back"]
+        ci = [
+            back_transform(pooled["estimate"] - crit * pooled["se"], how),
+            back_transform(pooled["estimate"] + crit * pooled["se"], how)
+        ]
+
+        if how == "tanh":
+            stat = back_transform(pooled["estimate"], how)
+            effect = stat
+        elif first.get("coefficients") is not None:
+            stat = float(z)
+            effect = back_transform(pooled["estimate"], how)
+        else:
+            stat = float(z)
+            # The pooled interval above is for the mean difference; pool the
+            # standardized effect with its own per-imputation SE instead
+            if effect is not None and all(r.get("confidence_interval") for r in results):
+                z95 = stats.norm.isf(0.025)
+                g = rubin_pool(
+                    [r["effect_size"] for r in results],
+                    [((r["confidence_interval"][1] - r["confidence_interval"][0]) / (2 * z95)) ** 2 for r in results]
+                )
+                g_crit = stats.t.isf(0.025, g["df"]) if np.isfinite(g["df"]) else z95
+                effect = g["estimate"]
+                ci = [effect - g_crit * g["se"], effect + g_crit * g["se"]]
+
+        info = {
+            "method": "Rubin's rules",
+            "df": df,
+            "fmi": pooled["fmi"],
+            "riv": pooled["riv"]
+        }
+    else:
+        k = inputs[0]["k"]
+        stat, p, df2, riv = pool_chi_square([x["statistic"] for x in inputs], k)
+        # D2 is on the F scale; χ²-type tests report it back as D2 × k
+        if inputs[0]["scale"] == "chi2":
+            stat = stat * k
+        info = {
+            "method": "D2 pooled χ²",
+            "df": [k, df2],
+            "fmi": riv / (1 + riv),
+            "riv": riv
+        }
+
+    pooled_result = {
+        "test": first["test"],
+        "statistic": float(stat),
+        "p_value": float(p),
+        "effect_size": effect,
+        "effect_measure": first.get("effect_measure"),
+        "confidence_interval": ci,
+        "group_statistics": pool_group_statistics(results)
+    }
+
+    if first.get("coefficients") is not None:
+        model = {
+            key: (float(np.mean([r["model"][key] for r in results])) if isinstance(value, float) else value)
+            for key, value in first["model"].items()
+        }
+        pooled_result.update({
+            "n": first["n"],
+            "covariates": first["covariates"],
+            "cov_type": first["cov_type"],
+            "coefficients": pool_coefficients(results),
+            "model": model
+        })
+
+    info["m"] = m
+    pooled_result["imputation"] = info
+    return pooled_result
+
+
+# ==========================================================
+# RUNNER
+# ==========================================================
+
+def run_imputation(seed, base, kinds, plan, iterations):
+    cells = draw_imputation(base, kinds, seed, iterations)
+    frame = fill_cells(base, cells)
+    result = execute_test(frame, plan)
+    return cells, result, pooling_inputs(result, frame, plan)
+
+
+# Pool processes receive the data once through the initializer instead of
+# with every task; this dict is only ever written inside a worker process
+_worker = {}
+
+
+def init_worker(base, kinds, plan, iterations):
+    _worker.update(base=base, kinds=kinds, plan=plan, iterations=iterations)
+
+
+def run_worker_imputation(seed):
+    return run_imputation(seed, **_worker)
+
+
+def collect_imputations(outcomes, m):
+    collected = []
+    for outcome in outcomes:
+        collected.append(outcome)
+        report_progress(len(collected) / m, f"Imputation {len(collected)} of {m}")
+    return collected
+
+
+@traced()
+def execute_imputed(df, test_plan, m=None, iterations=5, seed=0, max_workers=None, return_set=False):
+    m = int(m or test_plan.get("imputations") or 20)
+    plan = {k: v for k, v in test_plan.items() if k not in ("imputations", "stratify_by")}
+    if plan.get("subject_id") or plan.get("measures"):
+        raise ValueError("Multiple imputation is not available for repeated-measures designs.")
+    if plan.get("event"):
+        raise ValueError("Multiple imputation is not available for time-to-event outcomes.")
+
+    columns = analysis_columns(plan)
+    kinds = column_kinds(df, plan, columns)
+    base = df[columns].reset_index(drop=True)
+    imputations = ImputationSet(base, kinds)
+
+    if not imputations.missing_rows:
+        result = execute_test(base, plan)
+        result["imputation"] = {"m": 0, "method": "none (no missing values)", "imputed_cells": {}}
+        return (result, imputations) if return_set else result
+
+    seeds = np.random.SeedSequence(seed).spawn(m)
+    if max_workers != 1 and m > 1 and len(base) >= PARALLEL_MIN_ROWS:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=init_worker,
+            initargs=(base, kinds, plan, iterations)
+        ) as pool:
+            outcomes = collect_imputations(pool.map(run_worker_imputation, seeds), m)
+    else:
+        # In-process: the data travels as arguments, so concurrent analyses
+        # on other threads never see each other's frames
+        impute = partial(run_imputation, base=base, kinds=kinds, plan=plan, iterations=iterations)
+        outcomes = collect_imputations(map(impute, seeds), m)
+
+    for cells, _, _ in outcomes:
+        imputations.add(cells)
+
+    result = pool_results([o[1] for o in outcomes], [o[2] for o in outcomes], plan)
+    result["imputation"]["imputed_cells"] = imputations.imputed_counts()
+    result["imputation"]["complete_cases"] = int(base.notna().all(axis=1).sum())
+
+    return (result, imputations) if return_set else result
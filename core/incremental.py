@@ -0,0 +1,221 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from agents.data_cleaning import clean_numeric_series
+from agents.data_profiling import column_statistics
+from core.outliers import sorted_outlier_count
+from core.schemas import DataProfile, VariableProfile
+from core.stats_engine import execute_test
+from core.streaming import TestAccumulator
+from core.instrumentation import traced
+
+
+# ==========================================================
+# PER-COLUMN PROFILE AGGREGATES
+# ==========================================================
+
+class ColumnAggregate:
+    # Mergeable per-column summary, updated from each new chunk only: row and
+    # missing counts, the levels of categorical/ordinal columns and, for
+    # profiled continuous columns, the sorted non-missing values. Shapiro and
+    # the median/MAD fences are functions of the order statistics, so the
+    # sorted run reproduces profile_dataset's decisions exactly; a chunk is
+    # merged in with one searchsorted/insert instead of re-concatenating and
+    # re-sorting the table. Statistics are refreshed on update, so profile()
+    # never touches the data.
+
+    def __init__(self, var_type, profiled=True):
+        self.type = var_type
+        self.profiled = profiled
+        self.rows = 0
+        self.missing = 0
+        self.levels = {}
+        self.uniques = None
+        self.values = np.empty(0)
+        self.normality_p = None
+        self.outlier_count = None
+
+    def update(self, series):
+        self.rows += len(series)
+        self.missing += int(series.isna().sum())
+        if not self.profiled:
+            return
+
+        if self.type == "categorical":
+            for level in series.dropna().unique().tolist():
+                self.levels.setdefault(str(level), None)
+
+        elif self.type == "ordinal":
+            # Distinct values only, with their dtype, so ordering follows column_statistics
+            present = series.dropna().drop_duplicates()
+            self.uniques = present if self.uniques is None else pd.concat([self.uniques, present]).drop_duplicates()
+
+        elif self.type == "continuous":
+            new = pd.to_numeric(series, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+            new = np.sort(new[~np.isnan(new)])
+            self.values = np.insert(self.values, np.searchsorted(self.values, new), new)
+            self.normality_p = stats.shapiro(self.values)[1] if len(self.values) >= 3 else None
+            self.outlier_count = sorted_outlier_count(self.values)
+
+    def profile(self):
+        details = {}
+        if self.profiled:
+            if self.type == "continuous":
+                details = {
+                    "normality_p": self.normality_p,
+                    "normal": None if self.normality_p is None else bool(self.normality_p > 0.05),
+                    "outlier_count": self.outlier_count,
+                    "outliers_present": bool(self.outlier_count)
+                }
+            elif self.type == "ordinal":
+                details = column_statistics(self.uniques, "ordinal")
+            elif self.type == "categorical":
+                details = {"levels": list(self.levels)}
+
+        return VariableProfile(
+            type=self.type,
+            missing_pct=(self.missing / self.rows * 100) if self.rows else 0.0,
+            profiled=self.profiled,
+            **details
+        )
+
+
+# ==========================================================
+# STUDY STATE
+# ==========================================================
+
+def plan_key(test_plan):
+    return (
+        test_plan["dependent_variable"],
+        test_plan["independent_variable"],
+        test_plan["selected_test"]
+    )
+
+
+class StudyState:
+    # Everything needed to fold new registry rows into existing results:
+    # the cleaning decisions, the cleaned rows (kept as chunks so an append
+    # never copies history), per-column aggregates and test accumulators.
+
+    def __init__(self, df_clean, data_profile):
+        self.columns = df_clean.columns.tolist()
+        self.numeric_columns = [c for c in self.columns if pd.api.types.is_numeric_dtype(df_clean[c])]
+        self.category_columns = [c for c in self.columns if isinstance(df_clean[c].dtype, pd.CategoricalDtype)]
+        self.chunks = [df_clean]
+        self._frame = df_clean
+
+        self.aggregates = {
+            col: ColumnAggregate(data_profile.variables[col].type, data_profile.variables[col].profiled)
+            for col in self.columns
+        }
+        for col, agg in self.aggregates.items():
+            agg.update(df_clean[col])
+
+        self.study_design = data_profile.study_design
+        self.subject_id = data_profile.subject_id
+        self.time_variable = data_profile.time_variable
+        self.accumulators = {}
+        self.full_recompute = {}
+
+    # ---------------------------
+    # Snapshot
+    # ---------------------------
+
+    @property
+    def frame(self):
+        if self._frame is None:
+            frame = pd.concat(self.chunks, ignore_index=True)
+            for col in self.category_columns:
+                frame[col] = frame[col].astype("category")
+            self.chunks = [frame]
+            self._frame = frame
+        return self._frame
+
+    @property
+    def n_rows(self):
+        return sum(len(c) for c in self.chunks)
+
+    def clean_rows(self, df):
+        # Apply the cleaning decisions frozen at study creation to new rows
+        df = df.copy()
+        df.columns = df.columns.astype(str).str.strip().str.replace("\u00a0", " ")
+
+        audit = []
+        missing = [c for c in self.columns if c not in df.columns]
+        extra = [c for c in df.columns if c not in self.columns]
+        if missing:
+            audit.append(f"Appended rows lack {len(missing)} column(s); filled as missing: {', '.join(missing)}.")
+        if extra:
+            audit.append(f"Ignored {len(extra)} column(s) not present in the study: {', '.join(extra)}.")
+
+        df = df.reindex(columns=self.columns)
+
+        for col in self.numeric_columns:
+            before_na = df[col].isna().sum()
+            df[col], _ = clean_numeric_series(df[col])
+            new_na = int(df[col].isna().sum() - before_na)
+            if new_na > 0:
+                audit.append(f"{new_na} value(s) in '{col}' could not be read as numbers and were set to missing.")
+
+        return df, audit
+
+    # ---------------------------
+    # Tests
+    # ---------------------------
+
+    def track(self, test_plan):
+        key = plan_key(test_plan)
+
+        try:
+            acc = TestAccumulator(test_plan)
+        except ValueError:
+            # Rank-based tests have no mergeable summary; recompute on demand
+            self.full_recompute[key] = test_plan
+            return execute_test(self.frame, test_plan)
+
+        for chunk in self.chunks:
+            acc.update(chunk)
+        self.accumulators[key] = acc
+        return acc.finalize()
+
+    def results(self):
+        out = {key: acc.finalize() for key, acc in self.accumulators.items()}
+        for key, plan in self.full_recompute.items():
+            out[key] = execute_test(self.frame, plan)
+        return out
+
+    def profile(self):
+        return DataProfile(
+            variables={col: agg.profile() for col, agg in self.aggregates.items()},
+            sample_size=self.n_rows,
+            group_sizes=None,
+            study_design=self.study_design,
+            subject_id=self.subject_id,
+            time_variable=self.time_variable,
+            warnings=[]
+        )
+
+    # ---------------------------
+    # Append
+    # ---------------------------
+
+    @traced()
+    def append(self, new_df):
+        delta, audit = self.clean_rows(new_df)
+
+        for col, agg in self.aggregates.items():
+            agg.update(delta[col])
+        for acc in self.accumulators.values():
+            acc.update(delta)
+
+        self.chunks.append(delta)
+        self._frame = None
+
+        audit.insert(0, f"Appended {len(delta)} new row(s); study now has {self.n_rows} row(s).")
+
+        return {
+            "profile": self.profile(),
+            "results": self.results(),
+            "audit_log": audit
+        }
@@ -0,0 +1,131 @@
+import sys
+import json
+import time
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# ---------------------------
+# Resource probes
+# ---------------------------
+
+def peak_rss_bytes():
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+# ---------------------------
+# Trace collection
+# ---------------------------
+
+class Trace:
+
+    def __init__(self, label=None):
+        self.label = label
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.spans = []
+
+    def add(self, span):
+        self.spans.append(span)
+
+    def total_wall(self):
+        if not self.spans:
+            return 0.0
+        return max(s["start"] + s["wall"] for s in self.spans)
+
+    def to_dict(self):
+        return {
+            "label": self.label,
+            "started_at": self.started_at,
+            "spans": sorted(self.spans, key=lambda s: s["start"])
+        }
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+_current_trace = ContextVar("medstats_trace", default=None)
+_current_depth = ContextVar("medstats_span_depth", default=0)
+
+
+def start_trace(label=None):
+    trace = Trace(label)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def dump_traces(traces, path):
+    with open(path, "w") as f:
+        json.dump([t.to_dict() for t in traces], f, indent=2)
+
+
+@contextmanager
+def span(name, **attrs):
+    trace = _current_trace.get()
+
+    # No active trace (API workers, scripts, benchmarks): measure nothing
+    if trace is None:
+        yield
+        return
+
+    depth = _current_depth.get()
+    token = _current_depth.set(depth + 1)
+
+    rss_before = peak_rss_bytes()
+    # Thread CPU time, so concurrent sessions on one server don't blur together
+    cpu_start = time.thread_time()
+    wall_start = time.perf_counter()
+    error = None
+
+    try:
+        yield
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        wall_end = time.perf_counter()
+        cpu_end = time.thread_time()
+        rss_after = peak_rss_bytes()
+        _current_depth.reset(token)
+
+        trace.add({
+            "name": name,
+            "depth": depth,
+            "start": wall_start - trace.origin,
+            "wall": wall_end - wall_start,
+            "cpu": cpu_end - cpu_start,
+            "peak_rss_delta": None if rss_before is None else rss_after - rss_before,
+            "error": error,
+            **attrs
+        })
+
+
+def traced(name=None):
+
+    def decorator(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,162 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from core.instrumentation import start_trace
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Job configuration
+# ---------------------------
+
+JOB_WORKERS = int(os.getenv("MEDSTATS_JOB_WORKERS", "4"))  # heavy stages running at once per server
+MAX_FINISHED = 200                                          # finished jobs kept for polling
+
+QUEUED, RUNNING, DONE, ERROR = "queued", "running", "done", "error"
+
+_local = threading.local()
+
+
+def report_progress(fraction, message=None):
+    # Called from inside long loops; a no-op unless the caller is running as a job
+    job = getattr(_local, "job", None)
+    if job is not None:
+        job.progress = min(1.0, max(0.0, float(fraction)))
+        if message is not None:
+            job.message = message
+
+
+class Job:
+
+    def __init__(self, key, label=None, session=None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.label = label
+        self.session = session
+        self.state = QUEUED
+        self.progress = 0.0
+        self.message = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.trace = None
+
+    @property
+    def active(self):
+        return self.state in (QUEUED, RUNNING)
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+
+# ==========================================================
+# JOB MANAGER
+# ==========================================================
+# One bounded thread pool per server process runs every heavy stage, so a
+# busy server queues work instead of oversubscribing cores (numpy/scipy
+# release the GIL, and execute_imputed still fans out to its own process
+# pool). Jobs are keyed by what they compute: submitting a key that is
+# already queued or running returns that job instead of starting a second
+# one, so a double click never repeats the work. A job leaves the key map
+# when it finishes (done or failed), so submitting the key again - a
+# "regenerate" button - runs it afresh; finished jobs stay pollable by id.
+
+class JobManager:
+
+    def __init__(self, max_workers=JOB_WORKERS, max_finished=MAX_FINISHED):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="medstats-job")
+        self.max_workers = max_workers
+        self.max_finished = max_finished
+        self._jobs = OrderedDict()     # id → Job, oldest first
+        self._by_key = {}              # key → id
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args, label=None, session=None, **kwargs):
+        with self._lock:
+            existing = self._jobs.get(self._by_key.get(key))
+            if existing is not None and existing.active:
+                self._jobs.move_to_end(existing.id)
+                return existing
+
+            job = Job(key, label=label, session=session)
+            self._jobs[job.id] = job
+            self._by_key[key] = job.id
+            self._evict()
+
+        self.executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.state = RUNNING
+        job.started = time.time()
+        # Each job gets its own trace, so instrumented stages stay visible in Diagnostics
+        job.trace = start_trace(label=f"job: {job.label or job.id[:8]}")
+        _local.job = job
+        try:
+            job.result = fn(*args, **kwargs)
+            job.progress = 1.0
+            job.state = DONE
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job.id, job.label)
+            job.error = str(e)
+            job.state = ERROR
+        finally:
+            _local.job = None
+            job.finished = time.time()
+            with self._lock:
+                if self._by_key.get(job.key) == job.id:
+                    del self._by_key[job.key]
+
+    def _evict(self):
+        finished = [j for j in self._jobs.values() if not j.active]
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job.id]
+            if self._by_key.get(job.key) == job.id:
+                del self._by_key[job.key]
+
+    # ---------------------------
+    # Queries
+    # ---------------------------
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, session=None):
+        with self._lock:
+            return [j for j in self._jobs.values() if session is None or j.session == session]
+
+    def stats(self):
+        with self._lock:
+            states = [j.state for j in self._jobs.values()]
+        return {
+            "workers": self.max_workers,
+            "queued": states.count(QUEUED),
+            "running": states.count(RUNNING),
+            "done": states.count(DONE),
+            "failed": states.count(ERROR)
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_jobs = None
+_jobs_lock = threading.Lock()
+
+
+def get_jobs():
+    global _jobs
+    with _jobs_lock:
+        if _jobs is None:
+            _jobs = JobManager()
+        return _jobs
@@ -0,0 +1,525 @@
+import os
+import re
+import json
+import math
+import uuid
+import hashlib
+import sqlite3
+import tempfile
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from contextlib import closing
+
+from core.instrumentation import traced
+
+# ---------------------------
+# Library configuration
+# ---------------------------
+
+LIBRARY_PATH = os.getenv(
+    "MEDSTATS_LITERATURE_DB",
+    os.path.join(tempfile.gettempdir(), "medstats_literature.sqlite")
+)
+BUNDLED_CORPUS = os.path.join(os.path.dirname(__file__), "references.bib")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Term frequency weight of each field in the index
+FIELD_WEIGHTS = {"title": 2, "keywords": 2, "abstract": 1, "authors": 1, "journal": 1}
+MAX_CITATIONS = 3
+
+# selected_test substring → topic tag in a reference's keywords; first match wins,
+# so the more specific names come first
+TEST_TOPICS = {
+    "Mann-Whitney": "mann-whitney",
+    "Wilcoxon": "wilcoxon",
+    "Paired": "paired t-test",
+    "t-test": "t-test",
+    "Repeated": "repeated measures",
+    "Friedman": "friedman",
+    "ANOVA": "anova",
+    "Kruskal": "kruskal-wallis",
+    "Fisher": "fisher exact",
+    "Chi-square": "chi-square",
+    "Pearson": "pearson correlation",
+    "Spearman": "spearman",
+    "Kaplan": "kaplan-meier",
+    "Log-rank": "log-rank",
+    "Logrank": "log-rank",
+    "Cox": "cox",
+    "Logistic": "logistic regression",
+    "regression": "linear regression"
+}
+
+
+def test_topic(test):
+    return next((topic for key, topic in TEST_TOPICS.items() if key in test), None)
+
+
+# ==========================================================
+# PARSERS
+# ==========================================================
+# Both formats are read into the same record dict: key, type, authors
+# (list of "Last, First"), year, title, journal, booktitle, volume, issue,
+# pages, publisher, edition, doi, abstract, keywords (list).
+
+ACCENTS = {"'": "\u0301", "`": "\u0300", "^": "\u0302", '"': "\u0308", "~": "\u0303", "c": "\u0327"}
+LATEX_ACCENT = re.compile(r"\{?\\(['`^\"~]|c )\{?([A-Za-z])\}?\}?")
+
+
+def latex_to_text(value):
+    # {\'e} / \'{e} / \'e → é; then drop the remaining grouping braces
+    value = LATEX_ACCENT.sub(
+        lambda m: unicodedata.normalize("NFC", m.group(2) + ACCENTS[m.group(1).strip()]), value
+    )
+    value = value.replace("\\&", "&").replace("--", "–").replace("~", " ")
+    return re.sub(r"\s+", " ", value.replace("{", "").replace("}", "")).strip()
+
+
+def split_keywords(value):
+    return [k.strip().lower() for k in re.split(r"[;,]", value) if k.strip()]
+
+
+def bibtex_value(text, i):
+    # Value starting at text[i]: {braced}, "quoted" or a bare word/number
+    if text[i] == "{":
+        depth, j = 0, i
+        while j < len(text):
+            depth += {"{": 1, "}": -1}.get(text[j], 0)
+            if depth == 0:
+                return text[i + 1:j], j + 1
+            j += 1
+        raise ValueError("Unbalanced braces in BibTeX entry.")
+    if text[i] == '"':
+        j = i + 1
+        while j < len(text) and (text[j] != '"' or text[j - 1] == "\\"):
+            j += 1
+        return text[i + 1:j], j + 1
+    match = re.match(r"[^,}\s]+", text[i:])
+    return match.group(0), i + match.end()
+
+
+def bibtex_authors(value):
+    # "First Last" → "Last, First"; a fully braced name is corporate and kept as is
+    authors = []
+    for name in re.split(r"\s+and\s+", value.strip()):
+        corporate = name.startswith("{") and name.endswith("}") and bibtex_value(name, 0)[1] == len(name)
+        name = latex_to_text(name)
+        if name and not corporate and "," not in name and " " in name:
+            first, last = name.rsplit(" ", 1)
+            name = f"{last}, {first}"
+        if name:
+            authors.append(name)
+    return authors
+
+
+BIB_ENTRY = re.compile(r"@(\w+)\s*\{\s*([^,\s]+)\s*,")
+BIB_FIELD = re.compile(r"\s*(\w[\w-]*)\s*=\s*")
+BIB_SEPARATOR = re.compile(r"\s*,?")
+
+
+def parse_bibtex(text):
+    records = []
+    for entry in BIB_ENTRY.finditer(text):
+        kind = entry.group(1).lower()
+        if kind in ("comment", "preamble", "string"):
+            continue
+
+        fields, i = {}, entry.end()
+        while True:
+            field = BIB_FIELD.match(text, i)
+            if not field:
+                break
+            value, i = bibtex_value(text, field.end())
+            name = field.group(1).lower()
+            fields[name] = bibtex_authors(value) if name == "author" else latex_to_text(value)
+            i = BIB_SEPARATOR.match(text, i).end()
+
+        records.append({
+            "key": entry.group(2),
+            "type": kind,
+            "authors": fields.get("author", []),
+            "year": fields.get("year"),
+            "title": fields.get("title"),
+            "journal": fields.get("journal"),
+            "booktitle": fields.get("booktitle"),
+            "volume": fields.get("volume"),
+            "issue": fields.get("number"),
+            "pages": fields.get("pages"),
+            "publisher": fields.get("publisher"),
+            "edition": fields.get("edition"),
+            "doi": fields.get("doi"),
+            "abstract": fields.get("abstract"),
+            "keywords": split_keywords(fields.get("keywords", ""))
+        })
+    return records
+
+
+RIS_TYPES = {"JOUR": "article", "BOOK": "book", "CHAP": "incollection", "CONF": "inproceedings"}
+
+
+def parse_ris(text):
+    records, tags = [], defaultdict(list)
+    for line in text.splitlines():
+        match = re.match(r"^([A-Z][A-Z0-9])  -\s?(.*)$", line.rstrip())
+        if not match:
+            continue
+        tag, value = match.groups()
+        if tag != "ER":
+            tags[tag].append(value.strip())
+            continue
+
+        def first(*names):
+            return next((tags[n][0] for n in names if tags.get(n)), None)
+
+        start, end = first("SP"), first("EP")
+        year = first("PY", "Y1", "DA")
+        records.append({
+            "key": first("ID"),
+            "type": RIS_TYPES.get(first("TY"), "article"),
+            "authors": tags.get("AU", []) + tags.get("A1", []),
+            "year": re.match(r"\d{4}", year).group(0) if year and re.match(r"\d{4}", year) else None,
+            "title": first("TI", "T1"),
+            "journal": first("JO", "JF", "T2", "JA"),
+            "booktitle": first("BT"),
+            "volume": first("VL"),
+            "issue": first("IS"),
+            "pages": f"{start}–{end}" if start and end else start,
+            "publisher": first("PB"),
+            "edition": first("ET"),
+            "doi": first("DO"),
+            "abstract": first("AB", "N2"),
+            "keywords": [k.lower() for k in tags.get("KW", [])]
+        })
+        tags = defaultdict(list)
+    return records
+
+
+def parse_library(data, filename):
+    text = data.decode("utf-8-sig", errors="replace") if isinstance(data, bytes) else data
+    if filename.lower().endswith(".ris") or re.search(r"^TY  - ", text, re.M):
+        return parse_ris(text)
+    return parse_bibtex(text)
+
+
+# ---------------------------
+# APA formatting
+# ---------------------------
+
+def apa_author(name):
+    # "Last, First M." → "Last, F. M."; corporate names (no comma) as given
+    if "," not in name:
+        return name
+    last, first = [p.strip() for p in name.split(",", 1)]
+    initials = " ".join(f"{p[0]}." for p in re.split(r"[\s.]+", first) if p)
+    return f"{last}, {initials}" if initials else last
+
+
+def apa_authors(authors):
+    names = [apa_author(a) for a in authors]
+    if len(names) <= 1:
+        return "".join(names)
+    if len(names) > 20:
+        # APA: first 19, an ellipsis, then the last author
+        return ", ".join(names[:19]) + ", ... " + names[-1]
+    return ", ".join(names[:-1]) + ", & " + names[-1]
+
+
+def ordinal(edition):
+    if not str(edition).isdigit():
+        return edition
+    n = int(edition)
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+
+def format_apa(record):
+    authors = apa_authors(record["authors"]) or record.get("title")
+    parts = [f"{authors} ({record.get('year') or 'n.d.'})."]
+    title = (record.get("title") or "").rstrip(".")
+
+    if record["type"] == "book":
+        edition = f" ({ordinal(record['edition'])} ed.)" if record.get("edition") else ""
+        parts.append(f"{title}{edition}.")
+        if record.get("publisher"):
+            parts.append(f"{record['publisher']}.")
+    elif record["type"] == "incollection" and record.get("booktitle"):
+        pages = f" (pp. {record['pages']})" if record.get("pages") else ""
+        parts.append(f"{title}. In {record['booktitle']}{pages}.")
+        if record.get("publisher"):
+            parts.append(f"{record['publisher']}.")
+    else:
+        parts.append(f"{title}.")
+        source = record.get("journal") or record.get("booktitle")
+        if source:
+            detail = source
+            if record.get("volume"):
+                detail += f", {record['volume']}"
+                if record.get("issue"):
+                    detail += f"({record['issue']})"
+            if record.get("pages"):
+                detail += f", {record['pages']}"
+            parts.append(f"{detail}.")
+
+    if record.get("doi"):
+        parts.append(f"https://doi.org/{record['doi']}")
+    return " ".join(parts)
+
+
+# ==========================================================
+# TOKENIZER
+# ==========================================================
+
+STOPWORDS = set("""
+a an and are as at be between by for from has have how in into is it its of on or that the their
+there these this to was were which with within without we our does do not than vs versus
+""".split())
+
+
+def stem(token):
+    # Light plural folding so "tables" meets "table"; identical on both sides of a query
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode().lower()
+    return [stem(t) for t in re.findall(r"[a-z0-9]+", text) if len(t) > 1 and t not in STOPWORDS]
+
+
+def record_terms(record):
+    fields = {
+        "title": record.get("title"),
+        "keywords": " ".join(record.get("keywords") or []),
+        "abstract": record.get("abstract"),
+        "authors": " ".join(record.get("authors") or []),
+        "journal": record.get("journal") or record.get("booktitle")
+    }
+    counts = Counter()
+    for field, text in fields.items():
+        for token in tokenize(text):
+            counts[token] += FIELD_WEIGHTS[field]
+    return counts
+
+
+def record_id(record):
+    # DOI when there is one, so the same paper from two libraries is stored once
+    if record.get("doi"):
+        return "doi:" + record["doi"].lower()
+    return "ref:" + " ".join(tokenize(record.get("title")))[:200] + f":{record.get('year')}"
+
+
+# ==========================================================
+# ON-DISK INDEX
+# ==========================================================
+# Inverted index in SQLite: one postings row per (term, reference) with the
+# field-weighted term frequency, plus each reference's length for BM25
+# normalisation. A query reads only the postings of its own terms through
+# the primary key, so lookups stay in the millisecond range however large
+# the library grows. The bundled corpus is re-indexed whenever the shipped
+# .bib file changes; imported libraries are kept across restarts.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS refs (
+    id INTEGER PRIMARY KEY,
+    ref_key TEXT UNIQUE NOT NULL,
+    source TEXT NOT NULL,
+    year INTEGER,
+    length INTEGER NOT NULL,
+    citation TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    ref INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, ref)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS topics (
+    topic TEXT NOT NULL,
+    ref INTEGER NOT NULL,
+    PRIMARY KEY (topic, ref)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_ref ON postings (ref);
+CREATE INDEX IF NOT EXISTS topics_ref ON topics (ref);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class LiteratureIndex:
+
+    def __init__(self, path=LIBRARY_PATH, corpus=BUNDLED_CORPUS):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        self._load_bundled(corpus)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _load_bundled(self, corpus):
+        with open(corpus, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+
+        # IMMEDIATE takes the write lock before checking, so server processes
+        # starting together index the corpus once
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            stored = conn.execute("SELECT value FROM meta WHERE key = 'bundled'").fetchone()
+            if stored and stored[0] == digest:
+                return
+            old = [r for (r,) in conn.execute("SELECT id FROM refs WHERE source = 'bundled'")]
+            self._delete(conn, old)
+            self._insert(conn, parse_bibtex(data.decode("utf-8")), "bundled")
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('bundled', ?)", (digest,))
+
+    # ---------------------------
+    # Writes
+    # ---------------------------
+
+    def _delete(self, conn, ids):
+        for table, column in (("postings", "ref"), ("topics", "ref"), ("refs", "id")):
+            conn.executemany(f"DELETE FROM {table} WHERE {column} = ?", [(i,) for i in ids])
+
+    def _insert(self, conn, records, source):
+        added = 0
+        for record in records:
+            if not record.get("title"):
+                continue
+            terms = record_terms(record)
+            key = record_id(record)
+            existing = conn.execute("SELECT id FROM refs WHERE ref_key = ?", (key,)).fetchone()
+            if existing:
+                self._delete(conn, [existing[0]])
+
+            year = record.get("year")
+            cursor = conn.execute(
+                "INSERT INTO refs (ref_key, source, year, length, citation, record) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, source, int(year) if year and year.isdigit() else None,
+                 sum(terms.values()), format_apa(record), json.dumps(record))
+            )
+            ref = cursor.lastrowid
+            conn.executemany("INSERT INTO postings VALUES (?, ?, ?)", [(t, ref, tf) for t, tf in terms.items()])
+            conn.executemany(
+                "INSERT OR IGNORE INTO topics VALUES (?, ?)",
+                [(k, ref) for k in record.get("keywords") or []]
+            )
+            added += 1
+
+        self._touch(conn)
+        return added
+
+    def _touch(self, conn):
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (uuid.uuid4().hex,))
+
+    @traced()
+    def import_library(self, data, filename, source=None):
+        # Returns the number of references added or replaced
+        records = parse_library(data, filename)
+        if not records:
+            raise ValueError(f"No BibTeX or RIS references found in {filename}.")
+        with self._lock, closing(self._connect()) as conn, conn:
+            return self._insert(conn, records, source or filename)
+
+    def remove_source(self, source):
+        with self._lock, closing(self._connect()) as conn, conn:
+            ids = [r for (r,) in conn.execute("SELECT id FROM refs WHERE source = ?", (source,))]
+            self._delete(conn, ids)
+            self._touch(conn)
+        return len(ids)
+
+    # ---------------------------
+    # Queries
+    # ---------------------------
+
+    def version(self):
+        # Changes on every import, so cached lookups can key on it
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0] if row else None
+
+    def sources(self):
+        with closing(self._connect()) as conn:
+            return dict(conn.execute("SELECT source, COUNT(*) FROM refs GROUP BY source ORDER BY source").fetchall())
+
+    def _references(self, conn, ids):
+        rows = conn.execute(
+            f"SELECT id, source, citation, record FROM refs WHERE id IN ({', '.join('?' * len(ids))})", ids
+        ).fetchall()
+        found = {
+            i: {"id": i, "source": source, "citation": citation, **json.loads(record)}
+            for i, source, citation, record in rows
+        }
+        return [found[i] for i in ids if i in found]
+
+    @traced()
+    def for_test(self, test, limit=MAX_CITATIONS):
+        # Method references tagged with the test's topic, bundled corpus first, oldest first
+        topic = test_topic(test)
+        if topic is None:
+            return []
+        with closing(self._connect()) as conn:
+            ids = [r for (r,) in conn.execute(
+                """SELECT r.id FROM topics t JOIN refs r ON r.id = t.ref WHERE t.topic = ?
+                   ORDER BY r.source != 'bundled', r.year IS NULL, r.year, r.id LIMIT ?""",
+                (topic, limit)
+            )]
+            return self._references(conn, ids)
+
+    @traced()
+    def search(self, query, limit=8):
+        # Okapi BM25 over the field-weighted postings; each hit carries its score
+        # and the query terms it matched
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        with closing(self._connect()) as conn:
+            n_docs, avg_length = conn.execute("SELECT COUNT(*), AVG(length) FROM refs").fetchone()
+            if not n_docs:
+                return []
+            placeholders = ", ".join("?" * len(terms))
+            postings = conn.execute(
+                f"""SELECT p.term, p.ref, p.tf, r.length FROM postings p JOIN refs r ON r.id = p.ref
+                    WHERE p.term IN ({placeholders})""",
+                terms
+            ).fetchall()
+
+            doc_freq = Counter(term for term, _, _, _ in postings)
+            scores, matched = defaultdict(float), defaultdict(list)
+            for term, ref, tf, length in postings:
+                idf = math.log(1 + (n_docs - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                scores[ref] += idf * tf * (BM25_K1 + 1) / norm
+                matched[ref].append(term)
+
+            ranked = sorted(scores, key=lambda r: (-scores[r], r))[:limit]
+            hits = self._references(conn, ranked)
+
+        for hit in hits:
+            hit["score"] = round(scores[hit["id"]], 3)
+            hit["matched_terms"] = matched[hit["id"]]
+        return hits
+
+
+_library = None
+_library_lock = threading.Lock()
+
+
+def get_library():
+    global _library
+    with _library_lock:
+        if _library is None:
+            _library = LiteratureIndex()
+        return _library
@@ -0,0 +1,197 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from core.instrumentation import traced
+
+MAD_SCALE = 1.4826          # MAD → SD for normal data
+MAD_THRESHOLD = 3.5         # Iglewicz & Hoaglin modified z-score cutoff
+IQR_MULTIPLIER = 1.5        # Tukey fences
+MAHALANOBIS_QUANTILE = 0.999
+
+
+# ---------------------------
+# Fence cache
+# ---------------------------
+# Median, MAD and quartiles per (numeric column content, column name).
+# Reruns and re-screens with another method or column subset only sort the
+# columns that have not been seen yet.
+
+FENCE_CACHE_SIZE = 4096
+_fence_cache = OrderedDict()
+
+
+def clear_fence_cache():
+    _fence_cache.clear()
+
+
+def numeric_block(df, columns):
+    block = df[columns]
+    if not all(pd.api.types.is_numeric_dtype(block[c]) for c in columns):
+        block = block.apply(pd.to_numeric, errors="coerce")
+    # Column-major so each column hashes and sorts as one contiguous run
+    return np.asfortranarray(block.to_numpy(dtype=float, na_value=np.nan))
+
+
+def sorted_quantiles(sorted_block, counts, probs):
+    # Linear-interpolation quantiles of each column of a NaN-last sorted
+    # block, all columns at once; columns without data give NaN
+    out = np.full((len(probs), sorted_block.shape[1]), np.nan)
+    valid = counts > 0
+    if not valid.any():
+        return out
+
+    cols = np.flatnonzero(valid)
+    last = counts[valid] - 1
+    for i, p in enumerate(probs):
+        pos = p * last
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, last)
+        frac = pos - lo
+        a = sorted_block[lo, cols]
+        b = sorted_block[hi, cols]
+        out[i, cols] = a + (b - a) * frac
+    return out
+
+
+def compute_fences(block):
+    # One sort for the quartiles and median, one for the absolute deviations
+    counts = (~np.isnan(block)).sum(axis=0)
+    q1, median, q3 = sorted_quantiles(np.sort(block, axis=0), counts, [0.25, 0.5, 0.75])
+    mad = sorted_quantiles(np.sort(np.abs(block - median), axis=0), counts, [0.5])[0]
+    return np.vstack([median, mad, q1, q3])
+
+
+def column_fences(columns, block):
+    keys = [(hashlib.blake2b(block[:, j].tobytes(), digest_size=16).hexdigest(), c) for j, c in enumerate(columns)]
+    fences = np.empty((4, len(columns)))
+
+    new = []
+    for j, key in enumerate(keys):
+        if key in _fence_cache:
+            _fence_cache.move_to_end(key)
+            fences[:, j] = _fence_cache[key]
+        else:
+            new.append(j)
+
+    if new:
+        computed = compute_fences(block[:, new])
+        for pos, j in enumerate(new):
+            fences[:, j] = computed[:, pos]
+            _fence_cache[keys[j]] = computed[:, pos]
+        while len(_fence_cache) > FENCE_CACHE_SIZE:
+            _fence_cache.popitem(last=False)
+
+    return fences
+
+
+def fence_bounds(fences, method):
+    median, mad, q1, q3 = fences
+
+    if method == "iqr":
+        spread = IQR_MULTIPLIER * (q3 - q1)
+        lower, upper = q1 - spread, q3 + spread
+    elif method == "mad":
+        spread = MAD_THRESHOLD * MAD_SCALE * mad
+        lower, upper = median - spread, median + spread
+    else:
+        raise ValueError(f"Unknown outlier method: {method}")
+
+    # Zero spread (over half the values identical) would flag every other
+    # value; such columns are not screened
+    degenerate = ~(spread > 0)
+    return np.where(degenerate, -np.inf, lower), np.where(degenerate, np.inf, upper)
+
+
+def sorted_outlier_count(values, method="mad"):
+    # detect_outliers' count for one column whose non-missing values are
+    # already sorted: the quantiles are read off directly and the absolute
+    # deviations form two sorted runs, merged in linear time
+    counts = np.array([len(values)])
+    q1, median, q3 = sorted_quantiles(values[:, None], counts, [0.25, 0.5, 0.75])[:, 0]
+    split = np.searchsorted(values, median)
+    deviations = np.concatenate([median - values[:split][::-1], values[split:] - median])
+    deviations.sort(kind="stable")
+    mad = sorted_quantiles(deviations[:, None], counts, [0.5])[0, 0]
+
+    lower, upper = fence_bounds(np.array([[median], [mad], [q1], [q3]]), method)
+    below = np.searchsorted(values, lower[0], side="left")
+    above = len(values) - np.searchsorted(values, upper[0], side="right")
+    return int(below + above)
+
+
+# ==========================================================
+# MULTIVARIATE SCREEN
+# ==========================================================
+
+def mahalanobis_sq(x, center, cov):
+    diff = x - center
+    return np.einsum("ij,jk,ik->i", diff, np.linalg.pinv(cov), diff)
+
+
+@traced()
+def mahalanobis_outliers(df, columns, quantile=MAHALANOBIS_QUANTILE):
+    # Squared distances against a χ²(p) cutoff on complete rows, with one
+    # reweighting step so a cluster of outliers cannot inflate the
+    # covariance enough to hide itself
+    block = numeric_block(df, columns)
+    complete = ~np.isnan(block).any(axis=1)
+    x = block[complete]
+    n, p = x.shape
+    if n <= p + 1:
+        return None
+
+    cutoff = stats.chi2.ppf(quantile, p)
+    d2 = mahalanobis_sq(x, x.mean(axis=0), np.cov(x, rowvar=False))
+
+    inside = d2 <= cutoff
+    if not inside.all() and inside.sum() > p + 1:
+        # Consistency factor for a covariance estimated inside the cutoff
+        scale = quantile / stats.chi2.cdf(cutoff, p + 2)
+        d2 = mahalanobis_sq(x, x[inside].mean(axis=0), np.cov(x[inside], rowvar=False) * scale)
+
+    flagged = d2 > cutoff
+    return {
+        "columns": list(columns),
+        "cutoff": float(cutoff),
+        "n_complete": int(n),
+        "count": int(flagged.sum()),
+        "rows": df.index[np.flatnonzero(complete)[flagged]].tolist()
+    }
+
+
+# ==========================================================
+# ENTRY POINT
+# ==========================================================
+
+@traced()
+def detect_outliers(df, columns, method="mad", multivariate=False):
+    columns = list(columns)
+    result = {"method": method, "columns": {}, "multivariate": None}
+    if not columns:
+        return result
+
+    block = numeric_block(df, columns)
+    lower, upper = fence_bounds(column_fences(columns, block), method)
+
+    # NaN compares False on both sides, so missing values are never flagged
+    flags = (block < lower) | (block > upper)
+    counts = flags.sum(axis=0)
+    _, rows = np.nonzero(flags.T)
+    per_column = np.split(rows, np.cumsum(counts)[:-1])
+
+    for j, col in enumerate(columns):
+        result["columns"][col] = {
+            "count": int(counts[j]),
+            "rows": df.index[per_column[j]].tolist(),
+            "lower": float(lower[j]),
+            "upper": float(upper[j])
+        }
+
+    if multivariate and len(columns) > 1:
+        result["multivariate"] = mahalanobis_outliers(df, columns)
+
+    return result
@@ -0,0 +1,201 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+from concurrent.futures import ProcessPoolExecutor
+from core.instrumentation import traced
+from core.jobs import report_progress
+
+
+# ==========================================================
+# ANALYTIC POWER (broadcast over effect × n × alpha)
+# ==========================================================
+# Effect sizes follow Cohen: d for t-tests, f for ANOVA, w for chi-square,
+# r for correlations. n is per group for t-test/ANOVA/rank tests and the
+# total sample size for chi-square and correlations.
+
+def power_ttest(d, n, alpha, ratio=1.0):
+    d, n, alpha = np.broadcast_arrays(*map(np.asarray, (d, n, alpha)))
+    n1 = n.astype(float)
+    n2 = n1 * ratio
+    df = n1 + n2 - 2
+    nc = d * np.sqrt(n1 * n2 / (n1 + n2))
+    t_crit = stats.t.isf(alpha / 2, df)
+    return stats.nct.sf(t_crit, df, nc) + stats.nct.cdf(-t_crit, df, nc)
+
+
+def power_anova(f, n, alpha, k=3):
+    f, n, alpha = np.broadcast_arrays(*map(np.asarray, (f, n, alpha)))
+    total = k * n.astype(float)
+    df1, df2 = k - 1, total - k
+    f_crit = stats.f.isf(alpha, df1, df2)
+    return stats.ncf.sf(f_crit, df1, df2, f ** 2 * total)
+
+
+def power_chisquare(w, n, alpha, df=1):
+    w, n, alpha = np.broadcast_arrays(*map(np.asarray, (w, n, alpha)))
+    crit = stats.chi2.isf(alpha, df)
+    return stats.ncx2.sf(crit, df, w ** 2 * n)
+
+
+def power_correlation(r, n, alpha, method="pearson"):
+    r, n, alpha = np.broadcast_arrays(*map(np.asarray, (r, n, alpha)))
+    # Fisher z; Spearman uses the Fieller-Hartley-Pearson variance 1.06 / (n - 3)
+    scale = 1.06 if method == "spearman" else 1.0
+    se = np.sqrt(scale / (n - 3.0))
+    z = np.arctanh(r) / se
+    z_crit = stats.norm.isf(alpha / 2)
+    return stats.norm.sf(z_crit - z) + stats.norm.cdf(-z_crit - z)
+
+
+# ==========================================================
+# SIMULATED POWER FOR RANK TESTS
+# ==========================================================
+# Groups are drawn from the chosen distribution (standardised to SD 1)
+# and shifted in equal steps so the first and last group differ by
+# `effect` SDs. Replicates are generated and ranked in 2-D batches sized
+# so each batch holds about SIM_BATCH_ELEMENTS draws, whatever k and n are.
+
+SIM_BATCH_ELEMENTS = 2_000_000    # ~16 MB of float64 per array in a batch
+
+def draw(rng, distribution, shape):
+    if distribution == "lognormal":
+        sigma = 0.75
+        x = rng.lognormal(0.0, sigma, shape)
+        return x / np.sqrt((np.exp(sigma ** 2) - 1) * np.exp(sigma ** 2))
+    if distribution == "exponential":
+        return rng.exponential(1.0, shape)
+    return rng.standard_normal(shape)
+
+
+def simulate_pvalues(effect, n, k, n_sims, distribution, seed, budget=SIM_BATCH_ELEMENTS):
+    rng = np.random.default_rng(seed)
+    shifts = effect * np.arange(k) / (k - 1)
+    total = k * n
+    batch = max(1, budget // total)
+    pvalues = []
+
+    for start in range(0, n_sims, batch):
+        b = min(batch, n_sims - start)
+        x = draw(rng, distribution, (b, k, n)) + shifts[None, :, None]
+        ranks = stats.rankdata(x.reshape(b, total), axis=1).reshape(b, k, n)
+        rank_sums = ranks.sum(axis=2)
+
+        # Continuous draws: no ties, so no tie correction is needed
+        if k == 2:
+            u1 = rank_sums[:, 0] - n * (n + 1) / 2
+            u = np.maximum(u1, n * n - u1)
+            s = np.sqrt(n * n * (total + 1) / 12)
+            p = np.minimum(1.0, 2 * stats.norm.sf((u - n * n / 2 - 0.5) / s))
+        else:
+            h = 12 / (total * (total + 1)) * (rank_sums ** 2 / n).sum(axis=1) - 3 * (total + 1)
+            p = stats.chi2.sf(h, k - 1)
+
+        pvalues.append(p)
+
+    return np.concatenate(pvalues)
+
+
+def simulate_point(args):
+    effect, n, k, n_sims, distribution, seed, alphas = args
+    p = simulate_pvalues(effect, int(n), k, n_sims, distribution, seed)
+    return (p[:, None] < np.asarray(alphas)[None, :]).mean(axis=0)
+
+
+def collect_points(points, total):
+    results = []
+    for result in points:
+        results.append(result)
+        report_progress(len(results) / total, f"Simulated {len(results)} of {total} grid points")
+    return results
+
+
+def simulate_power(effects, ns, alphas, k=2, n_sims=1000, distribution="normal", seed=0, max_workers=None):
+    effects = np.atleast_1d(effects)
+    ns = np.atleast_1d(ns)
+    alphas = np.atleast_1d(alphas)
+
+    points = [(e, n) for e in effects for n in ns]
+    seeds = np.random.SeedSequence(seed).spawn(len(points))
+    jobs = [(e, n, k, n_sims, distribution, s, alphas) for (e, n), s in zip(points, seeds)]
+
+    if max_workers == 1 or len(jobs) == 1:
+        results = collect_points(map(simulate_point, jobs), len(jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = collect_points(pool.map(simulate_point, jobs), len(jobs))
+
+    return np.array(results).reshape(len(effects), len(ns), len(alphas))
+
+
+# ==========================================================
+# GRID INTERFACE
+# ==========================================================
+
+def power_kind(test):
+    if "Mann-Whitney" in test:
+        return "Mann-Whitney"
+    if "t-test" in test:
+        return "t-test"
+    if "ANOVA" in test:
+        return "ANOVA"
+    if "Kruskal" in test:
+        return "Kruskal"
+    if "Chi-square" in test:
+        return "Chi-square"
+    if "Pearson" in test:
+        return "Pearson"
+    if "Spearman" in test:
+        return "Spearman"
+    raise ValueError(f"Unsupported test: {test}")
+
+
+def analytic_power(kind, effect, n, alpha, k=3, df=1):
+    if kind == "t-test":
+        return power_ttest(effect, n, alpha)
+    if kind == "ANOVA":
+        return power_anova(effect, n, alpha, k)
+    if kind == "Chi-square":
+        return power_chisquare(effect, n, alpha, df)
+    return power_correlation(effect, n, alpha, kind.lower())
+
+
+@traced()
+def power_grid(test, effect_sizes, sample_sizes, alphas=(0.05,), k=3, df=1,
+               n_sims=1000, distribution="normal", seed=0, max_workers=None):
+    kind = power_kind(test)
+    effects = np.atleast_1d(np.asarray(effect_sizes, dtype=float))
+    ns = np.atleast_1d(np.asarray(sample_sizes, dtype=int))
+    alphas = np.atleast_1d(np.asarray(alphas, dtype=float))
+
+    if kind in ("Mann-Whitney", "Kruskal"):
+        groups = 2 if kind == "Mann-Whitney" else k
+        power = simulate_power(effects, ns, alphas, groups, n_sims, distribution, seed, max_workers)
+    else:
+        e, n, a = np.meshgrid(effects, ns, alphas, indexing="ij")
+        power = analytic_power(kind, e, n, a, k, df)
+
+    e, n, a = np.meshgrid(effects, ns, alphas, indexing="ij")
+    return pd.DataFrame({
+        "effect_size": e.ravel(),
+        "n": n.ravel(),
+        "alpha": a.ravel(),
+        "power": np.asarray(power).ravel()
+    })
+
+
+def required_sample_size(test, effect_size, power=0.8, alpha=0.05, k=3, df=1, max_n=1_000_000):
+    kind = power_kind(test)
+    if kind in ("Mann-Whitney", "Kruskal"):
+        raise ValueError("Use power_grid with simulation for rank-based tests.")
+
+    # Bracket by doubling, then scan the bracket in one vectorised call
+    low = 4 if kind in ("Pearson", "Spearman") else 2
+    high = low
+    while analytic_power(kind, effect_size, high, alpha, k, df) < power:
+        low, high = high, high * 2
+        if high > max_n:
+            return None
+
+    candidates = np.arange(low, high + 1)
+    reached = analytic_power(kind, effect_size, candidates, alpha, k, df) >= power
+    return int(candidates[np.argmax(reached)])
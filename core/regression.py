@@ -0,0 +1,288 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+import statsmodels.api as sm
+from core.instrumentation import traced
+
+
+# ---------------------------
+# Design matrix
+# ---------------------------
+
+def is_categorical(series):
+    return not pd.api.types.is_numeric_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype)
+
+
+def build_design(df, predictors):
+    # Treatment coding with the first sorted level as reference
+    parts = [pd.Series(1.0, index=df.index, name="Intercept")]
+    terms = {}
+
+    for col in predictors:
+        s = df[col]
+        if is_categorical(s):
+            levels = sorted(s.dropna().unique().tolist(), key=str)
+            dummies = pd.DataFrame(
+                {f"{col}[{lvl}]": (s == lvl).astype(float) for lvl in levels[1:]},
+                index=df.index
+            )
+            dummies.loc[s.isna()] = np.nan
+            parts.append(dummies)
+            terms[col] = dummies.columns.tolist()
+        else:
+            parts.append(s.astype(float).rename(col))
+            terms[col] = [col]
+
+    return pd.concat(parts, axis=1), terms
+
+
+def complete_rows(df, columns):
+    return df[columns].notna().all(axis=1).to_numpy()
+
+
+def binary_outcome(series):
+    levels = sorted(series.dropna().unique().tolist(), key=str)
+    if len(levels) != 2:
+        raise ValueError(f"Logistic regression needs a binary outcome; found {len(levels)} levels.")
+    # Second sorted level is the event (e.g. 0/1, No/Yes)
+    return (series == levels[1]).astype(float).where(series.notna()), levels[1]
+
+
+# ---------------------------
+# Result shaping
+# ---------------------------
+
+def coefficient_rows(names, params, se, stat, p, ci, exponentiate=False):
+    rows = []
+    for i, name in enumerate(names):
+        est, lo, hi = params[i], ci[i][0], ci[i][1]
+        if exponentiate:
+            est, lo, hi = np.exp(est), np.exp(lo), np.exp(hi)
+        rows.append({
+            "term": name,
+            "estimate": float(est),
+            "se": float(se[i]),
+            "statistic": float(stat[i]),
+            "p_value": float(p[i]),
+            "ci_low": float(lo),
+            "ci_high": float(hi)
+        })
+    return rows
+
+
+def exposure_summary(fit, terms, exposure, coefficients, exponentiate):
+    # One exposure term → its adjusted estimate and CI; several dummies → joint Wald test
+    exposure_terms = terms[exposure]
+
+    if len(exposure_terms) == 1:
+        row = next(r for r in coefficients if r["term"] == exposure_terms[0])
+        return row["statistic"], row["p_value"], row["estimate"], [row["ci_low"], row["ci_high"]]
+
+    names = list(fit.params.index)
+    restriction = np.zeros((len(exposure_terms), len(names)))
+    for i, term in enumerate(exposure_terms):
+        restriction[i, names.index(term)] = 1.0
+    wald = fit.wald_test(restriction, scalar=True)
+    return float(wald.statistic), float(wald.pvalue), None, None
+
+
+# ---------------------------
+# Models
+# ---------------------------
+
+@traced()
+def fit_ols(df, outcome, predictors, cov_type="HC3"):
+    mask = complete_rows(df, [outcome] + predictors)
+    X, terms = build_design(df.loc[mask], predictors)
+    y = df.loc[mask, outcome].astype(float)
+
+    fit = sm.OLS(y, X).fit(cov_type=cov_type, use_t=True)
+    coefficients = coefficient_rows(
+        X.columns, fit.params.to_numpy(), fit.bse.to_numpy(),
+        fit.tvalues.to_numpy(), fit.pvalues.to_numpy(), fit.conf_int().to_numpy()
+    )
+    return fit, terms, coefficients
+
+
+@traced()
+def fit_logistic(df, outcome, predictors, cov_type="HC1"):
+    mask = complete_rows(df, [outcome] + predictors)
+    X, terms = build_design(df.loc[mask], predictors)
+    y, event = binary_outcome(df.loc[mask, outcome])
+
+    fit = sm.Logit(y, X).fit(disp=0, cov_type=cov_type)
+    coefficients = coefficient_rows(
+        X.columns, fit.params.to_numpy(), fit.bse.to_numpy(),
+        fit.tvalues.to_numpy(), fit.pvalues.to_numpy(), fit.conf_int().to_numpy(),
+        exponentiate=True
+    )
+    return fit, terms, coefficients, event
+
+
+def run_regression(df, test_plan):
+    dv = test_plan["dependent_variable"]
+    iv = test_plan["independent_variable"]
+    covariates = [c for c in test_plan.get("covariates") or [] if c not in (dv, iv)]
+    predictors = [iv] + covariates
+    cov_type = test_plan.get("cov_type")
+
+    if "Logistic" in test_plan["selected_test"]:
+        fit, terms, coefficients, event = fit_logistic(df, dv, predictors, cov_type or "HC1")
+        stat, p, effect, ci = exposure_summary(fit, terms, iv, coefficients, exponentiate=True)
+        model = {
+            "effect_measure": "odds ratio",
+            "event_level": str(event),
+            "pseudo_r_squared": float(fit.prsquared),
+            "lr_chi2": float(fit.llr),
+            "lr_p_value": float(fit.llr_pvalue),
+        }
+    else:
+        fit, terms, coefficients = fit_ols(df, dv, predictors, cov_type or "HC3")
+        stat, p, effect, ci = exposure_summary(fit, terms, iv, coefficients, exponentiate=False)
+        model = {
+            "effect_measure": "unstandardized B",
+            "r_squared": float(fit.rsquared),
+            "adj_r_squared": float(fit.rsquared_adj),
+            "model_f": float(np.squeeze(fit.fvalue)),
+            "model_f_p_value": float(fit.f_pvalue),
+        }
+
+    return {
+        "test": test_plan["selected_test"],
+        "statistic": float(stat),
+        "p_value": float(p),
+        "effect_size": None if effect is None else float(effect),
+        "confidence_interval": ci,
+        "group_statistics": None,
+        "n": int(fit.nobs),
+        "covariates": covariates,
+        "cov_type": fit.cov_type,
+        "coefficients": coefficients,
+        "model": model
+    }
+
+
+# ==========================================================
+# FAST MULTI-OUTCOME OLS
+# ==========================================================
+# Outcomes that share a missingness pattern share one design matrix, so
+# X = QR is factorized once per pattern and every outcome in the pattern
+# is solved together: B = R⁻¹QᵀY. HC3 covariances come from the same Q.
+
+def qr_fit_block(X, Y, robust=True):
+    # Returns B (k × m), one k × k covariance per outcome, residual df and R²
+    n, k = X.shape
+    if n <= k:
+        raise ValueError(f"Only {n} complete rows for {k} model terms.")
+    Q, R = np.linalg.qr(X)
+    if np.min(np.abs(np.diag(R))) < 1e-10 * np.max(np.abs(np.diag(R))):
+        raise ValueError("Design matrix is rank deficient; check for collinear covariates.")
+
+    R_inv = np.linalg.inv(R)
+    B = R_inv @ (Q.T @ Y)
+    E = Y - X @ B
+    df_resid = n - k
+
+    if robust:
+        leverage = np.sum(Q ** 2, axis=1)
+        W = E ** 2 / (1 - leverage[:, None]) ** 2
+        meat = np.einsum("ni,nj,nm->mij", Q, Q, W)
+        cov = R_inv[None] @ meat @ R_inv.T[None]
+    else:
+        sigma2 = np.sum(E ** 2, axis=0) / df_resid
+        cov = sigma2[:, None, None] * (R_inv @ R_inv.T)[None]
+
+    ss_res = np.sum(E ** 2, axis=0)
+    ss_tot = np.sum((Y - Y.mean(axis=0)) ** 2, axis=0)
+
+    return B, cov, df_resid, 1 - ss_res / ss_tot
+
+
+def ols_blocks(df, outcomes, predictors):
+    # Design column names, predictor → term mapping, and one block per
+    # missingness pattern: (outcome indices, row mask, X, Y)
+    base_mask = complete_rows(df, predictors)
+    X_all, terms = build_design(df, predictors)
+    X_values = X_all.to_numpy(dtype=float)
+    outcome_block = df[outcomes].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    valid = ~np.isnan(outcome_block) & base_mask[:, None]
+
+    patterns = {}
+    for j in range(len(outcomes)):
+        patterns.setdefault(valid[:, j].tobytes(), []).append(j)
+
+    blocks = []
+    for cols in patterns.values():
+        mask = valid[:, cols[0]]
+        blocks.append((cols, mask, X_values[mask], outcome_block[np.ix_(mask, cols)]))
+
+    return list(X_all.columns), terms, blocks
+
+
+@traced()
+def fit_ols_many(df, outcomes, predictors, robust=True, alpha=0.05):
+    names, _, blocks = ols_blocks(df, outcomes, predictors)
+
+    rows = []
+    for cols, mask, X, Y in blocks:
+        B, cov, df_resid, r2 = qr_fit_block(X, Y, robust)
+        se = np.sqrt(np.diagonal(cov, axis1=1, axis2=2)).T
+        t = B / se
+        p = 2 * stats.t.sf(np.abs(t), df_resid)
+        crit = stats.t.isf(alpha / 2, df_resid)
+
+        for c, j in enumerate(cols):
+            for i, term in enumerate(names):
+                rows.append({
+                    "outcome": outcomes[j],
+                    "term": term,
+                    "estimate": B[i, c],
+                    "se": se[i, c],
+                    "statistic": t[i, c],
+                    "p_value": p[i, c],
+                    "ci_low": B[i, c] - crit * se[i, c],
+                    "ci_high": B[i, c] + crit * se[i, c],
+                    "n": int(mask.sum()),
+                    "r_squared": r2[c]
+                })
+
+    return pd.DataFrame(rows)
+
+
+@traced()
+def exposure_many(df, outcomes, exposure, covariates=(), robust=True):
+    # The adjusted exposure test run_regression reports, for every outcome at
+    # once: one term → its t and estimate, several dummies → a joint Wald F.
+    # Patterns that cannot be fitted (too few rows, an absent level) stay NaN.
+    names, terms, blocks = ols_blocks(df, outcomes, [exposure] + list(covariates))
+    idx = [names.index(t) for t in terms[exposure]]
+
+    out = pd.DataFrame({
+        "outcome": outcomes,
+        "n": 0,
+        "statistic": np.nan,
+        "p_value": np.nan,
+        "estimate": np.nan,
+        "df_resid": np.nan
+    })
+    for cols, mask, X, Y in blocks:
+        try:
+            B, cov, df_resid, _ = qr_fit_block(X, Y, robust)
+        except ValueError:
+            continue
+
+        b = B[idx].T
+        V = cov[:, idx][:, :, idx]
+        if len(idx) == 1:
+            stat = b[:, 0] / np.sqrt(V[:, 0, 0])
+            p = 2 * stats.t.sf(np.abs(stat), df_resid)
+            out.loc[cols, "estimate"] = b[:, 0]
+        else:
+            stat = np.einsum("mi,mi->m", b, np.linalg.solve(V, b[..., None])[..., 0]) / len(idx)
+            p = stats.f.sf(stat, len(idx), df_resid)
+        out.loc[cols, ["n", "statistic", "p_value", "df_resid"]] = np.column_stack(
+            [np.full(len(cols), mask.sum()), stat, p, np.full(len(cols), df_resid)]
+        )
+
+    out.attrs["terms"] = terms[exposure]
+    return out
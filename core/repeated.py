@@ -0,0 +1,230 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from core.stats_engine import factorize_groups
+from core.instrumentation import traced
+
+
+# "Wilcoxon" alone would also catch the rank-sum (independent samples) test
+REPEATED_TESTS = ["Paired", "Wilcoxon signed-rank", "Repeated", "Friedman"]
+
+
+def is_repeated_test(test):
+    return any(t in test for t in REPEATED_TESTS)
+
+
+# ==========================================================
+# RESHAPING
+# ==========================================================
+# Both directions work on integer codes and flat numpy indexing, so the
+# cost is a couple of passes over the data regardless of subject count.
+
+@traced()
+def long_to_wide(df, subject, time, value):
+    # One row per subject, one column per time point; repeated
+    # subject × time rows are averaged
+    s_codes, subjects = factorize_groups(df[subject])
+    t_codes, times = factorize_groups(df[time])
+    values = pd.to_numeric(df[value], errors="coerce").to_numpy(dtype=float)
+
+    keep = (s_codes >= 0) & (t_codes >= 0) & ~np.isnan(values)
+    cell = s_codes[keep] * len(times) + t_codes[keep]
+    size = len(subjects) * len(times)
+
+    counts = np.bincount(cell, minlength=size)
+    sums = np.bincount(cell, weights=values[keep], minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        matrix = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+    wide = pd.DataFrame(
+        matrix.reshape(len(subjects), len(times)),
+        index=pd.Index(subjects, name=subject),
+        columns=[str(t) for t in times]
+    )
+    return wide, int((counts > 1).sum())
+
+
+@traced()
+def wide_to_long(df, subject, measures, time_name="time", value_name="value"):
+    n, k = len(df), len(measures)
+    ids = df[subject].to_numpy() if subject else np.arange(n)
+
+    return pd.DataFrame({
+        subject or "subject": np.repeat(ids, k),
+        time_name: pd.Categorical(np.tile(np.asarray(measures, dtype=object), n), categories=measures, ordered=True),
+        value_name: df[measures].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float).ravel()
+    })
+
+
+def complete_matrix(wide):
+    matrix = wide.to_numpy(dtype=float)
+    complete = ~np.isnan(matrix).any(axis=1)
+    return matrix[complete], int((~complete).sum())
+
+
+# ==========================================================
+# TESTS ON THE SUBJECT × TIME MATRIX
+# ==========================================================
+
+def run_paired_ttest(matrix):
+    d = matrix[:, 0] - matrix[:, 1]
+    n = len(d)
+    sd = d.std(ddof=1)
+    t = d.mean() / (sd / np.sqrt(n))
+    p = 2 * stats.t.sf(abs(t), n - 1)
+
+    dz = d.mean() / sd
+    se = np.sqrt(1 / n + dz ** 2 / (2 * n))
+    z = stats.norm.isf(0.025)
+
+    return t, p, dz, [float(dz - z * se), float(dz + z * se)]
+
+
+def run_wilcoxon(matrix):
+    d = matrix[:, 0] - matrix[:, 1]
+    stat, p = stats.wilcoxon(d)
+
+    # Matched-pairs rank-biserial on the non-zero differences
+    d = d[d != 0]
+    ranks = stats.rankdata(np.abs(d))
+    r = (ranks[d > 0].sum() - ranks[d < 0].sum()) / ranks.sum() if len(d) else 0.0
+
+    return stat, p, r
+
+
+def greenhouse_geisser(matrix):
+    k = matrix.shape[1]
+    S = np.cov(matrix, rowvar=False)
+    C = np.eye(k) - 1 / k
+    Sc = C @ S @ C
+    return float(np.trace(Sc) ** 2 / ((k - 1) * np.sum(Sc ** 2)))
+
+
+def run_rm_anova(matrix):
+    n, k = matrix.shape
+    grand = matrix.mean()
+
+    ss_time = n * np.sum((matrix.mean(axis=0) - grand) ** 2)
+    ss_subject = k * np.sum((matrix.mean(axis=1) - grand) ** 2)
+    ss_error = np.sum((matrix - grand) ** 2) - ss_time - ss_subject
+    df_time, df_error = k - 1, (k - 1) * (n - 1)
+
+    f = (ss_time / df_time) / (ss_error / df_error)
+    eps = greenhouse_geisser(matrix) if k > 2 else 1.0
+    p_unc = stats.f.sf(f, df_time, df_error)
+    p = stats.f.sf(f, eps * df_time, eps * df_error)
+    np2 = ss_time / (ss_time + ss_error)
+
+    sphericity = {
+        "epsilon_gg": eps,
+        "p_uncorrected": float(p_unc),
+        "df": [eps * df_time, eps * df_error]
+    }
+    return f, p, np2, sphericity
+
+
+def within_row_ranks(matrix):
+    # Average ranks within each row plus the Σ(t³ - t) tie term, vectorized
+    n, k = matrix.shape
+    order = np.argsort(matrix, axis=1, kind="stable")
+    sorted_rows = np.take_along_axis(matrix, order, axis=1)
+
+    new_group = np.ones((n, k), dtype=bool)
+    new_group[:, 1:] = sorted_rows[:, 1:] != sorted_rows[:, :-1]
+    group_id = np.cumsum(new_group, axis=1) - 1
+    flat = (np.arange(n)[:, None] * k + group_id).ravel()
+
+    # Mean of the 1-based positions in each tie group is its average rank
+    counts = np.bincount(flat, minlength=n * k)
+    positions = np.bincount(flat, weights=np.tile(np.arange(1, k + 1), n), minlength=n * k)
+    sorted_ranks = (positions / np.maximum(counts, 1))[flat].reshape(n, k)
+
+    ranks = np.empty_like(sorted_ranks)
+    np.put_along_axis(ranks, order, sorted_ranks, axis=1)
+    return ranks, float(np.sum(counts ** 3 - counts))
+
+
+def run_friedman(matrix):
+    n, k = matrix.shape
+    ranks, ties = within_row_ranks(matrix)
+    rank_sums = ranks.sum(axis=0)
+
+    chi2 = 12 / (n * k * (k + 1)) * np.sum(rank_sums ** 2) - 3 * n * (k + 1)
+    chi2 = chi2 / (1 - ties / (n * k * (k * k - 1)))
+    p = stats.chi2.sf(chi2, k - 1)
+    w = chi2 / (n * (k - 1))
+
+    return chi2, p, w
+
+
+# ==========================================================
+# ENTRY POINT
+# ==========================================================
+
+def time_summary(matrix, labels):
+    return {
+        str(label): {
+            "mean": float(col.mean()),
+            "median": float(np.median(col)),
+            "sd": float(col.std(ddof=1)),
+            "n": int(len(col))
+        }
+        for label, col in zip(labels, matrix.T)
+    }
+
+
+@traced()
+def execute_repeated(df, test_plan):
+    dv = test_plan["dependent_variable"]
+    iv = test_plan["independent_variable"]
+    test = test_plan["selected_test"]
+    subject = test_plan.get("subject_id")
+    measures = test_plan.get("measures")
+
+    # Wide input: one column per time point, rows already aligned by subject
+    if measures:
+        wide = df[measures].apply(pd.to_numeric, errors="coerce")
+        wide.columns = [str(c) for c in measures]
+        duplicates = 0
+    else:
+        if not subject:
+            raise ValueError(f"{test} needs a subject ID column to align repeated measurements.")
+        wide, duplicates = long_to_wide(df, subject, iv, dv)
+
+    matrix, excluded = complete_matrix(wide)
+    k = matrix.shape[1]
+    labels = list(wide.columns)
+    sphericity = None
+    ci = None
+
+    if "Paired" in test or "Wilcoxon" in test:
+        if k != 2:
+            raise ValueError(f"{test} needs exactly 2 time points, found {k}.")
+        if "Paired" in test:
+            stat, p, effect, ci = run_paired_ttest(matrix)
+        else:
+            stat, p, effect = run_wilcoxon(matrix)
+
+    elif "Repeated" in test:
+        stat, p, effect, sphericity = run_rm_anova(matrix)
+
+    elif "Friedman" in test:
+        stat, p, effect = run_friedman(matrix)
+
+    else:
+        raise ValueError(f"Unsupported test: {test}")
+
+    return {
+        "test": test,
+        "statistic": float(stat),
+        "p_value": float(p),
+        "effect_size": None if effect is None else float(effect),
+        "confidence_interval": ci,
+        "group_statistics": time_summary(matrix, labels),
+        "design": "repeated measures",
+        "n_subjects": int(len(matrix)),
+        "excluded_subjects": excluded,
+        "duplicate_measurements": duplicates,
+        "sphericity": sphericity
+    }
@@ -4,15 +4,33 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Page
 from reportlab.lib.styles import getSampleStyleSheet
 import tempfile
 import os
+from datetime import datetime
 from agents.citations import get_citations
 from core.apa_tables import format_group_table, format_test_table
+from core.instrumentation import traced
 
 
 def save_fig(fig, path):
+    # Cached figures arrive already rendered as PNG bytes
+    if isinstance(fig, bytes):
+        with open(path, "wb") as f:
+            f.write(fig)
+        return
     fig.savefig(path, bbox_inches="tight")
 
 
-def generate_word(rt, fig1, fig2, results, schema, audit_log, test_plan):
+def add_schema_table(doc, schema):
+    table = doc.add_table(rows=1, cols=len(schema.columns))
+    table.style = "Table Grid"
+    for cell, name in zip(table.rows[0].cells, schema.columns):
+        cell.text = str(name)
+    for record in schema.itertuples(index=False):
+        for cell, value in zip(table.add_row().cells, record):
+            cell.text = str(value)
+
+
+@traced()
+def generate_word(rt, fig1, fig2, results, schema, audit_log, test_plan, run=None):
     temp_dir = tempfile.mkdtemp()
     doc = Document()
 
@@ -28,9 +46,15 @@ def generate_word(rt, fig1, fig2, results, schema, audit_log, test_plan):
         doc.add_paragraph(c)
 
     doc.add_heading("Reproducibility Appendix", 2)
+    if run:
+        doc.add_paragraph(
+            f"Run {run['id']} · {datetime.fromtimestamp(run['created']):%Y-%m-%d %H:%M} · "
+            f"dataset {run['dataset'][:16]} · engine version {run['engine']}"
+        )
     for item in audit_log:
         doc.add_paragraph(item, style="List Bullet")
-    doc.add_paragraph(str(schema.to_dict()))
+    doc.add_paragraph("Variable types")
+    add_schema_table(doc, schema)
 
     fig1_path = os.path.join(temp_dir, "fig1.png")
     fig2_path = os.path.join(temp_dir, "fig2.png")
@@ -46,6 +70,7 @@ def generate_word(rt, fig1, fig2, results, schema, audit_log, test_plan):
     return path
 
 
+@traced()
 def generate_pdf(rt, fig1, fig2, results, schema, audit_log, test_plan):
     temp_dir = tempfile.mkdtemp()
     pdf_path = os.path.join(temp_dir, "analysis.pdf")
@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import tempfile
+import threading
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from core.stats_engine import ENGINE_VERSION
+
+# ---------------------------
+# Cache configuration
+# ---------------------------
+
+RESULT_CACHE_PATH = os.getenv(
+    "MEDSTATS_RESULT_CACHE",
+    os.path.join(tempfile.gettempdir(), "medstats_results.sqlite")
+)
+RESULT_CACHE_MAX_BYTES = int(float(os.getenv("MEDSTATS_RESULT_CACHE_MAX_MB", 256)) * 2 ** 20)
+
+# Narrative plan fields written by the reasoning agent; they do not change
+# the numbers, so a re-suggested plan with other wording still hits
+NARRATIVE_FIELDS = ("justification", "assumptions")
+
+
+# ==========================================================
+# KEYS
+# ==========================================================
+
+def dataset_fingerprint(df):
+    # Cleaned content, column names and dtypes; row order matters
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def result_key(fingerprint, test_plan):
+    plan = {k: v for k, v in test_plan.items() if k not in NARRATIVE_FIELDS}
+    blob = json.dumps([fingerprint, plan, ENGINE_VERSION], sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def to_json(value):
+    def convert(obj):
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        return str(obj)
+    return json.dumps(value, default=convert)
+
+
+# ==========================================================
+# SQLITE STORE
+# ==========================================================
+# One row per analysis (results + report text) and one row per rendered
+# figure. Every call opens its own connection, so Streamlit sessions and
+# API workers can share the file; WAL keeps readers off the writer's lock.
+# Over the size limit, the least recently read analyses go first.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    engine TEXT NOT NULL,
+    results TEXT NOT NULL,
+    report TEXT,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    bytes INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS figures (
+    key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    png BLOB NOT NULL,
+    PRIMARY KEY (key, name)
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+"""
+
+
+class ResultCache:
+
+    def __init__(self, path=RESULT_CACHE_PATH, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+
+    def get(self, key):
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT results, report FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+            figures = dict(conn.execute("SELECT name, png FROM figures WHERE key = ?", (key,)).fetchall())
+
+        return {
+            "results": json.loads(row[0]),
+            "report_text": json.loads(row[1]) if row[1] else None,
+            "figures": figures
+        }
+
+    def put(self, key, results):
+        blob = to_json(results)
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, engine, results, report, created, accessed, bytes) "
+                "VALUES (?, ?, ?, NULL, ?, ?, ?)",
+                (key, ENGINE_VERSION, blob, now, now, len(blob))
+            )
+            conn.execute("DELETE FROM figures WHERE key = ?", (key,))
+            self._evict(conn)
+
+    def put_report(self, key, report_text):
+        blob = to_json(report_text)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE results SET report = ?, bytes = length(results) + ? WHERE key = ?",
+                (blob, len(blob), key)
+            )
+
+    def put_figure(self, key, name, png):
+        with closing(self._connect()) as conn, conn:
+            if conn.execute("SELECT 1 FROM results WHERE key = ?", (key,)).fetchone():
+                conn.execute("INSERT OR REPLACE INTO figures (key, name, png) VALUES (?, ?, ?)", (key, name, png))
+                self._evict(conn)
+
+    def stats(self):
+        with closing(self._connect()) as conn:
+            n, result_bytes = conn.execute("SELECT count(*), coalesce(sum(bytes), 0) FROM results").fetchone()
+            figure_bytes = conn.execute("SELECT coalesce(sum(length(png)), 0) FROM figures").fetchone()[0]
+        return {"entries": n, "bytes": result_bytes + figure_bytes, "max_bytes": self.max_bytes}
+
+    def clear(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM figures")
+            conn.execute("DELETE FROM results")
+
+    # ---------------------------
+    # Internals
+    # ---------------------------
+
+    def _evict(self, conn):
+        total = conn.execute(
+            "SELECT (SELECT coalesce(sum(bytes), 0) FROM results) + (SELECT coalesce(sum(length(png)), 0) FROM figures)"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Oldest reads first, down to 90% so the next write does not evict again
+        rows = conn.execute(
+            "SELECT r.key, r.bytes + coalesce((SELECT sum(length(png)) FROM figures f WHERE f.key = r.key), 0) "
+            "FROM results r ORDER BY r.accessed"
+        ).fetchall()
+        target = 0.9 * self.max_bytes
+        stale = []
+        for key, size in rows:
+            if total <= target:
+                break
+            stale.append((key,))
+            total -= size
+
+        conn.executemany("DELETE FROM figures WHERE key = ?", stale)
+        conn.executemany("DELETE FROM results WHERE key = ?", stale)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
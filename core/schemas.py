@@ -8,7 +8,10 @@ class VariableProfile(BaseModel):
     normality_p: Optional[float] = None
     normal: Optional[bool] = None
     missing_pct: float
-    outliers_present: bool
+    outliers_present: bool = False
+    outlier_count: Optional[int] = None
+    # False while normality/outlier/level statistics are still deferred
+    profiled: bool = True
 
 
 class DataProfile(BaseModel):
@@ -16,6 +19,8 @@ class DataProfile(BaseModel):
     sample_size: int
     group_sizes: Optional[Dict[str, int]]
     study_design: str
+    subject_id: Optional[str] = None
+    time_variable: Optional[str] = None
     warnings: List[str]
 
 class TestPlan(BaseModel):
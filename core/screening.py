@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from core.instrumentation import traced
+from core.outliers import numeric_block
+from core.regression import exposure_many
+from core.stats_engine import factorize_groups
+
+FDR_METHODS = {"bh": "Benjamini-Hochberg", "by": "Benjamini-Yekutieli"}
+
+
+# ---------------------------
+# Multiple-testing adjustment
+# ---------------------------
+
+def adjust_pvalues(p, method="bh"):
+    # Step-up FDR q-values; NaN p-values stay NaN and do not count towards m
+    p = np.asarray(p, dtype=float)
+    q = np.full(p.shape, np.nan)
+    valid = np.flatnonzero(~np.isnan(p))
+    m = len(valid)
+    if m == 0:
+        return q
+
+    order = valid[np.argsort(p[valid], kind="mergesort")]
+    scale = m / np.arange(1, m + 1)
+    if method == "by":
+        scale *= np.sum(1 / np.arange(1, m + 1))
+    elif method != "bh":
+        raise ValueError(f"Unknown FDR method: {method}")
+
+    # Running minimum from the largest p down keeps q monotone in p
+    q[order] = np.minimum(1.0, np.minimum.accumulate((p[order] * scale)[::-1])[::-1])
+    return q
+
+
+# ==========================================================
+# COLUMN-BLOCK STATISTICS
+# ==========================================================
+# The grouping IV is factorized once into a one-hot matrix G (n × k);
+# every per-group sum over all outcomes is then one matrix product with
+# the n × p outcome block, so p outcomes cost a handful of BLAS calls
+# instead of p groupbys. Missing outcome values are zeroed and dropped
+# from the per-group counts, giving each outcome its own available-case n.
+
+def group_moments(onehot, block):
+    valid = ~np.isnan(block)
+    x = np.where(valid, block, 0.0)
+    n = onehot.T @ valid.astype(float)
+    total = onehot.T @ x
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / n
+        # Centred second pass keeps the variance stable for large means
+        centred = np.where(valid, block - mean[np.argmax(onehot, axis=1)], 0.0)
+        var = (onehot.T @ centred ** 2) / (n - 1)
+    return n, mean, var
+
+
+def welch_t(n, mean, var):
+    se2 = var / n
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = (mean[0] - mean[1]) / np.sqrt(se2[0] + se2[1])
+        df = (se2[0] + se2[1]) ** 2 / (se2[0] ** 2 / (n[0] - 1) + se2[1] ** 2 / (n[1] - 1))
+        pooled = np.sqrt(((n[0] - 1) * var[0] + (n[1] - 1) * var[1]) / (n[0] + n[1] - 2))
+        g = (mean[0] - mean[1]) / pooled * (1 - 3 / (4 * (n[0] + n[1] - 2) - 1))
+    return t, 2 * stats.t.sf(np.abs(t), df), g
+
+
+def anova_f(n, mean, var):
+    k = (n > 0).sum(axis=0)
+    total = n.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        grand = np.nansum(n * mean, axis=0) / total
+        ss_between = np.nansum(n * (mean - grand) ** 2, axis=0)
+        ss_within = np.nansum((n - 1) * var, axis=0)
+        df1, df2 = k - 1, total - k
+        f = (ss_between / df1) / (ss_within / df2)
+        omega = np.maximum(0.0, df1 * (f - 1) / (df1 * (f - 1) + total))
+    return f, stats.f.sf(f, df1, df2), omega
+
+
+def column_ranks(block):
+    # Average ranks within each column (NaN stays NaN) and Σ(t³ − t) over
+    # each column's tie groups, all columns in one sort. Works on the
+    # transposed block so every pass runs along contiguous memory.
+    x = np.ascontiguousarray(block.T)
+    n_rows = x.shape[1]
+    order = np.argsort(x, axis=1, kind="stable")
+    s = np.take_along_axis(x, order, axis=1)
+    valid = ~np.isnan(s)
+
+    # First and last sorted position of each value's tie group: carry the
+    # group starts forward and the group ends backward
+    position = np.arange(n_rows)
+    changes = s[:, 1:] != s[:, :-1]
+    first = np.zeros(s.shape, dtype=np.int64)
+    first[:, 1:] = np.where(changes, position[1:], 0)
+    np.maximum.accumulate(first, axis=1, out=first)
+    last = np.full(s.shape, n_rows - 1, dtype=np.int64)
+    last[:, :-1] = np.where(changes, position[:-1], n_rows - 1)
+    last = np.minimum.accumulate(last[:, ::-1], axis=1)[:, ::-1]
+
+    size = (last - first + 1).astype(float)
+    ties = np.where(valid & (last == position), size ** 3 - size, 0.0).sum(axis=1)
+
+    ranks = np.empty(s.shape)
+    np.put_along_axis(ranks, order, np.where(valid, (first + last) / 2 + 1, np.nan), axis=1)
+    return ranks.T, ties
+
+
+def mann_whitney_z(n, rank_sums, ties):
+    n1, n2 = n
+    total = n1 + n2
+    u1 = rank_sums[0] - n1 * (n1 + 1) / 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sd = np.sqrt(n1 * n2 / 12 * ((total + 1) - ties / (total * (total - 1))))
+        # Continuity-corrected normal approximation (large-sample branch of run_mann_whitney)
+        u = np.maximum(u1, n1 * n2 - u1)
+        z = (u - n1 * n2 / 2 - 0.5) / sd
+        r = 2 * u1 / (n1 * n2) - 1
+    return u1, np.minimum(1.0, 2 * stats.norm.sf(z)), r
+
+
+def kruskal_h(n, rank_sums, ties):
+    total = n.sum(axis=0)
+    k = (n > 0).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        h = 12 / (total * (total + 1)) * np.nansum(rank_sums ** 2 / n, axis=0) - 3 * (total + 1)
+        h = h / (1 - ties / (total ** 3 - total))
+        eps = h / (total - 1)
+    return h, stats.chi2.sf(h, k - 1), eps
+
+
+# ==========================================================
+# ENTRY POINT
+# ==========================================================
+
+@traced()
+def screen_outcomes(df, iv, outcomes, rank=False, fdr="bh", covariates=None):
+    # One row per outcome: two groups → Welch t / Mann-Whitney, more →
+    # ANOVA / Kruskal-Wallis; with covariates, the adjusted OLS test of the
+    # grouping variable (HC3), all outcomes sharing one QR per missingness
+    # pattern. q-values control the FDR across the panel.
+    covariates = list(covariates or [])
+    outcomes = [c for c in outcomes if c != iv and c not in covariates]
+    codes, labels = factorize_groups(df[iv])
+    if len(labels) < 2:
+        raise ValueError(f"{iv} needs at least two groups to screen outcomes.")
+    if covariates and rank:
+        raise ValueError("Rank-based screening cannot adjust for covariates; use the parametric tests.")
+
+    keep = codes >= 0
+    block = numeric_block(df, outcomes)[keep]
+    onehot = np.zeros((keep.sum(), len(labels)))
+    onehot[np.arange(keep.sum()), codes[keep]] = 1.0
+
+    n, mean, var = group_moments(onehot, block)
+    two_groups = len(labels) == 2
+    # Outcomes with fewer than two values in some group are not tested
+    testable = (n >= 2).all(axis=0)
+    n_used = n.sum(axis=0).astype(int)
+
+    if covariates:
+        adjusted = exposure_many(df, outcomes, iv, covariates)
+        stat = adjusted["statistic"].to_numpy()
+        p = adjusted["p_value"].to_numpy()
+        n_used = adjusted["n"].to_numpy(dtype=int)
+        test = "Adjusted linear regression (HC3)"
+        if len(adjusted.attrs["terms"]) == 1:
+            effect, measure = adjusted["estimate"].to_numpy(), f"adjusted B ({adjusted.attrs['terms'][0]})"
+        else:
+            # Partial η² from the joint Wald F
+            df1 = len(adjusted.attrs["terms"])
+            with np.errstate(invalid="ignore"):
+                effect = stat * df1 / (stat * df1 + adjusted["df_resid"].to_numpy())
+            measure = "partial η²"
+    elif rank:
+        ranks, ties = column_ranks(block)
+        rank_sums = onehot.T @ np.nan_to_num(ranks)
+        if two_groups:
+            stat, p, effect = mann_whitney_z(n, rank_sums, ties)
+            test, measure = "Mann-Whitney U", "rank-biserial r"
+        else:
+            stat, p, effect = kruskal_h(n, rank_sums, ties)
+            test, measure = "Kruskal-Wallis", "ε²"
+    elif two_groups:
+        stat, p, effect = welch_t(n, mean, var)
+        test, measure = "Welch t-test", "Hedges' g"
+    else:
+        stat, p, effect = anova_f(n, mean, var)
+        test, measure = "ANOVA", "ω²"
+
+    p = np.where(testable & np.isfinite(p), p, np.nan)
+
+    table = pd.DataFrame({
+        "outcome": outcomes,
+        "n": n_used,
+        "test": test,
+        "statistic": np.where(testable, stat, np.nan),
+        "p_value": p,
+        "q_value": adjust_pvalues(p, fdr),
+        "effect_measure": measure,
+        "effect_size": np.where(testable, effect, np.nan)
+    })
+    for j, label in enumerate(labels):
+        table[f"mean {label}"] = mean[j]
+
+    table.attrs["fdr"] = FDR_METHODS[fdr]
+    return table.sort_values("p_value", na_position="last", kind="mergesort").reset_index(drop=True)
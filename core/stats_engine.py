@@ -1,12 +1,168 @@
+import hashlib
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
 from scipy import stats
-import pingouin as pg
+from core.instrumentation import traced
+from core.regression import run_regression
+from core.contingency import contingency_table, contingency_test
+from core.effect_sizes import epsilon_squared, rank_biserial_r, hedges_g, omega_squared, correlation_ci, effect_measure
+
+# Part of every result-cache key: bump whenever a change to cleaning or any
+# engine can alter a reported number, so stored results are not reused
+ENGINE_VERSION = "6"
+
+
+# ---------------------------
+# Group factorization
+# ---------------------------
+
+def factorize_groups(series):
+    # Codes for observed levels only, in the same sorted order groupby uses;
+    # categoricals reuse their stored codes instead of re-hashing labels
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy().astype(np.int64)
+        labels = series.cat.categories
+    else:
+        codes, labels = pd.factorize(series, sort=True)
+        codes = codes.astype(np.int64)
+
+    present = np.bincount(codes[codes >= 0], minlength=len(labels)) > 0
+    if not present.all():
+        remap = np.full(len(labels) + 1, -1, dtype=np.int64)
+        remap[:-1][present] = np.arange(present.sum())
+        codes = remap[codes]
+        labels = labels[present]
+
+    return codes, list(labels)
+
+
+# ---------------------------
+# Rank cache
+# ---------------------------
+# Sorting and tie detection are done once per (column content, column name);
+# ranks for any subset of rows are then derived in O(n) from the cached
+# order, so trying several IVs against one outcome never re-sorts it.
+
+RANK_CACHE_SIZE = 32
+_rank_cache = OrderedDict()
+
+
+class RankInfo:
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype=float)
+        self.size = len(values)
+        self.n_valid = int((~np.isnan(values)).sum())
+
+        # NaNs sort last and are left out of every tie group
+        self.order = np.argsort(values, kind="mergesort")[:self.n_valid]
+        sorted_values = values[self.order]
+
+        self.tie_id = np.zeros(self.n_valid, dtype=np.int64)
+        if self.n_valid > 1:
+            self.tie_id[1:] = np.cumsum(sorted_values[1:] != sorted_values[:-1])
+        self.tie_counts = np.bincount(self.tie_id)
+
+    def subset(self, mask=None):
+        # Average ranks (1-based) among the rows in mask, plus tie-group sizes
+        if mask is None:
+            counts = self.tie_counts.astype(float)
+            in_subset = np.ones(self.n_valid, dtype=bool)
+        else:
+            in_subset = np.asarray(mask, dtype=bool)[self.order]
+            counts = np.bincount(self.tie_id, weights=in_subset, minlength=len(self.tie_counts))
+
+        group_rank = np.cumsum(counts) - counts + (counts + 1) / 2
+
+        ranks = np.full(self.size, np.nan)
+        rows = self.order[in_subset]
+        ranks[rows] = group_rank[self.tie_id[in_subset]]
+
+        return ranks, counts[counts > 0]
+
+
+def column_fingerprint(series):
+    hashes = pd.util.hash_pandas_object(series, index=False).to_numpy()
+    return hashlib.blake2b(hashes.tobytes(), digest_size=16).hexdigest()
+
+
+def get_ranks(df, col):
+    key = (column_fingerprint(df[col]), col)
+
+    if key in _rank_cache:
+        _rank_cache.move_to_end(key)
+        return _rank_cache[key]
+
+    info = RankInfo(pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float, na_value=np.nan))
+    _rank_cache[key] = info
+    if len(_rank_cache) > RANK_CACHE_SIZE:
+        _rank_cache.popitem(last=False)
+
+    return info
+
+
+def clear_rank_cache():
+    _rank_cache.clear()
+
+
+def tie_term(tie_counts):
+    # Float before cubing: int64 t³ overflows once a tie group passes ~2.1M rows
+    tie_counts = np.asarray(tie_counts, dtype=float)
+    return float(np.sum(tie_counts ** 3 - tie_counts))
+
+
+def rank_groups(df, dv, iv, keep_levels=None):
+    # Ranks of dv restricted to rows with a dv value and an iv group
+    codes, labels = factorize_groups(df[iv])
+    if keep_levels is not None:
+        codes = np.where(codes < keep_levels, codes, -1)
+        labels = labels[:keep_levels]
+
+    info = get_ranks(df, dv)
+    mask = (codes >= 0) & df[dv].notna().to_numpy()
+    ranks, ties = info.subset(mask)
+
+    codes = codes[mask]
+    rank_sums = np.bincount(codes, weights=ranks[mask], minlength=len(labels))
+    sizes = np.bincount(codes, minlength=len(labels))
+
+    return rank_sums, sizes, ties, labels
+
+
+def run_dunn(df, dv, iv, adjust="holm"):
+    rank_sums, sizes, ties, labels = rank_groups(df, dv, iv)
+    n = float(sizes.sum())
+    mean_ranks = rank_sums / sizes
+    variance = n * (n + 1) / 12 - tie_term(ties) / (12 * (n - 1))
+
+    pairs = []
+    for i in range(len(labels)):
+        for j in range(i + 1, len(labels)):
+            z = (mean_ranks[i] - mean_ranks[j]) / np.sqrt(variance * (1 / sizes[i] + 1 / sizes[j]))
+            pairs.append({
+                "group_1": str(labels[i]),
+                "group_2": str(labels[j]),
+                "z": float(z),
+                "p_value": float(2 * stats.norm.sf(abs(z)))
+            })
+
+    m = len(pairs)
+    if adjust == "bonferroni":
+        for pair in pairs:
+            pair["p_adjusted"] = min(1.0, pair["p_value"] * m)
+    else:
+        running = 0.0
+        for rank, pair in enumerate(sorted(pairs, key=lambda x: x["p_value"])):
+            running = max(running, min(1.0, (m - rank) * pair["p_value"]))
+            pair["p_adjusted"] = running
+
+    return pairs
 
 
 def group_summary(df, dv, iv):
     summary = {}
-    for g, sub in df.groupby(iv):
+    for g, sub in df.groupby(iv, observed=True):
         s = sub[dv].dropna()
         summary[str(g)] = {
             "mean": float(s.mean()),
@@ -18,57 +174,96 @@ def group_summary(df, dv, iv):
 
 
 def run_mann_whitney(df, dv, iv):
-    groups = [g[dv].dropna() for _, g in df.groupby(iv)]
-    stat, p = stats.mannwhitneyu(groups[0], groups[1], alternative="two-sided")
+    rank_sums, sizes, ties, _ = rank_groups(df, dv, iv, keep_levels=2)
+    n1, n2 = float(sizes[0]), float(sizes[1])
+    stat = rank_sums[0] - n1 * (n1 + 1) / 2
+
+    if (n1 <= 8 or n2 <= 8) and len(ties) == n1 + n2:
+        # Small samples without ties: scipy's exact distribution
+        groups = [g[dv].dropna() for _, g in df.groupby(iv, observed=True)]
+        stat, p = stats.mannwhitneyu(groups[0], groups[1], alternative="two-sided")
+    else:
+        u = max(stat, n1 * n2 - stat)
+        n = n1 + n2
+        s = np.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term(ties) / (n * (n - 1))))
+        p = min(1.0, 2 * stats.norm.sf((u - n1 * n2 / 2 - 0.5) / s))
 
-    r = abs(stat) / np.sqrt(len(groups[0]) + len(groups[1]))
+    r, ci = rank_biserial_r(stat, n1, n2)
 
-    return stat, p, r
+    return stat, p, r, ci
 
 
-def run_ttest(df, dv, iv):
-    g1, g2 = [g[dv].dropna() for _, g in df.groupby(iv)]
+def run_ttest(df, dv, iv, group_stats):
+    g1, g2 = [g[dv].dropna() for _, g in df.groupby(iv, observed=True)]
     stat, p = stats.ttest_ind(g1, g2, equal_var=False)
 
-    d = pg.compute_effsize(g1, g2, eftype="cohen")
+    a, b = group_stats.values()
+    g, ci = hedges_g(a["mean"], b["mean"], a["sd"], b["sd"], a["n"], b["n"])
 
-    return stat, p, d
+    return stat, p, g, ci
 
 
 def run_anova(df, dv, iv):
-    groups = [g[dv].dropna() for _, g in df.groupby(iv)]
+    groups = [g[dv].dropna() for _, g in df.groupby(iv, observed=True)]
     stat, p = stats.f_oneway(*groups)
 
-    eta = pg.anova(data=df, dv=dv, between=iv)["np2"].values[0]
+    n = sum(len(g) for g in groups)
+    omega, ci = omega_squared(stat, len(groups) - 1, n - len(groups))
 
-    return stat, p, eta
+    return stat, p, omega, ci
 
 
 def run_kruskal(df, dv, iv):
-    groups = [g[dv].dropna() for _, g in df.groupby(iv)]
-    stat, p = stats.kruskal(*groups)
+    rank_sums, sizes, ties, _ = rank_groups(df, dv, iv)
+    n = float(sizes.sum())
+
+    h = 12 / (n * (n + 1)) * np.sum(rank_sums ** 2 / sizes) - 3 * (n + 1)
+    stat = h / (1 - tie_term(ties) / (n ** 3 - n))
+    p = stats.chi2.sf(stat, len(sizes) - 1)
 
-    return stat, p, None
+    eps, ci = epsilon_squared(stat, n, len(sizes))
+
+    return stat, p, eps, ci
 
 
 def run_chi_square(df, dv, iv):
-    table = pd.crosstab(df[dv], df[iv])
-    stat, p, _, _ = stats.chi2_contingency(table)
+    row_codes, row_labels = factorize_groups(df[dv])
+    col_codes, col_labels = factorize_groups(df[iv])
+    table = contingency_table(row_codes, col_codes, len(row_labels), len(col_labels))
 
-    return stat, p, None
+    return contingency_test(table)
 
 
 def run_correlation(df, dv, iv, method):
     x = df[dv]
     y = df[iv]
+    mask = (x.notna() & y.notna()).to_numpy()
+    n = int(mask.sum())
 
     if method == "pearson":
-        r, p = stats.pearsonr(x, y)
+        r, p = stats.pearsonr(x[mask], y[mask])
     else:
-        r, p = stats.spearmanr(x, y)
+        rx, _ = get_ranks(df, dv).subset(mask)
+        ry, _ = get_ranks(df, iv).subset(mask)
+        r, p = stats.pearsonr(rx[mask], ry[mask])
+
+    return r, p, r, correlation_ci(r, n, method)
+
 
-    return r, p, r
+def analysis_columns(test_plan):
+    # Every column a plan reads; wide repeated-measures plans name their
+    # time-point columns in "measures" instead of an outcome/predictor pair
+    main = test_plan.get("measures") or [test_plan["dependent_variable"], test_plan["independent_variable"]]
+    return list(dict.fromkeys(
+        list(main)
+        + list(test_plan.get("covariates") or [])
+        + ([test_plan["subject_id"]] if test_plan.get("subject_id") else [])
+        + ([test_plan["event"]] if test_plan.get("event") else [])
+        + list(test_plan.get("strata") or [])
+    ))
 
+
+@traced()
 def execute_test(df, test_plan):
     dv = test_plan["dependent_variable"]
     iv = test_plan["independent_variable"]
@@ -77,31 +272,56 @@ def execute_test(df, test_plan):
     group_stats = None
     effect = None
     ci = None
+    contingency = None
+
+    # Missing data: run the test on m imputed datasets and pool
+    if test_plan.get("imputations"):
+        from core.imputation import execute_imputed
+        return execute_imputed(df, test_plan)
+
+    # Subgroup mode: overall result plus one result per stratum
+    if test_plan.get("stratify_by"):
+        from core.stratified import execute_stratified
+        return execute_stratified(df, test_plan)
+
+    # Paired / repeated-measures tests align rows by subject first
+    from core.repeated import execute_repeated, is_repeated_test
+    if is_repeated_test(test):
+        return execute_repeated(df, test_plan)
+
+    # Time-to-event outcomes: Kaplan-Meier / log-rank / Cox
+    from core.survival import execute_survival, is_survival_test
+    if is_survival_test(test):
+        return execute_survival(df, test_plan)
+
+    # Covariate-adjusted models return their own coefficient table
+    if "regression" in test.lower():
+        return run_regression(df, test_plan)
 
     if "Mann-Whitney" in test:
-        stat, p, effect = run_mann_whitney(df, dv, iv)
+        stat, p, effect, ci = run_mann_whitney(df, dv, iv)
         group_stats = group_summary(df, dv, iv)
 
     elif "t-test" in test:
-        stat, p, effect = run_ttest(df, dv, iv)
         group_stats = group_summary(df, dv, iv)
+        stat, p, effect, ci = run_ttest(df, dv, iv, group_stats)
 
     elif "ANOVA" in test:
-        stat, p, effect = run_anova(df, dv, iv)
+        stat, p, effect, ci = run_anova(df, dv, iv)
         group_stats = group_summary(df, dv, iv)
 
     elif "Kruskal" in test:
-        stat, p, effect = run_kruskal(df, dv, iv)
+        stat, p, effect, ci = run_kruskal(df, dv, iv)
         group_stats = group_summary(df, dv, iv)
 
     elif "Chi-square" in test:
-        stat, p, effect = run_chi_square(df, dv, iv)
+        stat, p, effect, ci, contingency = run_chi_square(df, dv, iv)
 
     elif "Pearson" in test:
-        stat, p, effect = run_correlation(df, dv, iv, "pearson")
+        stat, p, effect, ci = run_correlation(df, dv, iv, "pearson")
 
     elif "Spearman" in test:
-        stat, p, effect = run_correlation(df, dv, iv, "spearman")
+        stat, p, effect, ci = run_correlation(df, dv, iv, "spearman")
 
     else:
         raise ValueError(f"Unsupported test: {test}")
@@ -111,6 +331,8 @@ def execute_test(df, test_plan):
         "statistic": float(stat),
         "p_value": float(p),
         "effect_size": None if effect is None else float(effect),
+        "effect_measure": effect_measure(test),
         "confidence_interval": ci,
-        "group_statistics": group_stats
+        "group_statistics": group_stats,
+        "contingency": contingency
     }
\ No newline at end of file
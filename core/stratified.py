@@ -0,0 +1,211 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+from concurrent.futures import ProcessPoolExecutor
+
+from core.stats_engine import execute_test, factorize_groups, analysis_columns
+from core.instrumentation import traced
+
+# Below this many rows the process start-up costs more than the tests
+PARALLEL_MIN_ROWS = 50_000
+
+Z_95 = stats.norm.isf(0.025)
+
+
+# ---------------------------
+# Stratum split
+# ---------------------------
+
+def stratum_codes(df, strata):
+    # Mixed-radix combination of per-column codes, then one np.unique pass
+    combined = np.zeros(len(df), dtype=np.int64)
+    missing = np.zeros(len(df), dtype=bool)
+    levels = []
+
+    for col in strata:
+        codes, labels = factorize_groups(df[col])
+        missing |= codes < 0
+        combined = combined * max(len(labels), 1) + np.maximum(codes, 0)
+        levels.append(labels)
+
+    combined[missing] = -1
+    present, codes = np.unique(combined, return_inverse=True)
+    if len(present) and present[0] == -1:
+        codes = codes - 1
+        present = present[1:]
+
+    labels = []
+    for value in present:
+        parts = []
+        for col_levels in reversed(levels):
+            value, idx = divmod(value, max(len(col_levels), 1))
+            parts.append(str(col_levels[idx]))
+        labels.append(" / ".join(reversed(parts)))
+
+    return codes, labels
+
+
+def split_strata(df, strata, columns):
+    codes, labels = stratum_codes(df, strata)
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+    start = int((codes < 0).sum())
+
+    frames = []
+    sub = df[columns]
+    for label, count in zip(labels, counts):
+        frames.append((label, sub.iloc[order[start:start + count]]))
+        start += count
+
+    return frames
+
+
+# ---------------------------
+# Effect on a poolable scale
+# ---------------------------
+
+def two_group_sizes(result):
+    # Per-group n when the stratum has exactly two groups, else None
+    groups = list((result.get("group_statistics") or {}).values())
+    if len(groups) != 2:
+        return None
+    return groups[0]["n"], groups[1]["n"]
+
+
+# Odds and hazard ratios: asymmetric CIs that are symmetric on the log scale
+RATIO_TESTS = ("Logistic", "Cox", "Log-rank", "Logrank", "Kaplan")
+
+
+def is_ratio_test(test):
+    return any(t in test for t in RATIO_TESTS)
+
+
+def effect_with_se(test, result, n):
+    # Returns (estimate, SE) on a scale where Cochran's Q is meaningful
+    effect = result.get("effect_size")
+    ci = result.get("confidence_interval")
+
+    if effect is None or not np.isfinite(effect):
+        return None
+
+    if "Pearson" in test or "Spearman" in test:
+        scale = 1.06 if "Spearman" in test else 1.0
+        if n <= 3 or abs(effect) >= 1:
+            return None
+        return np.arctanh(effect), np.sqrt(scale / (n - 3))
+
+    if "Mann-Whitney" in test and result.get("group_statistics"):
+        # Rank-biserial r pools on the Fisher-z scale like a correlation
+        sizes = two_group_sizes(result)
+        if sizes is None or abs(effect) >= 1:
+            return None
+        n1, n2 = sizes
+        return np.arctanh(effect), np.sqrt((n1 + n2 + 1) / (3 * n1 * n2))
+
+    if any(t in test for t in ("ANOVA", "Kruskal", "Chi-square")):
+        # Bounded at 0 with skewed noncentral CIs; no symmetric SE to pool
+        return None
+
+    if is_ratio_test(test):
+        if not ci or effect <= 0 or ci[0] <= 0:
+            return None
+        return np.log(effect), (np.log(ci[1]) - np.log(ci[0])) / (2 * Z_95)
+
+    if ci:
+        return effect, (ci[1] - ci[0]) / (2 * Z_95)
+
+    if "t-test" in test and two_group_sizes(result):
+        n1, n2 = two_group_sizes(result)
+        return effect, np.sqrt((n1 + n2) / (n1 * n2) + effect ** 2 / (2 * (n1 + n2)))
+
+    return None
+
+
+def back_transform(test):
+    # Inverse of the scale effect_with_se pools on
+    if is_ratio_test(test):
+        return np.exp
+    if any(t in test for t in ("Pearson", "Spearman", "Mann-Whitney")):
+        return np.tanh
+    return lambda x: x
+
+
+def heterogeneity(estimates, back=lambda x: x):
+    if len(estimates) < 2:
+        return None
+
+    y = np.array([e for e, _ in estimates])
+    w = 1 / np.array([se for _, se in estimates]) ** 2
+    pooled = np.sum(w * y) / np.sum(w)
+    se = np.sqrt(1 / np.sum(w))
+    q = float(np.sum(w * (y - pooled) ** 2))
+    df = len(y) - 1
+
+    return {
+        "method": "Cochran's Q",
+        "q": q,
+        "df": df,
+        "p_value": float(stats.chi2.sf(q, df)),
+        "i_squared": max(0.0, (q - df) / q) if q > 0 else 0.0,
+        # Fixed-effect inverse-variance pool, back on the effect's own scale
+        "pooled_effect": float(back(pooled)),
+        "pooled_ci": [float(back(pooled - Z_95 * se)), float(back(pooled + Z_95 * se))]
+    }
+
+
+# ---------------------------
+# Runner
+# ---------------------------
+
+def run_stratum(args):
+    label, frame, plan = args
+    try:
+        result = execute_test(frame, plan)
+        return label, result, None
+    except Exception as e:
+        return label, None, f"{type(e).__name__}: {e}"
+
+
+@traced()
+def execute_stratified(df, test_plan, max_workers=None):
+    strata = test_plan["stratify_by"]
+    if isinstance(strata, str):
+        strata = [strata]
+
+    plan = {k: v for k, v in test_plan.items() if k != "stratify_by"}
+    test = plan["selected_test"]
+    columns = analysis_columns(plan)
+
+    overall = execute_test(df, plan)
+
+    jobs = [(label, frame, plan) for label, frame in split_strata(df, strata, columns)]
+    if max_workers != 1 and len(jobs) > 1 and len(df) >= PARALLEL_MIN_ROWS:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            outcomes = list(pool.map(run_stratum, jobs))
+    else:
+        outcomes = [run_stratum(job) for job in jobs]
+
+    rows = []
+    estimates = []
+    for (label, frame, _), (_, result, error) in zip(jobs, outcomes):
+        n = int(frame[columns[:2]].notna().all(axis=1).sum())
+        if result is not None and result.get("n_subjects") is not None:
+            n = result["n_subjects"]
+        row = {"stratum": label, "n": n, "error": error}
+        if result is not None:
+            row.update({
+                "statistic": result["statistic"],
+                "p_value": result["p_value"],
+                "effect_size": result["effect_size"],
+                "confidence_interval": result["confidence_interval"],
+                "group_statistics": result["group_statistics"]
+            })
+            poolable = effect_with_se(test, result, n)
+            if poolable is not None and np.isfinite(poolable[1]) and poolable[1] > 0:
+                estimates.append(poolable)
+        rows.append(row)
+
+    overall["stratify_by"] = strata
+    overall["strata"] = rows
+    overall["heterogeneity"] = heterogeneity(estimates, back_transform(test))
+    return overall
@@ -0,0 +1,379 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+
+from agents.data_cleaning import clean_numeric_series
+from core.instrumentation import traced
+from core.repeated import is_repeated_test
+from core.contingency import contingency_test
+from core.effect_sizes import hedges_g, omega_squared, correlation_ci, effect_measure
+
+
+# ==========================================================
+# MERGEABLE ACCUMULATORS
+# ==========================================================
+# Chan/Welford pairwise updates: each chunk is summarised on its own and
+# folded in, so accumulators from different chunks, files or worker
+# processes combine exactly (up to floating point) in any order.
+
+class Moments:
+
+    def __init__(self, n=0, mean=0.0, m2=0.0):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+
+    @classmethod
+    def from_values(cls, values):
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return cls()
+        mean = values.mean()
+        return cls(len(values), mean, float(((values - mean) ** 2).sum()))
+
+    def merge(self, other):
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.mean, self.m2 = other.n, other.mean, other.m2
+            return self
+
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * other.n / n
+        self.m2 = self.m2 + other.m2 + delta ** 2 * self.n * other.n / n
+        self.n = n
+        return self
+
+    @property
+    def var(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else float("nan")
+
+
+class CoMoments:
+
+    def __init__(self):
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2x = 0.0
+        self.m2y = 0.0
+        self.cxy = 0.0
+
+    @classmethod
+    def from_values(cls, x, y):
+        acc = cls()
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if len(x) == 0:
+            return acc
+        dx = x - x.mean()
+        dy = y - y.mean()
+        acc.n = len(x)
+        acc.mean_x, acc.mean_y = x.mean(), y.mean()
+        acc.m2x, acc.m2y = float(dx @ dx), float(dy @ dy)
+        acc.cxy = float(dx @ dy)
+        return acc
+
+    def merge(self, other):
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+
+        n = self.n + other.n
+        dx = other.mean_x - self.mean_x
+        dy = other.mean_y - self.mean_y
+        w = self.n * other.n / n
+
+        self.mean_x += dx * other.n / n
+        self.mean_y += dy * other.n / n
+        self.m2x += other.m2x + dx * dx * w
+        self.m2y += other.m2y + dy * dy * w
+        self.cxy += other.cxy + dx * dy * w
+        self.n = n
+        return self
+
+
+class LabelColumn:
+    # clean_dataset converts a column to numeric when >80% of *all* rows
+    # parse. That is a whole-file decision, so raw labels are kept and the
+    # numeric relabelling is applied once, at finalize time.
+
+    def __init__(self):
+        self.rows = 0
+        self.numeric = 0
+        self.complete = True
+
+    def update(self, series):
+        numeric, _ = clean_numeric_series(series)
+        self.rows += len(series)
+        self.numeric += int(numeric.notna().sum())
+        self.complete = self.complete and bool(series.notna().all())
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.numeric += other.numeric
+        self.complete = self.complete and other.complete
+        return self
+
+    def is_numeric(self):
+        return self.rows > 0 and self.numeric / self.rows > 0.8
+
+    def relabel(self, labels):
+        # raw label → (sort key, display label); None drops the label
+        if not self.is_numeric():
+            return {lab: (lab, lab) for lab in labels}
+
+        values, _ = clean_numeric_series(pd.Series(list(labels), dtype=object))
+        values = dict(zip(labels, values))
+        numeric = [v for v in values.values() if pd.notna(v)]
+
+        # Mirrors compact_dataframe: complete whole-number columns become ints
+        as_int = self.complete and all(float(v).is_integer() for v in numeric)
+
+        mapping = {}
+        for lab, v in values.items():
+            if pd.isna(v):
+                mapping[lab] = None
+            else:
+                mapping[lab] = (v, str(int(v)) if as_int else str(float(v)))
+        return mapping
+
+
+# ==========================================================
+# TEST ACCUMULATOR
+# ==========================================================
+
+GROUP_TESTS = ["t-test", "ANOVA"]
+
+
+def streaming_kind(test):
+    if is_repeated_test(test):
+        raise ValueError(f"{test} needs subject-aligned data and is not available in streaming mode.")
+    if "Mann-Whitney" in test or "Kruskal" in test or "Spearman" in test:
+        raise ValueError(f"{test} needs full ranks and is not available in streaming mode.")
+    if "t-test" in test:
+        return "t-test"
+    if "ANOVA" in test:
+        return "ANOVA"
+    if "Chi-square" in test:
+        return "Chi-square"
+    if "Pearson" in test:
+        return "Pearson"
+    raise ValueError(f"Unsupported test: {test}")
+
+
+class TestAccumulator:
+
+    def __init__(self, test_plan):
+        self.test = test_plan["selected_test"]
+        self.dv = test_plan["dependent_variable"]
+        self.iv = test_plan["independent_variable"]
+        self.kind = streaming_kind(self.test)
+
+        self.groups = {}
+        self.table = {}
+        self.co = CoMoments()
+        self.dv_labels = LabelColumn()
+        self.iv_labels = LabelColumn()
+
+    def update(self, chunk):
+        dv = chunk[self.dv]
+        iv = chunk[self.iv]
+
+        if self.kind in GROUP_TESTS:
+            self.iv_labels.update(iv)
+            values, _ = clean_numeric_series(dv)
+            mask = iv.notna() & values.notna()
+            for label, v in pd.Series(values[mask].to_numpy(), index=iv[mask].to_numpy()).groupby(level=0):
+                self.groups.setdefault(label, Moments()).merge(Moments.from_values(v.to_numpy()))
+
+        elif self.kind == "Chi-square":
+            self.dv_labels.update(dv)
+            self.iv_labels.update(iv)
+            counts = pd.DataFrame({"r": dv, "c": iv}).dropna().value_counts()
+            for key, count in counts.items():
+                if count:
+                    self.table[key] = self.table.get(key, 0) + int(count)
+
+        else:
+            x, _ = clean_numeric_series(dv)
+            y, _ = clean_numeric_series(iv)
+            mask = x.notna() & y.notna()
+            self.co.merge(CoMoments.from_values(x[mask], y[mask]))
+
+        return self
+
+    def merge(self, other):
+        for label, m in other.groups.items():
+            self.groups.setdefault(label, Moments()).merge(m)
+        for key, count in other.table.items():
+            self.table[key] = self.table.get(key, 0) + count
+        self.co.merge(other.co)
+        self.dv_labels.merge(other.dv_labels)
+        self.iv_labels.merge(other.iv_labels)
+        return self
+
+    # ---------------------------
+    # Finalize
+    # ---------------------------
+
+    def merged_groups(self):
+        mapping = self.iv_labels.relabel(self.groups.keys())
+        merged = {}
+        for label, m in self.groups.items():
+            if mapping[label] is None:
+                continue
+            key, display = mapping[label]
+            entry = merged.setdefault(key, (display, Moments()))
+            entry[1].merge(m)
+        return [merged[k] for k in sorted(merged)]
+
+    def finalize(self):
+        group_stats = None
+        contingency = None
+
+        if self.kind in GROUP_TESTS:
+            groups = self.merged_groups()
+            group_stats = {
+                display: {
+                    "mean": float(m.mean),
+                    "median": None,
+                    "sd": float(np.sqrt(m.var)),
+                    "n": int(m.n)
+                }
+                for display, m in groups
+            }
+            moments = [m for _, m in groups]
+            stat, p, effect, ci = welch_from_moments(moments) if self.kind == "t-test" else anova_from_moments(moments)
+
+        elif self.kind == "Chi-square":
+            stat, p, effect, ci, contingency = chi_square_from_counts(self.table, self.dv_labels, self.iv_labels)
+
+        else:
+            stat, p, effect, ci = pearson_from_comoments(self.co)
+
+        return {
+            "test": self.test,
+            "statistic": float(stat),
+            "p_value": float(p),
+            "effect_size": None if effect is None else float(effect),
+            "effect_measure": effect_measure(self.test),
+            "confidence_interval": ci,
+            "group_statistics": group_stats,
+            "contingency": contingency
+        }
+
+
+# ==========================================================
+# STATISTICS FROM SUFFICIENT STATISTICS
+# ==========================================================
+
+def welch_from_moments(moments):
+    if len(moments) != 2:
+        raise ValueError(f"t-test needs exactly 2 groups, found {len(moments)}.")
+
+    a, b = moments
+    va, vb = a.var / a.n, b.var / b.n
+    t = (a.mean - b.mean) / np.sqrt(va + vb)
+    df = (va + vb) ** 2 / (va ** 2 / (a.n - 1) + vb ** 2 / (b.n - 1))
+    p = 2 * stats.t.sf(abs(t), df)
+
+    g, ci = hedges_g(a.mean, b.mean, np.sqrt(a.var), np.sqrt(b.var), a.n, b.n)
+
+    return t, p, g, ci
+
+
+def anova_from_moments(moments):
+    total = reduce(lambda acc, m: acc.merge(m), moments, Moments())
+    k = len(moments)
+
+    ss_between = sum(m.n * (m.mean - total.mean) ** 2 for m in moments)
+    ss_within = sum(m.m2 for m in moments)
+    df_between, df_within = k - 1, total.n - k
+
+    f = (ss_between / df_between) / (ss_within / df_within)
+    p = stats.f.sf(f, df_between, df_within)
+    omega, ci = omega_squared(f, df_between, df_within)
+
+    return f, p, omega, ci
+
+
+def chi_square_from_counts(counts, row_labels, col_labels):
+    row_map = row_labels.relabel({r for r, _ in counts})
+    col_map = col_labels.relabel({c for _, c in counts})
+
+    cells = {}
+    for (r, c), count in counts.items():
+        if row_map[r] is None or col_map[c] is None:
+            continue
+        key = (row_map[r][0], col_map[c][0])
+        cells[key] = cells.get(key, 0) + count
+
+    rows = sorted({r for r, _ in cells})
+    cols = sorted({c for _, c in cells})
+    table = np.zeros((len(rows), len(cols)))
+    for (r, c), count in cells.items():
+        table[rows.index(r), cols.index(c)] = count
+
+    return contingency_test(table)
+
+
+def pearson_from_comoments(co):
+    r = co.cxy / np.sqrt(co.m2x * co.m2y)
+    r = float(np.clip(r, -1.0, 1.0))
+    df = co.n - 2
+    ci = correlation_ci(r, co.n)
+    if abs(r) == 1.0:
+        return r, 0.0, r, ci
+    t = r * np.sqrt(df / (1 - r ** 2))
+    p = 2 * stats.t.sf(abs(t), df)
+    return r, p, r, ci
+
+
+# ==========================================================
+# DRIVERS
+# ==========================================================
+
+def resolve_columns(path, wanted):
+    # clean_dataset strips whitespace / NBSP from headers; match the same way
+    header = pd.read_csv(path, nrows=0).columns
+    normalized = {str(c).strip().replace("\u00a0", " "): c for c in header}
+    missing = [c for c in wanted if c not in normalized]
+    if missing:
+        raise KeyError(f"Columns not found in {path}: {missing}")
+    return {normalized[c]: c for c in wanted}
+
+
+def accumulate_file(path, test_plan, chunksize=250_000):
+    acc = TestAccumulator(test_plan)
+    rename = resolve_columns(path, [acc.dv, acc.iv])
+
+    reader = pd.read_csv(path, usecols=list(rename), dtype=str, chunksize=chunksize)
+    for chunk in reader:
+        acc.update(chunk.rename(columns=rename))
+
+    return acc
+
+
+@traced()
+def stream_execute_test(sources, test_plan, chunksize=250_000, max_workers=None):
+    if isinstance(sources, str):
+        sources = [sources]
+
+    if max_workers and len(sources) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            partials = list(pool.map(
+                accumulate_file,
+                sources,
+                [test_plan] * len(sources),
+                [chunksize] * len(sources)
+            ))
+    else:
+        partials = [accumulate_file(path, test_plan, chunksize) for path in sources]
+
+    return reduce(lambda a, b: a.merge(b), partials).finalize()
@@ -0,0 +1,439 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from core.stats_engine import factorize_groups
+from core.stratified import stratum_codes
+from core.regression import build_design, binary_outcome, is_categorical
+from core.instrumentation import traced
+
+
+SURVIVAL_TESTS = ["Kaplan", "Log-rank", "Logrank", "Cox"]
+
+Z_95 = stats.norm.isf(0.025)
+
+
+def is_survival_test(test):
+    return any(t in test for t in SURVIVAL_TESTS)
+
+
+# ==========================================================
+# INPUT
+# ==========================================================
+
+def event_indicator(series):
+    # 0/1, False/True or two labels (second sorted level = event, e.g. Dead)
+    if pd.api.types.is_bool_dtype(series):
+        return series.astype(float).where(series.notna())
+    if pd.api.types.is_numeric_dtype(series) and not isinstance(series.dtype, pd.CategoricalDtype):
+        values = series.dropna().unique()
+        if set(values.tolist()) <= {0, 1}:
+            return series.astype(float)
+    indicator, _ = binary_outcome(series)
+    return indicator
+
+
+def survival_frame(df, time, event, columns=()):
+    # Complete rows with a non-negative time and a 0/1 event indicator
+    out = pd.DataFrame({
+        "time": pd.to_numeric(df[time], errors="coerce"),
+        "event": event_indicator(df[event])
+    }, index=df.index)
+    for col in columns:
+        out[col] = df[col]
+    out = out.dropna()
+    return out[out["time"] >= 0]
+
+
+# ==========================================================
+# RISK-SET TABLES
+# ==========================================================
+# Everything is built from one sort: per distinct time the number of
+# events and of rows leaving the risk set; the number at risk is then a
+# reverse cumulative sum.
+
+def risk_table(time, event, weights=None):
+    unique_times, inverse = np.unique(time, return_inverse=True)
+    leaving = np.bincount(inverse, weights=weights, minlength=len(unique_times))
+    events = np.bincount(inverse, weights=event if weights is None else event * weights, minlength=len(unique_times))
+    at_risk = np.cumsum(leaving[::-1])[::-1]
+    return unique_times, at_risk, events, leaving
+
+
+@traced()
+def kaplan_meier(time, event):
+    time = np.asarray(time, dtype=float)
+    event = np.asarray(event, dtype=float)
+    t, n, d, leaving = risk_table(time, event)
+
+    survival = np.cumprod(1 - d / n)
+
+    # Greenwood variance, CI on the log(-log) scale so bounds stay in (0, 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        greenwood = np.cumsum(np.where(n > d, d / (n * (n - d)), 0.0))
+        log_s = np.log(survival)
+        se_loglog = np.sqrt(greenwood) / np.abs(log_s)
+        ci_low = survival ** np.exp(Z_95 * se_loglog)
+        ci_high = survival ** np.exp(-Z_95 * se_loglog)
+    ci_low = np.where(np.isfinite(ci_low), ci_low, np.where(survival > 0, survival, 0.0))
+    ci_high = np.where(np.isfinite(ci_high), ci_high, np.where(survival > 0, survival, 0.0))
+
+    return pd.DataFrame({
+        "time": t,
+        "n_risk": n.astype(int),
+        "n_event": d.astype(int),
+        "n_censored": (leaving - d).astype(int),
+        "survival": survival,
+        "ci_low": ci_low,
+        "ci_high": ci_high
+    })
+
+
+def median_survival(table):
+    # First time the curve (and its CI bounds) reach 0.5 (Brookmeyer-Crowley)
+    def first_below(column):
+        hit = table.loc[table[column] <= 0.5, "time"]
+        return float(hit.iloc[0]) if len(hit) else None
+
+    return first_below("survival"), first_below("ci_low"), first_below("ci_high")
+
+
+def km_by_group(df, time, event, group=None):
+    data = survival_frame(df, time, event, [group] if group else [])
+    if not group:
+        return {"All": kaplan_meier(data["time"], data["event"])}
+
+    codes, labels = factorize_groups(data[group])
+    return {
+        str(label): kaplan_meier(data["time"].to_numpy()[codes == i], data["event"].to_numpy()[codes == i])
+        for i, label in enumerate(labels)
+    }
+
+
+# ==========================================================
+# LOG-RANK
+# ==========================================================
+
+def logrank_components(time, event, codes, k):
+    # Observed - expected events per group and their covariance, from a
+    # (distinct time × group) table of events and at-risk counts
+    unique_times, inverse = np.unique(time, return_inverse=True)
+    cells = inverse * k + codes
+    size = len(unique_times) * k
+
+    leaving = np.bincount(cells, minlength=size).reshape(-1, k)
+    events = np.bincount(cells, weights=event, minlength=size).reshape(-1, k)
+    at_risk = np.cumsum(leaving[::-1], axis=0)[::-1]
+
+    d = events.sum(axis=1)
+    n = at_risk.sum(axis=1)
+    keep = d > 0
+    events, at_risk, d, n = events[keep], at_risk[keep], d[keep], n[keep]
+
+    p = at_risk / n[:, None]
+    observed = events.sum(axis=0)
+    expected = (p * d[:, None]).sum(axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w = np.where(n > 1, d * (n - d) / (n - 1), 0.0)
+    V = np.diag((w[:, None] * p).sum(axis=0)) - (p * w[:, None]).T @ p
+
+    return observed, expected, V
+
+
+@traced()
+def logrank_test(df, time, event, group, strata=None):
+    strata = list(strata or [])
+    data = survival_frame(df, time, event, [group] + strata)
+    codes, labels = factorize_groups(data[group])
+    k = len(labels)
+    if k < 2:
+        raise ValueError(f"Log-rank test needs at least 2 groups in '{group}', found {k}.")
+
+    if strata:
+        s_codes, _ = stratum_codes(data, strata)
+    else:
+        s_codes = np.zeros(len(data), dtype=np.int64)
+
+    t = data["time"].to_numpy()
+    e = data["event"].to_numpy()
+    observed = np.zeros(k)
+    expected = np.zeros(k)
+    V = np.zeros((k, k))
+
+    # Stratified test: O - E and V are summed over strata
+    for s in np.unique(s_codes[s_codes >= 0]):
+        mask = s_codes == s
+        o, ex, v = logrank_components(t[mask], e[mask], codes[mask], k)
+        observed += o
+        expected += ex
+        V += v
+
+    diff = (observed - expected)[:-1]
+    stat = float(diff @ np.linalg.solve(V[:-1, :-1], diff))
+    p = float(stats.chi2.sf(stat, k - 1))
+
+    hr, ci = None, None
+    if k == 2:
+        # Peto approximation: log HR ≈ (O - E) / V, second group vs the first
+        # (reference) level, the same direction as the Cox treatment coding
+        log_hr = (observed[1] - expected[1]) / V[1, 1]
+        se = 1 / np.sqrt(V[1, 1])
+        hr = float(np.exp(log_hr))
+        ci = [float(np.exp(log_hr - Z_95 * se)), float(np.exp(log_hr + Z_95 * se))]
+
+    return {
+        "statistic": stat,
+        "p_value": p,
+        "df": k - 1,
+        "labels": [str(l) for l in labels],
+        "observed": observed.tolist(),
+        "expected": expected.tolist(),
+        "hazard_ratio": hr,
+        "confidence_interval": ci
+    }
+
+
+# ==========================================================
+# COX PROPORTIONAL HAZARDS
+# ==========================================================
+# Efron's tie correction. Per iteration the data are already sorted, so
+# risk-set sums S0, S1, S2 are reverse cumulative sums read off at the
+# first row of each distinct time: O(n p²) per Newton step.
+
+def cox_stratum_setup(time, event):
+    order = np.argsort(time, kind="stable")
+    t = time[order]
+    unique_times, first, inverse = np.unique(t, return_index=True, return_inverse=True)
+
+    ev = event[order] > 0
+    tie_counts = np.bincount(inverse[ev], minlength=len(unique_times))
+    event_times = np.flatnonzero(tie_counts)
+
+    # One row per event: its distinct-time slot and Efron fraction l / d
+    event_slot = np.repeat(event_times, tie_counts[event_times])
+    starts = np.cumsum(tie_counts[event_times]) - tie_counts[event_times]
+    position = np.arange(len(event_slot)) - np.repeat(starts, tie_counts[event_times])
+    fraction = position / tie_counts[event_slot]
+
+    return {
+        "order": order,
+        "first": first,
+        "inverse": inverse,
+        "event": ev,
+        "event_slot": event_slot,
+        "fraction": fraction,
+        "n_slots": len(unique_times)
+    }
+
+
+def cox_stratum_terms(X, beta, setup):
+    Xs = X[setup["order"]]
+    ev = setup["event"]
+    xb = Xs @ beta
+    r = np.exp(xb - xb.max())
+    scale = xb.max()
+
+    rx = r[:, None] * Xs
+    rxx = rx[:, :, None] * Xs[:, None, :]
+
+    # Risk sets: everyone with time ≥ t
+    s0 = np.cumsum(r[::-1])[::-1][setup["first"]]
+    s1 = np.cumsum(rx[::-1], axis=0)[::-1][setup["first"]]
+    s2 = np.cumsum(rxx[::-1], axis=0)[::-1][setup["first"]]
+
+    # Tied events at each distinct time
+    inv = setup["inverse"][ev]
+    d0 = np.bincount(inv, weights=r[ev], minlength=setup["n_slots"])
+    d1 = np.stack([np.bincount(inv, weights=rx[ev, j], minlength=setup["n_slots"]) for j in range(X.shape[1])], axis=1)
+    p = X.shape[1]
+    d2 = np.stack([
+        np.bincount(inv, weights=rxx[ev, j, l], minlength=setup["n_slots"])
+        for j in range(p) for l in range(p)
+    ], axis=1).reshape(-1, p, p)
+
+    slot, f = setup["event_slot"], setup["fraction"]
+    den = s0[slot] - f * d0[slot]
+    num1 = s1[slot] - f[:, None] * d1[slot]
+    num2 = s2[slot] - f[:, None, None] * d2[slot]
+
+    ll = float(xb[ev].sum() - np.sum(np.log(den) + scale))
+    grad = Xs[ev].sum(axis=0) - (num1 / den[:, None]).sum(axis=0)
+    mean = num1 / den[:, None]
+    info = (num2 / den[:, None, None]).sum(axis=0) - np.einsum("ei,ej->ij", mean, mean)
+
+    return ll, grad, info
+
+
+def cox_terms(X, beta, setups):
+    ll, grad, info = 0.0, np.zeros(len(beta)), np.zeros((len(beta), len(beta)))
+    for idx, setup in setups:
+        l, g, h = cox_stratum_terms(X[idx], beta, setup)
+        ll += l
+        grad += g
+        info += h
+    return ll, grad, info
+
+
+@traced()
+def fit_cox(df, time, event, predictors, strata=None, max_iter=50, tol=1e-9):
+    strata = list(strata or [])
+    data = survival_frame(df, time, event, list(dict.fromkeys(predictors + strata)))
+    X_df, terms = build_design(data, predictors)
+    X_df = X_df.drop(columns="Intercept")
+    X = X_df.to_numpy(dtype=float)
+    t = data["time"].to_numpy()
+    e = data["event"].to_numpy()
+
+    if strata:
+        s_codes, _ = stratum_codes(data, strata)
+    else:
+        s_codes = np.zeros(len(data), dtype=np.int64)
+
+    setups = []
+    for s in np.unique(s_codes[s_codes >= 0]):
+        idx = np.flatnonzero(s_codes == s)
+        setups.append((idx, cox_stratum_setup(t[idx], e[idx])))
+
+    beta = np.zeros(X.shape[1])
+    ll_null, grad, info = cox_terms(X, beta, setups)
+    ll = ll_null
+
+    for _ in range(max_iter):
+        step = np.linalg.solve(info, grad)
+        # Step halving keeps Newton from overshooting on near-separated data
+        for _ in range(20):
+            new_ll, new_grad, new_info = cox_terms(X, beta + step, setups)
+            if new_ll >= ll - 1e-12:
+                break
+            step = step / 2
+        beta = beta + step
+        converged = abs(new_ll - ll) < tol
+        ll, grad, info = new_ll, new_grad, new_info
+        if converged:
+            break
+
+    cov = np.linalg.inv(info)
+    se = np.sqrt(np.diag(cov))
+
+    return {
+        "params": pd.Series(beta, index=X_df.columns),
+        "se": pd.Series(se, index=X_df.columns),
+        "cov": cov,
+        "terms": terms,
+        "log_likelihood": ll,
+        "log_likelihood_null": ll_null,
+        "n": int(len(data)),
+        "events": int(e.sum())
+    }
+
+
+def cox_coefficients(fit):
+    rows = []
+    for term in fit["params"].index:
+        b, se = fit["params"][term], fit["se"][term]
+        z = b / se
+        rows.append({
+            "term": term,
+            "estimate": float(np.exp(b)),
+            "se": float(se),
+            "statistic": float(z),
+            "p_value": float(2 * stats.norm.sf(abs(z))),
+            "ci_low": float(np.exp(b - Z_95 * se)),
+            "ci_high": float(np.exp(b + Z_95 * se))
+        })
+    return rows
+
+
+# ==========================================================
+# ENTRY POINT
+# ==========================================================
+
+def is_grouping(series, max_levels=20):
+    return is_categorical(series) or series.nunique() <= max_levels
+
+
+def survival_summary(df, time, event, group):
+    summary = {}
+    for label, table in km_by_group(df, time, event, group).items():
+        median, lo, hi = median_survival(table)
+        summary[label] = {
+            "mean": None,
+            "median": median,
+            "sd": None,
+            "n": int(table["n_risk"].iloc[0]) if len(table) else 0,
+            "events": int(table["n_event"].sum()),
+            "median_ci": [lo, hi]
+        }
+    return summary
+
+
+@traced()
+def execute_survival(df, test_plan):
+    time = test_plan["dependent_variable"]
+    group = test_plan["independent_variable"]
+    test = test_plan["selected_test"]
+    event = test_plan.get("event")
+    strata = test_plan.get("strata") or []
+    covariates = [c for c in test_plan.get("covariates") or [] if c not in (time, group, event)]
+
+    if not event:
+        raise ValueError(f"{test} needs an event indicator column (\"event\" in the test plan).")
+
+    if "Cox" in test:
+        predictors = [group] + covariates
+        fit = fit_cox(df, time, event, predictors, strata)
+        coefficients = cox_coefficients(fit)
+
+        exposure = fit["terms"][group]
+        if len(exposure) == 1:
+            row = next(r for r in coefficients if r["term"] == exposure[0])
+            stat, p, effect, ci = row["statistic"], row["p_value"], row["estimate"], [row["ci_low"], row["ci_high"]]
+        else:
+            idx = [list(fit["params"].index).index(t) for t in exposure]
+            b = fit["params"].to_numpy()[idx]
+            stat = float(b @ np.linalg.solve(fit["cov"][np.ix_(idx, idx)], b))
+            p, effect, ci = float(stats.chi2.sf(stat, len(idx))), None, None
+
+        lr = 2 * (fit["log_likelihood"] - fit["log_likelihood_null"])
+        extra = {
+            "n": fit["n"],
+            "events": fit["events"],
+            "covariates": covariates,
+            "cov_type": "model-based",
+            "coefficients": coefficients,
+            "model": {
+                "effect_measure": "hazard ratio",
+                "ties": "efron",
+                "strata": strata,
+                "lr_chi2": float(lr),
+                "lr_p_value": float(stats.chi2.sf(lr, len(fit["params"])))
+            }
+        }
+
+    else:
+        lr = logrank_test(df, time, event, group, strata)
+        stat, p = lr["statistic"], lr["p_value"]
+        effect, ci = lr["hazard_ratio"], lr["confidence_interval"]
+        extra = {
+            "events": int(sum(lr["observed"])),
+            "logrank": {
+                "df": lr["df"],
+                "strata": strata,
+                "observed": dict(zip(lr["labels"], lr["observed"])),
+                "expected": dict(zip(lr["labels"], lr["expected"]))
+            }
+        }
+
+    result = {
+        "test": test,
+        "statistic": float(stat),
+        "p_value": float(p),
+        "effect_size": None if effect is None else float(effect),
+        "confidence_interval": ci,
+        "group_statistics": survival_summary(df, time, event, group) if is_grouping(df[group]) else None,
+        "design": "time to event",
+        "event": event
+    }
+    result.update(extra)
+    return result
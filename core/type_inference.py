@@ -0,0 +1,168 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from core.instrumentation import traced
+
+TYPE_SAMPLE_ROWS = 5000
+NUMERIC_SHARE = 0.9         # share of values that must read as numbers
+MAX_CATEGORY_LEVELS = 10
+REPEAT_RATIO = 0.05         # unique/observed below this → encoded category
+DATETIME_SHARE = 0.9
+
+
+# ---------------------------
+# Ordered scales
+# ---------------------------
+# Text levels that all come from one of these scales are suggested as
+# ordinal; the tuple order is the scale order.
+
+ORDINAL_SCALES = [
+    ("strongly disagree", "disagree", "neither agree nor disagree", "neutral", "agree", "strongly agree"),
+    ("never", "rarely", "sometimes", "often", "usually", "always"),
+    ("none", "minimal", "mild", "moderate", "severe", "very severe"),
+    ("very low", "low", "medium", "moderate", "high", "very high"),
+    ("very poor", "poor", "fair", "good", "very good", "excellent"),
+    ("never", "former", "current"),
+]
+
+# Stage/grade/class labels: "Stage II", "grade 3", "NYHA IV", "T2"
+GRADED_LEVEL = re.compile(r"^(stage|grade|class|nyha|level|tier|t|n)?\s*(0|[1-5]|i{1,3}|iv|v)[abc]?$")
+ROMAN = {"i": 1, "ii": 2, "iii": 3, "iv": 4, "v": 5}
+
+DATE_LIKE = re.compile(
+    r"^\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}([ T]\d{1,2}:\d{2}.*)?$"
+    r"|^\d{1,2}[ -]?[a-z]{3,9}[ -,]*\d{2,4}$"
+    r"|^[a-z]{3,9}[ -]\d{1,2},? \d{2,4}$"
+)
+
+
+def ordinal_levels(levels):
+    # Scale order of the given text levels, or None when they are not an
+    # ordered scale
+    normalized = [str(level).strip().lower() for level in levels]
+    if len(set(normalized)) < 3:
+        return None
+
+    for scale in ORDINAL_SCALES:
+        if set(normalized) <= set(scale):
+            return sorted(levels, key=lambda level: scale.index(str(level).strip().lower()))
+
+    matches = [GRADED_LEVEL.match(level) for level in normalized]
+    if all(matches) and len({m.group(1) for m in matches}) == 1:
+        rank = [int(m.group(2)) if m.group(2).isdigit() else ROMAN[m.group(2)] for m in matches]
+        return [level for _, level in sorted(zip(rank, levels), key=lambda pair: (pair[0], str(pair[1])))]
+
+    return None
+
+
+def is_integer_scale(unique):
+    # 1–5, 1–7, 0–10 style rating scales: whole numbers, no gaps, start at 0 or 1
+    return (
+        5 <= len(unique) <= 11
+        and np.array_equal(unique, np.round(unique))
+        and unique[0] in (0, 1)
+        and unique[-1] - unique[0] == len(unique) - 1
+    )
+
+
+# ==========================================================
+# SINGLE COLUMN
+# ==========================================================
+
+def classify(series, numeric_share=None):
+    # Returns (type, ambiguous); ambiguous means the call sits close enough
+    # to a threshold that a sample may have decided it differently from the
+    # full column
+    if isinstance(series.dtype, pd.CategoricalDtype) and series.dtype.ordered:
+        return "ordinal", False
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return "datetime", False
+
+    observed = series.dropna()
+    n = len(observed)
+    if n == 0 or pd.api.types.is_bool_dtype(series.dtype):
+        return "categorical", False
+
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        values = observed.to_numpy(dtype=float)
+        share = 1.0
+        known = True
+    else:
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            observed = observed.astype(object)
+        known = numeric_share is not None
+        if known and numeric_share < NUMERIC_SHARE:
+            return classify_text(observed), False
+        values = pd.to_numeric(observed, errors="coerce").dropna().to_numpy(dtype=float)
+        share = numeric_share if known else len(values) / n
+
+    # Within 3 standard errors of the cut-off, a sampled share could fall
+    # on either side of it
+    near_share = not known and abs(share - NUMERIC_SHARE) < 3 * np.sqrt(share * (1 - share) / n)
+
+    if share < NUMERIC_SHARE:
+        return classify_text(observed), near_share
+
+    unique, counts = np.unique(values, return_counts=True)
+    if is_integer_scale(unique):
+        return "ordinal", False
+    if len(unique) <= MAX_CATEGORY_LEVELS:
+        return "categorical", False
+
+    # Repeats are judged at a fixed size: the expected number of distinct
+    # values in TYPE_SAMPLE_ROWS draws. A raw unique/observed ratio keeps
+    # falling as rows are added, so a long export of a measured value would
+    # otherwise turn categorical, and a sample would disagree with a full scan
+    m = min(len(values), TYPE_SAMPLE_ROWS)
+    distinct = len(unique) if m == len(values) else np.sum(1 - (1 - counts / len(values)) ** m)
+    ratio = distinct / m
+    near_ratio = REPEAT_RATIO / 2 <= ratio < REPEAT_RATIO * 2
+    return ("categorical" if ratio < REPEAT_RATIO else "continuous"), near_share or near_ratio
+
+
+def classify_text(observed):
+    text = observed.astype(str).str.strip()
+    lowered = text.str.lower()
+
+    if lowered.str.match(DATE_LIKE).mean() >= DATETIME_SHARE:
+        parsed = pd.to_datetime(text, errors="coerce", format="mixed")
+        if parsed.notna().mean() >= DATETIME_SHARE:
+            return "datetime"
+
+    if ordinal_levels(text.unique().tolist()) is not None:
+        return "ordinal"
+
+    return "categorical"
+
+
+# ==========================================================
+# WHOLE FRAME
+# ==========================================================
+# Every column is classified on the same bounded row sample, taken once;
+# only columns whose sample verdict is ambiguous are re-run on all rows.
+# Cleaning leaves the full-column numeric share in df.attrs["numeric_share"],
+# so text columns are not coerced a second time to decide that.
+
+def sample_rows(df, size, seed=0):
+    if len(df) <= size:
+        return df
+    positions = np.sort(np.random.default_rng(seed).choice(len(df), size, replace=False))
+    return df.iloc[positions]
+
+
+@traced()
+def infer_variable_types(df, sample_size=TYPE_SAMPLE_ROWS, seed=0):
+    sample = sample_rows(df, sample_size, seed)
+    known = df.attrs.get("numeric_share", {})
+    sampled = len(sample) < len(df)
+
+    types = {}
+    for col in df.columns:
+        var_type, ambiguous = classify(sample[col], known.get(col))
+        if ambiguous and sampled:
+            var_type, _ = classify(df[col], known.get(col))
+        types[col] = var_type
+
+    return types
@@ -1,7 +1,10 @@
+import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
+from core.instrumentation import traced
 
 
+@traced()
 def boxplot_by_group(df, dv, iv):
     fig, ax = plt.subplots(figsize=(6,4))
     sns.boxplot(data=df, x=iv, y=dv, ax=ax)
@@ -9,8 +12,111 @@ def boxplot_by_group(df, dv, iv):
     return fig
 
 
+@traced()
 def distribution_plot(df, dv):
     fig, ax = plt.subplots(figsize=(6,4))
     sns.histplot(df[dv].dropna(), kde=True, ax=ax)
     ax.set_title(f"Distribution of {dv}")
-    return fig
\ No newline at end of file
+    return fig
+
+
+def trace_waterfall(spans):
+    fig, ax = plt.subplots(figsize=(8, max(2, 0.35 * len(spans) + 1)))
+
+    spans = sorted(spans, key=lambda s: s["start"])
+    labels = [("  " * s["depth"]) + s["name"] for s in spans]
+
+    ax.barh(
+        range(len(spans)),
+        [s["wall"] for s in spans],
+        left=[s["start"] for s in spans],
+        color=["#e53935" if s.get("error") else "#1e88e5" for s in spans]
+    )
+    ax.set_yticks(range(len(spans)))
+    ax.set_yticklabels(labels, fontsize=8)
+    ax.invert_yaxis()
+    ax.set_xlabel("Seconds since start of run")
+    ax.set_title("Stage waterfall")
+    return fig
+
+
+ALPHA_STYLES = ["-", "--", ":", "-."]
+
+
+@traced()
+def power_curve_plot(grid, target_power=0.8):
+    # One curve per effect size (colour) and alpha (line style)
+    fig, ax = plt.subplots(figsize=(7, 4))
+
+    alphas = sorted(grid["alpha"].unique())
+    effects = sorted(grid["effect_size"].unique())
+    colors = {e: f"C{i % 10}" for i, e in enumerate(effects)}
+    styles = {a: ALPHA_STYLES[i % len(ALPHA_STYLES)] for i, a in enumerate(alphas)}
+
+    for (alpha, effect), g in grid.groupby(["alpha", "effect_size"]):
+        ax.plot(
+            g["n"], g["power"], color=colors[effect], linestyle=styles[alpha],
+            label=f"{effect:.2f}" if alpha == alphas[0] else None
+        )
+
+    ax.axhline(target_power, linewidth=0.8, color="#90a4ae")
+    ax.set_ylim(0, 1)
+    ax.set_xlabel("Sample size")
+    ax.set_ylabel("Power")
+    ax.set_title(f"Power curves (α = {', '.join(f'{a:g}' for a in alphas)})")
+    effect_legend = ax.legend(title="Effect size", fontsize=7, loc="lower right")
+    if len(alphas) > 1:
+        ax.add_artist(effect_legend)
+        handles = [plt.Line2D([], [], color="#455a64", linestyle=styles[a]) for a in alphas]
+        ax.legend(handles, [f"{a:g}" for a in alphas], title="α", fontsize=7, loc="center right")
+    return fig
+
+
+@traced()
+def km_plot(curves, time_label="Time", title="Kaplan-Meier survival"):
+    fig, ax = plt.subplots(figsize=(6, 4))
+
+    for label, table in curves.items():
+        # Curves start at S(0) = 1 and step down after each event time
+        t = [0.0] + table["time"].tolist()
+        s = [1.0] + table["survival"].tolist()
+        lo = [1.0] + table["ci_low"].tolist()
+        hi = [1.0] + table["ci_high"].tolist()
+
+        line, = ax.step(t, s, where="post", label=f"{label} (n={table['n_risk'].iloc[0]})")
+        ax.fill_between(t, lo, hi, step="post", alpha=0.15, color=line.get_color())
+
+        censored = table[table["n_censored"] > 0]
+        ax.plot(censored["time"], censored["survival"], "|", color=line.get_color(), markersize=6)
+
+    ax.set_ylim(0, 1.02)
+    ax.set_xlabel(time_label)
+    ax.set_ylabel("Survival probability")
+    ax.set_title(title)
+    ax.legend(fontsize=7)
+    return fig
+
+
+@traced()
+def volcano_plot(table, q_threshold=0.05, label_top=10):
+    fig, ax = plt.subplots(figsize=(7, 5))
+
+    table = table.dropna(subset=["p_value", "effect_size"])
+    hit = table["q_value"] < q_threshold
+    y = -np.log10(table["p_value"].clip(lower=1e-300))
+
+    ax.scatter(table.loc[~hit, "effect_size"], y[~hit], s=12, color="#90a4ae", alpha=0.7, label=f"q ≥ {q_threshold:g}")
+    ax.scatter(table.loc[hit, "effect_size"], y[hit], s=16, color="#e53935", label=f"q < {q_threshold:g}")
+
+    for _, row in table.nsmallest(label_top, "p_value").iterrows():
+        ax.annotate(
+            row["outcome"], (row["effect_size"], -np.log10(max(row["p_value"], 1e-300))),
+            fontsize=7, xytext=(3, 3), textcoords="offset points"
+        )
+
+    ax.axvline(0, color="#cfd8dc", linewidth=0.8)
+    ax.set_xlabel(table["effect_measure"].iloc[0] if len(table) else "Effect size")
+    ax.set_ylabel("−log10 p")
+    ax.set_title(f"{table['test'].iloc[0] if len(table) else 'Screen'}: {len(table)} outcomes, {int(hit.sum())} with q < {q_threshold:g}")
+    ax.legend(fontsize=7)
+    return fig
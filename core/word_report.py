@@ -2,8 +2,10 @@ from docx import Document
 from docx.shared import Inches
 import tempfile
 import os
+from core.instrumentation import traced
 
 
+@traced()
 def generate_word_report(
     test_plan,
     results,
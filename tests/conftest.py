@@ -0,0 +1,43 @@
+import os
+import sys
+import tempfile
+
+# Every on-disk store reads its location from the environment at import
+# time, so point them at a throwaway directory before any module loads
+_tmp = tempfile.mkdtemp(prefix="medstats_tests_")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ["MEDSTATS_RESULT_CACHE"] = os.path.join(_tmp, "results.sqlite")
+os.environ["MEDSTATS_HISTORY_DB"] = os.path.join(_tmp, "history.sqlite")
+os.environ["MEDSTATS_LITERATURE_DB"] = os.path.join(_tmp, "literature.sqlite")
+os.environ["MEDSTATS_API_CACHE_DIR"] = os.path.join(_tmp, "datasets")
+os.environ["MEDSTATS_API_WORKERS"] = "2"
+os.environ["MEDSTATS_LITERATURE_SUMMARY"] = "0"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def two_groups():
+    rng = np.random.default_rng(0)
+    n = 300
+    return pd.DataFrame({
+        "outcome": rng.normal(10, 2, n) + np.repeat([0.0, 0.6], n // 2),
+        "group": np.repeat(["A", "B"], n // 2),
+        "age": rng.normal(50, 10, n),
+        "sex": rng.choice(["M", "F"], n)
+    })
+
+
+@pytest.fixture
+def three_groups():
+    rng = np.random.default_rng(1)
+    n = 240
+    return pd.DataFrame({
+        "outcome": rng.gamma(2, 2, n) + np.repeat([0.0, 0.5, 1.0], n // 3),
+        "group": np.repeat(["A", "B", "C"], n // 3),
+        "site": rng.choice(["X", "Y", "Z"], n)
+    })
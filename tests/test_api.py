@@ -0,0 +1,111 @@
+import io
+import os
+
+from scipy import stats
+from starlette.testclient import TestClient
+
+import api
+
+
+def upload(client, df):
+    buf = io.BytesIO()
+    df.to_csv(buf, index=False)
+    response = client.post("/datasets", files={"file": ("data.csv", buf.getvalue(), "text/csv")})
+    assert response.status_code == 200
+    return response.json()["dataset_id"]
+
+
+def test_ttest_matches_scipy(two_groups):
+    with TestClient(api.app) as client:
+        dataset_id = upload(client, two_groups)
+        response = client.post(f"/datasets/{dataset_id}/tests", json={
+            "dependent_variable": "outcome",
+            "independent_variable": "group",
+            "selected_test": "Independent t-test"
+        })
+
+    assert response.status_code == 200
+    a = two_groups.loc[two_groups.group == "A", "outcome"]
+    b = two_groups.loc[two_groups.group == "B", "outcome"]
+    expected = stats.ttest_ind(a, b, equal_var=False)
+    assert abs(response.json()["statistic"] - expected.statistic) < 1e-8
+    assert abs(response.json()["p_value"] - expected.pvalue) < 1e-8
+
+
+def test_unknown_dataset_is_404():
+    with TestClient(api.app) as client:
+        response = client.post("/datasets/nope/tests", json={
+            "dependent_variable": "y", "independent_variable": "x", "selected_test": "ANOVA"
+        })
+    assert response.status_code == 404
+
+
+def test_datasets_survive_a_restart(three_groups):
+    plan = {"dependent_variable": "outcome", "independent_variable": "group", "selected_test": "ANOVA"}
+    with TestClient(api.app) as client:
+        dataset_id = upload(client, three_groups)
+
+    # A new lifespan starts with an empty in-memory map, as after a restart
+    with TestClient(api.app) as client:
+        assert client.get(f"/datasets/{dataset_id}").json()["n_rows"] == len(three_groups)
+        response = client.post(f"/datasets/{dataset_id}/tests", json=plan)
+
+    assert response.status_code == 200
+    expected = stats.f_oneway(*[g["outcome"] for _, g in three_groups.groupby("group")])
+    assert abs(response.json()["statistic"] - expected.statistic) < 1e-8
+
+
+def test_frame_without_metadata_is_404(two_groups):
+    with TestClient(api.app) as client:
+        dataset_id = upload(client, two_groups.head(50))
+    os.remove(api.meta_path(api.dataset_path(dataset_id)))
+
+    with TestClient(api.app) as client:
+        response = client.post(f"/datasets/{dataset_id}/tests", json={
+            "dependent_variable": "outcome", "independent_variable": "group", "selected_test": "Independent t-test"
+        })
+    assert response.status_code == 404
+
+
+def test_recorded_runs_are_listed(two_groups):
+    with TestClient(api.app) as client:
+        dataset_id = upload(client, two_groups)
+        result = client.post(f"/datasets/{dataset_id}/tests", json={
+            "dependent_variable": "age", "independent_variable": "sex", "selected_test": "Mann-Whitney U"
+        }).json()
+        runs = client.get("/runs", params={"test": "Mann-Whitney"}).json()
+        run = client.get(f"/runs/{result['run_id']}").json()
+
+    assert result["run_id"] in {r["id"] for r in runs}
+    assert run["p_value"] == result["p_value"]
+
+
+def test_engine_errors_are_422(two_groups):
+    with TestClient(api.app) as client:
+        dataset_id = upload(client, two_groups.assign(group="A"))
+        response = client.post(f"/datasets/{dataset_id}/tests", json={
+            "dependent_variable": "outcome", "independent_variable": "group",
+            "selected_test": "Mann-Whitney U"
+        })
+
+    # One group: the engine fails outside its KeyError/ValueError checks
+    assert response.status_code == 422
+    assert response.json()["error"].startswith("IndexError")
+
+
+def test_dataset_cache_evicts_least_recently_used(two_groups, tmp_path, monkeypatch):
+    monkeypatch.setattr(api, "CACHE_DIR", str(tmp_path))
+    with TestClient(api.app) as client:
+        first = upload(client, two_groups)
+        size = sum(f.stat().st_size for f in tmp_path.iterdir())
+        monkeypatch.setattr(api, "CACHE_MAX_BYTES", int(2.5 * size))
+
+        second = upload(client, two_groups.iloc[:-1])
+        assert client.get(f"/datasets/{first}").status_code == 200
+        third = upload(client, two_groups.iloc[:-2])
+
+        # The first dataset was used after the second, so the second goes
+        assert client.get(f"/datasets/{second}").status_code == 404
+        assert client.get(f"/datasets/{first}").status_code == 200
+        assert client.get(f"/datasets/{third}").status_code == 200
+    assert sum(f.stat().st_size for f in tmp_path.iterdir()) <= 2.5 * size
@@ -0,0 +1,28 @@
+import numpy as np
+
+from agents.data_cleaning import clean_dataset
+from benchmarks.run_benchmarks import build_cases, TEST_PLANS
+from benchmarks.synthetic import make_clinical_dataset
+
+
+def test_synthetic_dataset_shape_and_missingness():
+    df = make_clinical_dataset(5000, n_cols=30, seed=3, missing_rate=0.1)
+    assert df.shape == (5000, 30)
+    assert df[["arm", "site", "outcome"]].notna().all().all()
+    assert abs(df["age"].isna().mean() - 0.1) < 0.02
+    # Same seed, same data
+    assert df.equals(make_clinical_dataset(5000, n_cols=30, seed=3, missing_rate=0.1))
+
+
+def test_dirty_numeric_text_is_recoverable():
+    df = make_clinical_dataset(2000, seed=1, missing_rate=0)
+    cleaned, _ = clean_dataset(df)
+    assert np.issubdtype(cleaned["crp_text"].dtype, np.number)
+    assert cleaned["crp_text"].notna().all()
+
+
+def test_every_case_runs():
+    cases = build_cases(make_clinical_dataset(600, seed=2))
+    assert {f"execute_test[{t}]" for t in TEST_PLANS} <= set(cases)
+    for name, fn in cases.items():
+        assert fn() is not None, name
@@ -0,0 +1,68 @@
+from math import lgamma
+
+import numpy as np
+import pytest
+from scipy import stats
+
+from core.contingency import contingency_test, expected_counts, monte_carlo_p, pearson_chi2, simulate_tables
+
+
+def tables_with_margins(rows, cols):
+    # Every r × c table of non-negative counts with the given margins
+    if len(rows) == 1:
+        yield [list(cols)]
+        return
+    def fill(j, left, col_left):
+        if j == len(cols) - 1:
+            if left <= col_left[j]:
+                yield [left]
+            return
+        for x in range(min(left, col_left[j]) + 1):
+            for rest in fill(j + 1, left - x, col_left):
+                yield [x] + rest
+    for first in fill(0, rows[0], cols):
+        for rest in tables_with_margins(rows[1:], [c - x for c, x in zip(cols, first)]):
+            yield [first] + rest
+
+
+def exact_p(table):
+    rows, cols, n = table.sum(axis=1), table.sum(axis=0), table.sum()
+    expected = expected_counts(table)
+    observed = pearson_chi2(table, expected)
+    log_margins = sum(lgamma(x + 1) for x in [*rows, *cols]) - lgamma(n + 1)
+    p = 0.0
+    for t in tables_with_margins(list(rows), list(cols)):
+        t = np.array(t)
+        if pearson_chi2(t, expected) >= observed * (1 - 1e-7):
+            p += np.exp(log_margins - sum(lgamma(x + 1) for x in t.ravel()))
+    return p
+
+
+def test_large_tables_use_scipy_chi_square():
+    table = np.array([[40, 25, 35], [30, 45, 25]])
+    stat, p, _, _, details = contingency_test(table)
+    expected = stats.chi2_contingency(table)
+    assert stat == pytest.approx(expected.statistic) and p == pytest.approx(expected.pvalue)
+    assert details["method"] == "Pearson chi-square"
+
+
+def test_sparse_two_by_two_uses_fisher():
+    table = np.array([[7, 1], [2, 6]])
+    _, p, _, _, details = contingency_test(table)
+    assert p == pytest.approx(stats.fisher_exact(table).pvalue)
+    assert details["method"] == "Fisher's exact test"
+
+
+def test_monte_carlo_matches_exact_enumeration():
+    table = np.array([[3, 1, 0], [1, 4, 2], [0, 2, 5]])
+    exact = exact_p(table)
+    n_sims = 100_000
+    p = monte_carlo_p(table, n_sims=n_sims, seed=3)
+    assert abs(p - exact) < 4 * np.sqrt(exact * (1 - exact) / n_sims)
+
+
+def test_simulated_tables_keep_the_margins():
+    rows, cols = np.array([5, 9, 6]), np.array([4, 8, 3, 5])
+    tables = simulate_tables(rows, cols, 500, np.random.default_rng(0))
+    assert (tables >= 0).all()
+    assert (tables.sum(axis=2) == rows).all() and (tables.sum(axis=1) == cols).all()
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from agents.data_cleaning import clean_dataset, compact_dataframe
+
+
+def test_compaction_is_lossless():
+    rng = np.random.default_rng(0)
+    n = 5000
+    df = pd.DataFrame({
+        "count": rng.integers(0, 100, n).astype(float),
+        "small_float": rng.integers(0, 1000, n) / 4,           # exact in float32
+        "precise": rng.normal(size=n),                          # needs float64
+        "ward": rng.choice(["ICU", "ED", "Surgery"], n),
+        "free_text": [f"note {i}" for i in range(n)]
+    })
+    original = df.copy()
+    compact, stats = compact_dataframe(df.copy())
+
+    assert stats["bytes_after"] < stats["bytes_before"]
+    assert compact["count"].dtype == np.int8
+    assert compact["small_float"].dtype == np.float32
+    assert compact["precise"].dtype == np.float64
+    assert isinstance(compact["ward"].dtype, pd.CategoricalDtype)
+    assert not isinstance(compact["free_text"].dtype, pd.CategoricalDtype)
+
+    for col in original:
+        np.testing.assert_array_equal(
+            compact[col].astype(original[col].dtype).to_numpy(), original[col].to_numpy()
+        )
+
+
+def test_clean_dataset_keeps_values():
+    df = pd.DataFrame({"sbp": ["120", "1,300", "13O"], "arm": ["A", "B", "A"]})
+    cleaned, log = clean_dataset(df)
+    assert cleaned["sbp"].tolist() == [120, 1300, 130]
+    assert log
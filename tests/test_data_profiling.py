@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from agents.data_profiling import complete_profile, profile_dataset
+
+
+@pytest.fixture
+def wide(two_groups):
+    rng = np.random.default_rng(5)
+    panel = pd.DataFrame(rng.lognormal(0, 1, (len(two_groups), 120)), columns=[f"marker_{i}" for i in range(120)])
+    return pd.concat([two_groups, panel], axis=1)
+
+
+def test_lazy_profile_completes_to_the_full_profile(wide):
+    lazy = profile_dataset(wide)
+    full = profile_dataset(wide, lazy=False)
+    assert not lazy.variables["marker_7"].profiled
+    assert lazy.variables["marker_7"].normality_p is None
+
+    picked = ["outcome", "group", "marker_7"]
+    complete_profile(wide, lazy, picked)
+
+    for col in picked:
+        assert lazy.variables[col] == full.variables[col]
+    assert not lazy.variables["marker_8"].profiled
+    assert lazy.variables["marker_7"].normality_p == pytest.approx(stats.shapiro(wide["marker_7"]).pvalue)
+
+
+def test_types_and_missingness_are_profiled_eagerly(wide):
+    wide.loc[:29, "age"] = np.nan
+    lazy = profile_dataset(wide)
+    full = profile_dataset(wide, lazy=False)
+    for col in wide.columns:
+        assert lazy.variables[col].type == full.variables[col].type
+        assert lazy.variables[col].missing_pct == pytest.approx(full.variables[col].missing_pct)
+    assert lazy.variables["age"].missing_pct == pytest.approx(10.0)
@@ -0,0 +1,47 @@
+import gc
+
+import pandas as pd
+
+from core.datastore import DatasetStore, content_key, frame_nbytes
+
+
+def test_same_bytes_share_one_entry(tmp_path, two_groups):
+    store = DatasetStore(spill_dir=str(tmp_path))
+    key = content_key(b"a,b\n1,2\n", "csv")
+    assert key == content_key(b"a,b\n1,2\n", "csv")
+    assert key != content_key(b"a,b\n1,2\n", "xlsx")
+
+    first = store.put(key, two_groups, audit=["cleaned"])
+    second = store.acquire(key)
+    assert store.stats()["entries"] == 1 and store.stats()["references"] == 2
+    assert second.meta["audit"] == ["cleaned"]
+
+    # Copy-on-write: a session's edits never reach the shared frame
+    mine = first.frame()
+    mine["outcome"] = 0.0
+    mine.loc[0, "age"] = -1
+    pd.testing.assert_frame_equal(second.frame(), two_groups)
+
+
+def test_spilled_frames_reload_unchanged(tmp_path, two_groups, three_groups):
+    three = three_groups.astype({"group": "category"}).set_index(pd.RangeIndex(1000, 1240))
+    store = DatasetStore(max_bytes=frame_nbytes(three) + 1, spill_dir=str(tmp_path))
+
+    held = store.put("three", three)
+    other = store.put("two", two_groups)
+    # Both are referenced, so the older one is spilled rather than dropped
+    assert store.stats()["spilled"] == 1 and store.stats()["evictions"] == 0
+
+    pd.testing.assert_frame_equal(held.frame(), three)
+    pd.testing.assert_frame_equal(other.frame(), two_groups)
+
+
+def test_released_entries_are_evicted_first(tmp_path, two_groups):
+    store = DatasetStore(max_bytes=frame_nbytes(two_groups) + 1, spill_dir=str(tmp_path))
+    handle = store.put("old", two_groups)
+    del handle
+    gc.collect()
+
+    store.put("new", two_groups)
+    assert "old" not in store and "new" in store
+    assert store.stats()["evictions"] == 1
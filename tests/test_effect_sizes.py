@@ -0,0 +1,63 @@
+import numpy as np
+import pingouin as pg
+import pytest
+from scipy import stats
+
+from core.effect_sizes import cramers_v, omega_squared
+from core.stats_engine import execute_test
+
+
+def plan(test, dv="outcome", iv="group"):
+    return {"dependent_variable": dv, "independent_variable": iv, "selected_test": test}
+
+
+def test_pearson_drops_incomplete_pairs(two_groups):
+    df = two_groups.copy()
+    df.loc[::7, "outcome"] = np.nan
+    df.loc[::11, "age"] = np.nan
+    result = execute_test(df, plan("Pearson correlation", iv="age"))
+
+    complete = df[["outcome", "age"]].dropna()
+    expected = stats.pearsonr(complete["outcome"], complete["age"])
+    assert result["statistic"] == pytest.approx(expected.statistic, rel=1e-10)
+    assert result["p_value"] == pytest.approx(expected.pvalue, rel=1e-10)
+    # scipy's default interval is the same Fisher-z interval on the complete pairs
+    np.testing.assert_allclose(result["confidence_interval"], expected.confidence_interval(), rtol=1e-10)
+
+
+def test_hedges_g_matches_pingouin(two_groups):
+    result = execute_test(two_groups, plan("Independent t-test"))
+    a, b = [g["outcome"] for _, g in two_groups.groupby("group")]
+    assert result["effect_size"] == pytest.approx(pg.compute_effsize(a, b, eftype="hedges"), rel=1e-10)
+
+
+def test_omega_squared_matches_sums_of_squares(three_groups):
+    result = execute_test(three_groups, plan("ANOVA"))
+    y, groups = three_groups["outcome"], three_groups.groupby("group")["outcome"]
+    ss_between = (groups.count() * (groups.mean() - y.mean()) ** 2).sum()
+    ss_total = ((y - y.mean()) ** 2).sum()
+    ms_within = (ss_total - ss_between) / (len(y) - 3)
+    expected = (ss_between - 2 * ms_within) / (ss_total + ms_within)
+    assert result["effect_size"] == pytest.approx(expected, rel=1e-10)
+
+
+def test_noncentral_intervals_invert_the_cdf():
+    f, df1, df2 = 6.0, 2, 87
+    omega, (lo, hi) = omega_squared(f, df1, df2)
+    n = df1 + df2 + 1
+
+    def lam(w):
+        # ω² → λ through F = 1 + λ / df1 and ω² = df1 (F − 1) / (df1 (F − 1) + N)
+        return w * n / (1 - w)
+
+    assert lo < omega < hi
+    assert stats.ncf.cdf(f, df1, df2, lam(lo)) == pytest.approx(0.975, abs=1e-6)
+    assert stats.ncf.cdf(f, df1, df2, lam(hi)) == pytest.approx(0.025, abs=1e-6)
+
+
+def test_cramers_v_matches_scipy():
+    table = np.array([[30, 12, 8], [14, 25, 11]])
+    chi2 = stats.chi2_contingency(table, correction=False).statistic
+    v, ci = cramers_v(chi2, table.sum(), table.shape)
+    assert v == pytest.approx(stats.contingency.association(table, method="cramer"), rel=1e-10)
+    assert ci[0] < v < ci[1]
@@ -0,0 +1,64 @@
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+from core.history import HistoryStore
+
+
+def record(store, test, dv="outcome", user="ana"):
+    plan = {"dependent_variable": dv, "independent_variable": "group", "selected_test": test, "covariates": ["age"]}
+    results = {"test": test, "statistic": 1.5, "p_value": 0.04, "effect_size": 0.3,
+               "group_statistics": {"A": {"n": 10}, "B": {"n": 12}}}
+    return store.record("hash1", plan, results, user=user)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(str(tmp_path / "history.sqlite"))
+
+
+def test_queries_match_a_full_scan(store):
+    tests = ["Kruskal-Wallis", "Independent t-test", "Kruskal-Wallis", "ANOVA", "Mann-Whitney U"]
+    for i, test in enumerate(tests):
+        record(store, test, dv=f"y{i % 2}", user="ana" if i % 2 else "ben")
+    assert store.flush(timeout=5)
+
+    with closing(sqlite3.connect(store.path)) as conn:
+        all_runs = conn.execute("SELECT id, test, user FROM runs").fetchall()
+
+    found = {r["id"] for r in store.runs(test="Kruskal")}
+    assert found == {id_ for id_, test, _ in all_runs if test.startswith("Kruskal")}
+    assert len(store.runs(test="Kruskal", user="ben")) == 2
+    assert len(store.runs(variable="age")) == len(tests)
+    assert len(store.runs(variable="y1")) == 2
+    assert store.runs(test="kruskal") == []
+
+    run = store.runs(limit=1)[0]
+    assert run["n"] == 22 and run["p_value"] == pytest.approx(0.04)
+
+
+def test_test_filter_uses_the_index(store):
+    record(store, "ANOVA")
+    store.flush(timeout=5)
+    with closing(sqlite3.connect(store.path)) as conn:
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM runs r WHERE r.test >= ? AND r.test < ?", ("AN", "AN\U0010ffff")
+        ).fetchall()
+    assert any("runs_test" in row[-1] for row in plan)
+
+
+def test_writer_survives_a_failed_batch(store, monkeypatch):
+    write = store._write
+
+    def broken(runs):
+        monkeypatch.setattr(store, "_write", write)
+        raise TypeError("unserializable value")
+
+    monkeypatch.setattr(store, "_write", broken)
+    record(store, "ANOVA")
+    assert store.flush(timeout=5)
+
+    run_id = record(store, "ANOVA")
+    assert store.flush(timeout=5)
+    assert store.run(run_id) is not None
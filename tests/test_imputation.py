@@ -0,0 +1,67 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from core.imputation import execute_imputed, rubin_pool
+
+
+def test_rubin_pool_matches_manual_barnard_rubin():
+    q = np.array([1.10, 0.95, 1.30, 1.02, 1.18])
+    u = np.array([0.040, 0.050, 0.045, 0.038, 0.052])
+    m, df_complete = len(q), 40
+
+    b = q.var(ddof=1)
+    t = u.mean() + (1 + 1 / m) * b
+    lam = (1 + 1 / m) * b / t
+    df_old = (m - 1) / lam ** 2
+    df_obs = (df_complete + 1) / (df_complete + 3) * df_complete * (1 - lam)
+
+    pooled = rubin_pool(q, u, df_complete)
+    assert pooled["estimate"] == pytest.approx(q.mean())
+    assert pooled["se"] == pytest.approx(np.sqrt(t))
+    assert pooled["df"] == pytest.approx(df_old * df_obs / (df_old + df_obs))
+
+
+def test_pooled_coefficients_use_model_residual_df(two_groups):
+    df = two_groups.copy()
+    df.loc[df.index % 4 == 0, "age"] = np.nan
+    plan = {
+        "dependent_variable": "outcome", "independent_variable": "age",
+        "selected_test": "Linear regression", "covariates": ["group"]
+    }
+    result = execute_imputed(df, plan, m=5, max_workers=1)
+
+    # The exposure row and the headline result pool the same estimate with
+    # the same complete-data df, so their fraction of missing information agrees
+    exposure = next(c for c in result["coefficients"] if c["term"] == "age")
+    assert exposure["fmi"] == pytest.approx(result["imputation"]["fmi"], rel=1e-10)
+    assert exposure["statistic"] == pytest.approx(result["statistic"], rel=1e-10)
+
+
+def test_concurrent_imputations_keep_their_own_data(two_groups, three_groups):
+    first = two_groups.copy()
+    first.loc[first.index % 5 == 0, "outcome"] = np.nan
+    second = three_groups.copy()
+    second.loc[second.index % 6 == 0, "outcome"] = np.nan
+    jobs = [
+        (first, {"dependent_variable": "outcome", "independent_variable": "group", "selected_test": "Independent t-test"}),
+        (second, {"dependent_variable": "outcome", "independent_variable": "group", "selected_test": "ANOVA"})
+    ]
+    expected = [execute_imputed(df, plan, m=10, max_workers=1) for df, plan in jobs]
+
+    barrier = threading.Barrier(len(jobs) * 3)
+
+    def run(job):
+        barrier.wait()
+        return execute_imputed(*job, m=10, max_workers=1)
+
+    with ThreadPoolExecutor(max_workers=len(jobs) * 3) as pool:
+        results = list(pool.map(run, jobs * 3))
+
+    for i, result in enumerate(results):
+        reference = expected[i % len(jobs)]
+        assert result["test"] == reference["test"]
+        assert result["statistic"] == pytest.approx(reference["statistic"], rel=1e-12)
+        assert result["p_value"] == pytest.approx(reference["p_value"], rel=1e-12)
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from agents.data_profiling import profile_dataset
+from core.incremental import StudyState
+from core.stats_engine import execute_test
+
+
+def test_appended_profile_matches_fresh_profile(two_groups):
+    df = two_groups.copy()
+    # Outliers only in the appended rows, skewed so |z| and MAD rules disagree
+    df.loc[250:259, "outcome"] = np.linspace(15, 16, 10)
+    base, delta = df.iloc[:200], df.iloc[200:]
+
+    state = StudyState(base, profile_dataset(base))
+    appended = state.append(delta)["profile"]
+    fresh = profile_dataset(df)
+
+    for col, expected in fresh.variables.items():
+        got = appended.variables[col]
+        assert got.type == expected.type
+        assert got.outliers_present == expected.outliers_present
+        assert got.outlier_count == expected.outlier_count
+        assert got.levels == expected.levels
+        assert got.missing_pct == pytest.approx(expected.missing_pct)
+        if expected.normality_p is None:
+            assert got.normality_p is None
+        else:
+            assert got.normality_p == pytest.approx(expected.normality_p)
+            assert got.normal == expected.normal
+
+    assert appended.variables["outcome"].normality_p == pytest.approx(stats.shapiro(df["outcome"]).pvalue)
+
+
+def test_tracked_results_match_full_recompute(three_groups):
+    plan = {"dependent_variable": "outcome", "independent_variable": "group", "selected_test": "ANOVA"}
+    base, delta = three_groups.iloc[::2], three_groups.iloc[1::2]
+
+    state = StudyState(base, profile_dataset(base))
+    state.track(plan)
+    result = next(iter(state.append(delta)["results"].values()))
+    full = execute_test(pd.concat([base, delta], ignore_index=True), plan)
+
+    assert result["statistic"] == pytest.approx(full["statistic"], rel=1e-9)
+    assert result["p_value"] == pytest.approx(full["p_value"], rel=1e-9)
+
+
+def test_append_updates_summaries_without_rebuilding_the_table(two_groups):
+    base = two_groups.iloc[:100]
+    state = StudyState(base, profile_dataset(base))
+    for start in range(100, 300, 50):
+        state.append(two_groups.iloc[start:start + 50])
+
+    # Nothing asked for the full table, so it was never concatenated
+    assert state._frame is None and len(state.chunks) == 5
+
+    fresh = profile_dataset(two_groups)
+    profile = state.profile()
+    assert profile.sample_size == len(two_groups)
+    np.testing.assert_array_equal(state.aggregates["age"].values, np.sort(two_groups["age"].to_numpy()))
+    for col in ("outcome", "age"):
+        assert profile.variables[col].normality_p == pytest.approx(fresh.variables[col].normality_p)
+        assert profile.variables[col].outlier_count == fresh.variables[col].outlier_count
+
+
+def test_lazy_columns_stay_deferred_after_append(two_groups):
+    base, delta = two_groups.iloc[:200], two_groups.iloc[200:]
+    state = StudyState(base, profile_dataset(base, lazy=True))
+    variables = state.append(delta)["profile"].variables
+    assert not any(v.profiled for v in variables.values())
+    assert variables["outcome"].normality_p is None and variables["sex"].levels is None
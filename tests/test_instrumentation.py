@@ -0,0 +1,38 @@
+import time
+
+from core.instrumentation import start_trace, span, traced, current_trace, _current_trace
+
+
+@traced()
+def slow_stage():
+    with span("inner"):
+        time.sleep(0.02)
+
+
+def test_spans_nest_and_time():
+    trace = start_trace("test")
+    slow_stage()
+    spans = {s["name"]: s for s in trace.to_dict()["spans"]}
+
+    assert set(spans) == {"slow_stage", "inner"}
+    assert spans["slow_stage"]["depth"] == 0 and spans["inner"]["depth"] == 1
+    assert spans["inner"]["wall"] >= 0.02
+    assert spans["slow_stage"]["wall"] >= spans["inner"]["wall"]
+    assert trace.total_wall() >= spans["slow_stage"]["wall"]
+
+
+def test_errors_are_recorded_and_reraised():
+    trace = start_trace("errors")
+    try:
+        with span("boom"):
+            raise KeyError("x")
+    except KeyError:
+        pass
+    assert trace.spans[0]["error"] == "KeyError"
+
+
+def test_no_trace_measures_nothing():
+    # API workers and scripts run instrumented code without a trace
+    _current_trace.set(None)
+    slow_stage()
+    assert current_trace() is None
@@ -0,0 +1,125 @@
+import threading
+import time
+
+import pytest
+from statsmodels.stats.power import TTestIndPower
+
+from agents.data_profiling import profile_dataset
+from core.jobs import DONE, ERROR, JobManager, report_progress
+from core.power import power_grid
+
+
+def wait(job, timeout=60):
+    deadline = time.time() + timeout
+    while job.active and time.time() < deadline:
+        time.sleep(0.01)
+    assert not job.active
+    return job
+
+
+def test_same_key_returns_the_running_job():
+    manager = JobManager(max_workers=2)
+    release = threading.Event()
+    calls = []
+
+    def slow(x):
+        calls.append(x)
+        release.wait(5)
+        return x * 2
+
+    first = manager.submit(("double", 21), slow, 21)
+    second = manager.submit(("double", 21), slow, 21)
+    release.set()
+    wait(first)
+
+    assert second is first
+    assert calls == [21]
+    assert first.state == DONE and first.result == 42
+    manager.shutdown()
+
+
+def test_finished_job_is_rerun_on_resubmit():
+    manager = JobManager(max_workers=1)
+    calls = []
+
+    def count():
+        calls.append(1)
+        return len(calls)
+
+    first = wait(manager.submit("regenerate", count))
+    again = wait(manager.submit("regenerate", count))
+
+    # Regenerating the same key computes a new result; the old job is still pollable
+    assert again is not first
+    assert (first.result, again.result) == (1, 2)
+    assert manager.get(first.id) is first
+    manager.shutdown()
+
+
+def test_failed_job_is_replaced_on_resubmit():
+    manager = JobManager(max_workers=1)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("boom")
+        return "ok"
+
+    failed = wait(manager.submit("flaky", flaky))
+    assert failed.state == ERROR and failed.error == "boom"
+
+    retry = wait(manager.submit("flaky", flaky))
+    assert retry is not failed
+    assert retry.state == DONE and retry.result == "ok"
+    assert manager.stats()["done"] == 1 and manager.stats()["failed"] == 1
+    manager.shutdown()
+
+
+def test_report_progress_is_a_noop_outside_jobs():
+    report_progress(0.5, "ignored")
+
+
+def test_progress_reaches_the_job():
+    manager = JobManager(max_workers=1)
+    seen = []
+
+    def stage():
+        report_progress(0.25, "quarter")
+        seen.append(1)
+        return None
+
+    job = wait(manager.submit("stage", stage))
+    assert seen == [1]
+    # Progress is clamped to 1.0 on completion and keeps the last message
+    assert job.progress == 1.0 and job.message == "quarter"
+    manager.shutdown()
+
+
+def test_profile_job_matches_direct_call(two_groups):
+    manager = JobManager(max_workers=1)
+    job = wait(manager.submit(("profile", "two_groups"), profile_dataset, two_groups))
+    assert job.state == DONE
+    assert job.result == profile_dataset(two_groups)
+    manager.shutdown()
+
+
+def test_power_grid_job_matches_statsmodels():
+    manager = JobManager(max_workers=1)
+    job = wait(manager.submit(("power", "t"), power_grid, "Independent t-test", [0.2, 0.5], [20, 64]))
+    assert job.state == DONE
+    for row in job.result.itertuples():
+        expected = TTestIndPower().power(row.effect_size, row.n, row.alpha)
+        assert row.power == pytest.approx(expected, rel=1e-6)
+    manager.shutdown()
+
+
+def test_simulated_power_job_reports_grid_progress():
+    manager = JobManager(max_workers=1)
+    args = ("Mann-Whitney U", [0.0, 0.5], [30], [0.05], 3, 1, 300, "normal", 0, 1)
+    job = wait(manager.submit(("power", "mw"), power_grid, *args))
+    assert job.state == DONE
+    assert job.message == "Simulated 2 of 2 grid points"
+    # Same seeds, same answer as a direct call
+    assert job.result.equals(power_grid(*args))
+    manager.shutdown()
@@ -0,0 +1,126 @@
+import math
+from collections import Counter
+
+import pytest
+
+from agents.citations import get_citations
+from agents.research_context import get_research_context
+from core.literature import (
+    BM25_B, BM25_K1, BUNDLED_CORPUS, LiteratureIndex, format_apa, parse_bibtex, parse_ris,
+    record_terms, tokenize
+)
+
+BIB = r"""
+@article{smith2020,
+  author = {Smith, Jane A. and M{\"u}ller, Karl},
+  title = {Glycaemic control after bariatric surgery},
+  journal = {Diabetes Care},
+  year = {2020},
+  volume = {43},
+  number = {2},
+  pages = {100--108},
+  doi = {10.1000/dc.2020.43},
+  keywords = {bariatric surgery, HbA1c},
+  abstract = {Patients lost weight. HbA1c fell by one point.}
+}
+"""
+
+RIS = """TY  - BOOK
+AU  - Altman, Douglas G.
+TI  - Practical statistics for medical research
+PY  - 1991
+PB  - Chapman and Hall
+ET  - 2
+KW  - Medical statistics
+ER  -
+"""
+
+
+@pytest.fixture
+def library(tmp_path):
+    return LiteratureIndex(path=str(tmp_path / "literature.sqlite"))
+
+
+def test_parsers_read_bibtex_and_ris():
+    [bib] = parse_bibtex(BIB)
+    assert bib["authors"] == ["Smith, Jane A.", "Müller, Karl"]
+    assert bib["issue"] == "2" and bib["keywords"] == ["bariatric surgery", "hba1c"]
+
+    [ris] = parse_ris(RIS)
+    assert ris["type"] == "book" and ris["year"] == "1991"
+    assert ris["keywords"] == ["medical statistics"]
+
+
+def test_format_apa():
+    [bib] = parse_bibtex(BIB)
+    assert format_apa(bib) == (
+        "Smith, J. A., & Müller, K. (2020). Glycaemic control after bariatric surgery. "
+        "Diabetes Care, 43(2), 100–108. https://doi.org/10.1000/dc.2020.43"
+    )
+    [ris] = parse_ris(RIS)
+    assert format_apa(ris) == (
+        "Altman, D. G. (1991). Practical statistics for medical research (2nd ed.). Chapman and Hall."
+    )
+
+
+def test_search_scores_match_full_bm25_recompute(library):
+    records = [r for r in parse_bibtex(open(BUNDLED_CORPUS, encoding="utf-8").read()) if r.get("title")]
+    query = "survival censoring hazard ratio"
+
+    # Brute force over every record, no index
+    docs = [record_terms(r) for r in records]
+    avg_length = sum(sum(d.values()) for d in docs) / len(docs)
+    terms = list(dict.fromkeys(tokenize(query)))
+    doc_freq = Counter(t for d in docs for t in terms if t in d)
+    expected = {}
+    for record, d in zip(records, docs):
+        score = 0.0
+        for t in terms:
+            if t in d:
+                idf = math.log(1 + (len(docs) - doc_freq[t] + 0.5) / (doc_freq[t] + 0.5))
+                norm = d[t] + BM25_K1 * (1 - BM25_B + BM25_B * sum(d.values()) / avg_length)
+                score += idf * d[t] * (BM25_K1 + 1) / norm
+        if score:
+            expected[format_apa(record)] = round(score, 3)
+
+    hits = library.search(query, limit=len(records))
+    assert {h["citation"]: h["score"] for h in hits} == expected
+    assert [h["score"] for h in hits] == sorted(expected.values(), reverse=True)
+
+
+def test_search_finds_the_named_method(library):
+    [top] = library.search("Kaplan Meier product-limit estimator incomplete observations", limit=1)
+    assert top["key"] == "kaplan1958"
+    assert library.search("zzzz qqqq") == []
+
+
+def test_imported_library_is_searchable_and_removable(library):
+    version = library.version()
+    assert library.import_library(BIB.encode(), "mine.bib") == 1
+    assert library.version() != version
+    assert library.sources()["mine.bib"] == 1
+
+    [top] = library.search("bariatric HbA1c", limit=1)
+    assert top["source"] == "mine.bib" and top["matched_terms"] == ["bariatric", "hba1c"]
+
+    assert library.remove_source("mine.bib") == 1
+    assert "mine.bib" not in library.sources()
+    assert library.search("bariatric") == []
+
+
+def test_for_test_returns_bundled_method_references(library):
+    refs = library.for_test("Mann-Whitney U")
+    assert [r["key"] for r in refs] == ["wilcoxon1945", "mann1947", "kerby2014"]
+    assert all(r["source"] == "bundled" for r in refs)
+    assert library.for_test("Something else") == []
+
+
+def test_get_citations_and_offline_context():
+    citations = get_citations("Kaplan-Meier / Log-rank test")
+    assert citations["citations"][0].startswith("Kaplan, E. L., & Meier, P. (1958).")
+
+    plan = {"selected_test": "Log-rank test", "dependent_variable": "months", "independent_variable": "arm"}
+    context = get_research_context("survival by treatment arm with censoring", plan, summarize=False)
+    assert context["summarized"] is False
+    assert context["key_papers"]
+    assert all(p["source"] == "bundled" for p in context["key_papers"])
@@ -0,0 +1,47 @@
+import io
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from utils.loaders import EXCEL_CHUNK_ROWS, detect_format, excel_columns, excel_sheets, read_excel
+
+
+@pytest.fixture
+def workbook(two_groups):
+    wb = openpyxl.Workbook()
+    wb.active.title = "Notes"
+    wb.active.append(["exported from the registry"])
+    ws = wb.create_sheet("Visits")
+    ws.append(["Site report"])
+    ws.append([])
+    ws.append(list(two_groups.columns))
+    # More rows than one chunk so the streamed chunks are stitched together
+    frame = pd.concat([two_groups] * (EXCEL_CHUNK_ROWS // len(two_groups) + 1), ignore_index=True)
+    for row in frame.itertuples(index=False):
+        ws.append(list(row))
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def test_streamed_sheet_matches_pandas(workbook):
+    assert excel_sheets(workbook) == ["Notes", "Visits"]
+    assert excel_columns(workbook, "Visits", header_row=2) == ["outcome", "group", "age", "sex"]
+
+    df = read_excel(workbook, sheet="Visits", header_row=2)
+    expected = pd.read_excel(io.BytesIO(workbook), sheet_name="Visits", header=2, engine="openpyxl")
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+
+    subset = read_excel(workbook, sheet="Visits", header_row=2, columns=["age", "group"])
+    pd.testing.assert_frame_equal(subset, expected[["age", "group"]], check_dtype=False)
+
+
+def test_format_detection():
+    assert detect_format("visits.csv", "application/vnd.ms-excel") == "csv"
+    assert detect_format("visits.xlsx") == "xlsx"
+    assert detect_format(content_type="application/vnd.apache.arrow.file") == "arrow"
+    with pytest.raises(ValueError, match=r"\.xls"):
+        detect_format("visits.xls")
+    with pytest.raises(ValueError, match=r"\.xls"):
+        detect_format(content_type="application/vnd.ms-excel")
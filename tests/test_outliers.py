@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from core.outliers import (
+    IQR_MULTIPLIER, MAD_SCALE, MAD_THRESHOLD, clear_fence_cache, detect_outliers, sorted_outlier_count
+)
+
+
+@pytest.fixture
+def dirty(two_groups):
+    df = two_groups.copy()
+    df.loc[[3, 50, 120], "outcome"] = [40.0, -20.0, 35.0]
+    df.loc[[7, 8], "age"] = np.nan
+    df.index = df.index + 100
+    return df
+
+
+def test_mad_fences_match_manual_computation(dirty):
+    clear_fence_cache()
+    screen = detect_outliers(dirty, ["outcome", "age"])["columns"]
+
+    for col in ["outcome", "age"]:
+        x = dirty[col].dropna()
+        median = x.median()
+        spread = MAD_THRESHOLD * MAD_SCALE * stats.median_abs_deviation(x)
+        flagged = x[(x < median - spread) | (x > median + spread)]
+        assert screen[col]["lower"] == pytest.approx(median - spread)
+        assert screen[col]["upper"] == pytest.approx(median + spread)
+        assert screen[col]["rows"] == flagged.index.tolist()
+    assert {103, 150, 220} <= set(screen["outcome"]["rows"])
+
+
+def test_iqr_fences_and_cache_reuse(dirty):
+    clear_fence_cache()
+    first = detect_outliers(dirty, ["outcome"], method="mad")
+    # Second method reuses the cached quartiles; results must not depend on it
+    screen = detect_outliers(dirty, ["age", "outcome"], method="iqr")["columns"]
+    clear_fence_cache()
+    assert detect_outliers(dirty, ["outcome"], method="mad") == first
+
+    x = dirty["outcome"]
+    q1, q3 = np.percentile(x, [25, 75])
+    assert screen["outcome"]["upper"] == pytest.approx(q3 + IQR_MULTIPLIER * (q3 - q1))
+    assert screen["outcome"]["count"] == int(((x < q1 - 1.5 * (q3 - q1)) | (x > q3 + 1.5 * (q3 - q1))).sum())
+
+
+def test_multivariate_screen_flags_joint_outlier(two_groups):
+    df = two_groups.copy()
+    # Unremarkable on each axis, far off the joint distribution
+    df["weight"] = 0.9 * df["age"] + np.random.default_rng(6).normal(0, 2, len(df))
+    df.loc[10, ["age", "weight"]] = [65.0, 35.0]
+    result = detect_outliers(df, ["age", "weight"], multivariate=True)
+    assert 10 not in result["columns"]["age"]["rows"] + result["columns"]["weight"]["rows"]
+    assert 10 in result["multivariate"]["rows"]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sorted_outlier_count_matches_detect_outliers(seed):
+    rng = np.random.default_rng(seed)
+    values = np.concatenate([
+        np.round(rng.standard_t(3, 200 + seed), 1),   # heavy tails and ties
+        np.full(seed * 40, 2.0)                       # pushes the MAD towards zero
+    ])
+    df = pd.DataFrame({"x": values})
+    expected = detect_outliers(df, ["x"])["columns"]["x"]["count"]
+    assert sorted_outlier_count(np.sort(values)) == expected
+    assert sorted_outlier_count(np.sort(values), "iqr") == detect_outliers(df, ["x"], "iqr")["columns"]["x"]["count"]
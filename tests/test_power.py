@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from statsmodels.stats.power import FTestAnovaPower, GofChisquarePower, TTestIndPower
+
+from core.power import power_grid, required_sample_size, simulate_pvalues
+from core.visuals import power_curve_plot
+
+
+def test_ttest_power_matches_statsmodels():
+    grid = power_grid("Independent t-test", [0.2, 0.5, 0.8], [20, 64, 200])
+    for row in grid.itertuples():
+        expected = TTestIndPower().power(row.effect_size, row.n, row.alpha)
+        assert row.power == pytest.approx(expected, rel=1e-6)
+
+
+def test_anova_power_matches_statsmodels():
+    grid = power_grid("One-way ANOVA", [0.1, 0.25, 0.4], [30, 80], k=3)
+    for row in grid.itertuples():
+        # statsmodels takes the total sample size
+        expected = FTestAnovaPower().power(row.effect_size, 3 * row.n, row.alpha, k_groups=3)
+        assert row.power == pytest.approx(expected, rel=1e-6)
+
+
+def test_chisquare_power_matches_statsmodels():
+    grid = power_grid("Chi-square", [0.1, 0.3], [100, 400], df=2)
+    for row in grid.itertuples():
+        expected = GofChisquarePower().power(row.effect_size, row.n, row.alpha, n_bins=3)
+        assert row.power == pytest.approx(expected, rel=1e-6)
+
+
+def test_required_sample_size_is_the_smallest_n():
+    n = required_sample_size("Independent t-test", 0.5)
+    assert n == int(np.ceil(TTestIndPower().solve_power(0.5, power=0.8, alpha=0.05)))
+
+
+def test_simulation_batches_do_not_change_pvalues():
+    # The element budget only changes how draws are split, not the draws
+    small = simulate_pvalues(0.5, 30, 3, 250, "normal", 7, budget=1000)
+    large = simulate_pvalues(0.5, 30, 3, 250, "normal", 7)
+    np.testing.assert_allclose(small, large)
+
+
+def test_simulated_rank_power_is_close_to_analytic_t():
+    # Mann-Whitney has ~95% of the t-test's efficiency on normal data
+    sim = power_grid("Mann-Whitney U", [0.5], [64], n_sims=4000, max_workers=1)["power"].iloc[0]
+    analytic = TTestIndPower().power(0.5, 64, 0.05)
+    assert sim == pytest.approx(analytic, abs=0.05)
+    assert sim < analytic + 0.02
+
+
+def test_power_plot_draws_every_alpha():
+    grid = power_grid("Independent t-test", [0.2, 0.5, 0.8], [20, 64, 200], alphas=[0.01, 0.05])
+    fig = power_curve_plot(grid)
+    lines = [l for l in fig.axes[0].get_lines() if len(l.get_xdata()) == 3]
+    assert len(lines) == 6
+
+    drawn = {(l.get_linestyle(), tuple(np.round(l.get_ydata(), 12))) for l in lines}
+    for alpha, style in zip([0.01, 0.05], ["-", "--"]):
+        for _, g in grid[grid["alpha"] == alpha].groupby("effect_size"):
+            assert (style, tuple(np.round(g["power"], 12))) in drawn
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.api as sm
+import statsmodels.formula.api as smf
+
+from core.apa_tables import format_regression_table
+from core.regression import build_design, exposure_many, fit_ols_many, run_regression
+
+
+def plan(test, dv, iv, covariates):
+    return {"dependent_variable": dv, "independent_variable": iv, "selected_test": test, "covariates": covariates}
+
+
+def test_ols_matches_statsmodels(two_groups):
+    result = run_regression(two_groups, plan("Linear regression", "outcome", "group", ["age", "sex"]))
+    fit = smf.ols("outcome ~ C(group) + age + C(sex)", two_groups).fit(cov_type="HC3", use_t=True)
+
+    row = next(c for c in result["coefficients"] if c["term"] == "group[B]")
+    assert row["estimate"] == pytest.approx(fit.params["C(group)[T.B]"], rel=1e-10)
+    assert row["se"] == pytest.approx(fit.bse["C(group)[T.B]"], rel=1e-10)
+    assert result["model"]["r_squared"] == pytest.approx(fit.rsquared, rel=1e-10)
+
+    table = format_regression_table(result)
+    assert list(table.columns[1:3]) == ["B", "SE"]
+
+
+def test_logistic_reports_odds_ratios_with_log_scale_se(two_groups):
+    df = two_groups.assign(high=(two_groups["outcome"] > 10.3).astype(int))
+    result = run_regression(df, plan("Logistic regression", "high", "group", ["age"]))
+    fit = smf.logit("high ~ C(group) + age", df).fit(disp=0, cov_type="HC1")
+
+    row = next(c for c in result["coefficients"] if c["term"] == "group[B]")
+    assert row["estimate"] == pytest.approx(np.exp(fit.params["C(group)[T.B]"]), rel=1e-6)
+    assert row["se"] == pytest.approx(fit.bse["C(group)[T.B]"], rel=1e-6)
+    assert result["effect_size"] == pytest.approx(row["estimate"])
+
+    table = format_regression_table(result)
+    assert list(table.columns[1:3]) == ["OR", "SE (log)"]
+
+
+@pytest.fixture
+def outcomes(three_groups):
+    # Several outcomes with different missingness patterns, so more than one QR block
+    rng = np.random.default_rng(11)
+    df = three_groups.copy()
+    df["age"] = rng.normal(50, 10, len(df))
+    for i in range(5):
+        df[f"y{i}"] = 0.3 * i * (df["group"] == "B") + 0.02 * df["age"] + rng.standard_t(4, len(df))
+    df.loc[::7, "y1"] = np.nan
+    df.loc[::5, "y3"] = np.nan
+    df.loc[::11, "age"] = np.nan
+    return df
+
+
+@pytest.mark.parametrize("robust", [True, False])
+def test_fit_ols_many_matches_statsmodels(outcomes, robust):
+    ys = [f"y{i}" for i in range(5)]
+    table = fit_ols_many(outcomes, ys, ["group", "age"], robust=robust)
+
+    for y in ys:
+        mask = outcomes[[y, "group", "age"]].notna().all(axis=1)
+        X, _ = build_design(outcomes.loc[mask], ["group", "age"])
+        fit = sm.OLS(outcomes.loc[mask, y], X).fit(cov_type="HC3" if robust else "nonrobust", use_t=True)
+        rows = table[table["outcome"] == y].set_index("term")
+
+        np.testing.assert_allclose(rows["estimate"], fit.params[rows.index], rtol=1e-10)
+        np.testing.assert_allclose(rows["se"], fit.bse[rows.index], rtol=1e-10)
+        np.testing.assert_allclose(rows["p_value"], fit.pvalues[rows.index], rtol=1e-8)
+        assert rows["n"].iloc[0] == fit.nobs
+        assert rows["r_squared"].iloc[0] == pytest.approx(fit.rsquared, rel=1e-10)
+
+
+def test_exposure_many_matches_run_regression(outcomes):
+    ys = [f"y{i}" for i in range(5)]
+    adjusted = exposure_many(outcomes, ys, "group", ["age"]).set_index("outcome")
+
+    for y in ys:
+        # Three groups: a joint HC3 Wald F over both dummies, as run_regression reports it
+        result = run_regression(outcomes, plan("Linear regression", y, "group", ["age"]))
+        assert adjusted.loc[y, "statistic"] == pytest.approx(result["statistic"], rel=1e-8)
+        assert adjusted.loc[y, "p_value"] == pytest.approx(result["p_value"], rel=1e-8)
+        assert adjusted.loc[y, "n"] == result["n"]
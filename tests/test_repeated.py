@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pingouin as pg
+import pytest
+from scipy import stats
+from statsmodels.stats.anova import AnovaRM
+
+from agents.data_profiling import detect_study_design
+from core.repeated import execute_repeated, is_repeated_test
+from core.stats_engine import execute_test
+
+
+@pytest.fixture
+def long_visits():
+    rng = np.random.default_rng(3)
+    n, visits = 40, ["V1", "V2", "V3"]
+    subject_effect = rng.normal(0, 2, n)
+    rows = [
+        {"patient_id": i, "visit": v, "score": 20 + subject_effect[i] + 0.8 * t + rng.normal(0, 1 + t)}
+        for i in range(n) for t, v in enumerate(visits)
+    ]
+    return pd.DataFrame(rows).sample(frac=1, random_state=0)
+
+
+def run(df, test):
+    plan = {"dependent_variable": "score", "independent_variable": "visit", "selected_test": test, "subject_id": "patient_id"}
+    return execute_repeated(df, plan)
+
+
+def columns(df, *visits):
+    wide = df.pivot(index="patient_id", columns="visit", values="score")
+    return [wide[v] for v in visits]
+
+
+def test_paired_tests_match_scipy(long_visits):
+    two = long_visits[long_visits["visit"] != "V3"]
+    v1, v2 = columns(two, "V1", "V2")
+
+    result = run(two, "Paired t-test")
+    assert result["statistic"] == pytest.approx(stats.ttest_rel(v1, v2).statistic, rel=1e-10)
+
+    result = run(two, "Wilcoxon signed-rank")
+    expected = stats.wilcoxon(v1, v2)
+    assert result["statistic"] == pytest.approx(expected.statistic)
+    assert result["p_value"] == pytest.approx(expected.pvalue, rel=1e-10)
+
+
+def test_friedman_matches_scipy(long_visits):
+    result = run(long_visits, "Friedman test")
+    expected = stats.friedmanchisquare(*columns(long_visits, "V1", "V2", "V3"))
+    assert result["statistic"] == pytest.approx(expected.statistic, rel=1e-10)
+    assert result["p_value"] == pytest.approx(expected.pvalue, rel=1e-10)
+
+
+def test_rm_anova_matches_statsmodels_and_gg_epsilon(long_visits):
+    result = run(long_visits, "Repeated measures ANOVA")
+    table = AnovaRM(long_visits, "score", "patient_id", within=["visit"]).fit().anova_table
+    assert result["statistic"] == pytest.approx(table["F Value"].iloc[0], rel=1e-10)
+    assert result["sphericity"]["p_uncorrected"] == pytest.approx(table["Pr > F"].iloc[0], rel=1e-8)
+
+    eps = pg.epsilon(long_visits, dv="score", within="visit", subject="patient_id", correction="gg")
+    assert result["sphericity"]["epsilon_gg"] == pytest.approx(eps, rel=1e-10)
+
+
+def test_wilcoxon_rank_sum_is_not_routed_to_signed_rank(long_visits):
+    assert is_repeated_test("Wilcoxon signed-rank test")
+    assert not is_repeated_test("Wilcoxon rank-sum test")
+
+    two = long_visits[long_visits["visit"] != "V3"]
+    plan = {"dependent_variable": "score", "independent_variable": "visit", "subject_id": "patient_id"}
+    paired = execute_test(two, dict(plan, selected_test="Wilcoxon signed-rank test"))
+    assert paired["statistic"] == pytest.approx(stats.wilcoxon(*columns(two, "V1", "V2")).statistic)
+    with pytest.raises(ValueError, match="Unsupported test"):
+        execute_test(two, dict(plan, selected_test="Wilcoxon rank-sum test"))
+
+
+def test_subject_id_is_detected_in_long_data(long_visits):
+    assert detect_study_design(long_visits) == ("repeated measures", "patient_id", "visit")
+
+
+@pytest.mark.parametrize("column", ["patient_sex", "Patient Group", "subject_arm"])
+def test_repeated_grouping_columns_are_not_subject_ids(long_visits, column):
+    # Few levels repeated many times: a between-subject factor, not an ID
+    df = long_visits.drop(columns="patient_id")
+    df[column] = np.resize(["F", "M", "X"][:2 if "sex" in column else 3], len(df))
+    assert detect_study_design(df) == ("observational", None, None)
+
+
+def test_few_levels_are_rejected_in_small_tables():
+    df = pd.DataFrame({"patient_sex": ["F", "M"] * 10, "score": range(20)})
+    assert detect_study_design(df) == ("observational", None, None)
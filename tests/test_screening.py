@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.formula.api as smf
+from scipy import stats
+from statsmodels.stats.multitest import multipletests
+
+from core.screening import adjust_pvalues, screen_outcomes
+
+
+@pytest.fixture
+def panel(three_groups):
+    rng = np.random.default_rng(9)
+    df = three_groups[["group"]].copy()
+    for i in range(12):
+        shift = np.repeat([0.0, 0.4 * (i % 3), 0.0], len(df) // 3)
+        df[f"lab_{i}"] = rng.lognormal(0, 0.5, len(df)).round(1) + shift
+    df.loc[::9, "lab_3"] = np.nan
+    return df
+
+
+def by_outcome(table):
+    return table.set_index("outcome")
+
+
+@pytest.mark.parametrize("rank", [False, True])
+def test_screen_matches_scipy_per_outcome(panel, rank):
+    outcomes = [c for c in panel.columns if c != "group"]
+    table = by_outcome(screen_outcomes(panel, "group", outcomes, rank=rank))
+
+    for col in outcomes:
+        groups = [g[col].dropna() for _, g in panel.groupby("group")]
+        expected = stats.kruskal(*groups) if rank else stats.f_oneway(*groups)
+        assert table.loc[col, "statistic"] == pytest.approx(expected.statistic, rel=1e-9)
+        assert table.loc[col, "p_value"] == pytest.approx(expected.pvalue, rel=1e-9)
+
+
+def test_two_groups_match_welch_and_mann_whitney(panel):
+    two = panel[panel["group"] != "C"]
+    outcomes = ["lab_1", "lab_3"]
+    welch = by_outcome(screen_outcomes(two, "group", outcomes))
+    rank = by_outcome(screen_outcomes(two, "group", outcomes, rank=True))
+
+    for col in outcomes:
+        a, b = [g[col].dropna() for _, g in two.groupby("group")]
+        assert welch.loc[col, "p_value"] == pytest.approx(stats.ttest_ind(a, b, equal_var=False).pvalue, rel=1e-9)
+        expected = stats.mannwhitneyu(a, b, alternative="two-sided", method="asymptotic")
+        assert rank.loc[col, "p_value"] == pytest.approx(expected.pvalue, rel=1e-9)
+
+
+@pytest.mark.parametrize("method, reference", [("bh", "fdr_bh"), ("by", "fdr_by")])
+def test_q_values_match_statsmodels(method, reference):
+    p = np.random.default_rng(10).uniform(0, 0.2, 40) ** 2
+    p[[3, 17]] = np.nan
+    q = adjust_pvalues(p, method)
+    valid = ~np.isnan(p)
+    np.testing.assert_allclose(q[valid], multipletests(p[valid], method=reference)[1], rtol=1e-12)
+    assert np.isnan(q[~valid]).all()
+
+
+def test_adjusted_screen_matches_statsmodels_hc3(two_groups):
+    rng = np.random.default_rng(12)
+    df = two_groups[["group", "age", "sex"]].copy()
+    for i in range(6):
+        df[f"lab_{i}"] = 0.5 * (i % 2) * (df["group"] == "B") + 0.03 * df["age"] + rng.normal(0, 1, len(df))
+    df.loc[::8, "lab_2"] = np.nan
+    outcomes = [f"lab_{i}" for i in range(6)]
+
+    table = by_outcome(screen_outcomes(df, "group", outcomes, covariates=["age", "sex"]))
+    p = []
+    for col in outcomes:
+        fit = smf.ols(f"{col} ~ C(group) + age + C(sex)", df).fit(cov_type="HC3", use_t=True)
+        term = "C(group)[T.B]"
+        assert table.loc[col, "effect_size"] == pytest.approx(fit.params[term], rel=1e-10)
+        assert table.loc[col, "statistic"] == pytest.approx(fit.tvalues[term], rel=1e-10)
+        assert table.loc[col, "p_value"] == pytest.approx(fit.pvalues[term], rel=1e-8)
+        assert table.loc[col, "n"] == fit.nobs
+        p.append(fit.pvalues[term])
+
+    q = multipletests(p, method="fdr_bh")[1]
+    np.testing.assert_allclose(table.loc[outcomes, "q_value"], q, rtol=1e-8)
+    assert table["effect_measure"].iloc[0] == "adjusted B (group[B])"
+
+    with pytest.raises(ValueError, match="Rank-based"):
+        screen_outcomes(df, "group", outcomes, rank=True, covariates=["age"])
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from core.stats_engine import execute_test, run_dunn
+
+
+def plan(test, dv="outcome", iv="group"):
+    return {"dependent_variable": dv, "independent_variable": iv, "selected_test": test}
+
+
+def test_welch_t_matches_scipy(two_groups):
+    result = execute_test(two_groups, plan("Independent t-test"))
+    a, b = [g["outcome"] for _, g in two_groups.groupby("group")]
+    expected = stats.ttest_ind(a, b, equal_var=False)
+    assert result["statistic"] == pytest.approx(expected.statistic, rel=1e-10)
+    assert result["p_value"] == pytest.approx(expected.pvalue, rel=1e-10)
+
+
+def test_mann_whitney_matches_scipy(two_groups):
+    df = two_groups.assign(outcome=two_groups["outcome"].round(0))  # plenty of ties
+    result = execute_test(df, plan("Mann-Whitney U"))
+    a, b = [g["outcome"] for _, g in df.groupby("group")]
+    expected = stats.mannwhitneyu(a, b, alternative="two-sided", method="asymptotic")
+    assert result["statistic"] == pytest.approx(expected.statistic)
+    assert result["p_value"] == pytest.approx(expected.pvalue, rel=1e-10)
+
+
+def test_kruskal_matches_scipy(three_groups):
+    df = three_groups.assign(outcome=three_groups["outcome"].round(0))
+    result = execute_test(df, plan("Kruskal-Wallis"))
+    expected = stats.kruskal(*[g["outcome"] for _, g in df.groupby("group")])
+    assert result["statistic"] == pytest.approx(expected.statistic, rel=1e-10)
+    assert result["p_value"] == pytest.approx(expected.pvalue, rel=1e-10)
+
+
+def test_rank_tests_do_not_overflow_on_large_samples():
+    # n³ and tie-group t³ pass the int64 range above ~2.1M rows
+    rng = np.random.default_rng(2)
+    n = 2_400_000
+    group = rng.integers(0, 3, n)
+    df = pd.DataFrame({"outcome": rng.integers(0, 5, n) + (group == 2), "group": group})
+
+    result = execute_test(df, plan("Kruskal-Wallis"))
+    expected = stats.kruskal(*[g["outcome"] for _, g in df.groupby("group")])
+    assert result["statistic"] == pytest.approx(expected.statistic, rel=1e-8)
+
+    two = df[df["group"] < 2]
+    result = execute_test(two, plan("Mann-Whitney U"))
+    expected = stats.mannwhitneyu(*[g["outcome"] for _, g in two.groupby("group")], alternative="two-sided")
+    assert result["p_value"] == pytest.approx(expected.pvalue, rel=1e-6, abs=1e-12)
+
+    pairs = run_dunn(df, "outcome", "group")
+    assert all(np.isfinite(p["z"]) for p in pairs)
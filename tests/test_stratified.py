@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+from core.stratified import execute_stratified
+from core.stats_engine import execute_test
+
+
+def plan(test, **extra):
+    return {"dependent_variable": "outcome", "independent_variable": "group", "selected_test": test, **extra}
+
+
+def test_strata_match_subset_runs_and_manual_q(two_groups):
+    result = execute_stratified(two_groups, plan("Independent t-test", stratify_by="sex"), max_workers=1)
+
+    y, w = [], []
+    for row in result["strata"]:
+        subset = two_groups[two_groups["sex"] == row["stratum"]]
+        expected = execute_test(subset, plan("Independent t-test"))
+        assert row["statistic"] == pytest.approx(expected["statistic"], rel=1e-10)
+        lo, hi = expected["confidence_interval"]
+        y.append(expected["effect_size"])
+        w.append(1 / ((hi - lo) / (2 * stats.norm.isf(0.025))) ** 2)
+
+    y, w = np.array(y), np.array(w)
+    q = np.sum(w * (y - np.sum(w * y) / np.sum(w)) ** 2)
+    assert result["heterogeneity"]["q"] == pytest.approx(q, rel=1e-10)
+    assert result["heterogeneity"]["p_value"] == pytest.approx(stats.chi2.sf(q, 1), rel=1e-10)
+
+
+def test_stratum_with_extra_group_level_is_not_pooled(two_groups):
+    df = two_groups.copy()
+    # One stratum gains a third IV level; Mann-Whitney compares the first two
+    df.loc[(df["sex"] == "M") & (df.index % 10 == 0), "group"] = "C"
+    result = execute_stratified(df, plan("Mann-Whitney U", stratify_by="sex"), max_workers=1)
+
+    assert all(row["error"] is None for row in result["strata"])
+    assert result["heterogeneity"] is None
@@ -0,0 +1,49 @@
+import pytest
+from scipy import stats
+
+from core.streaming import stream_execute_test
+from core.stats_engine import execute_test
+
+
+def plan(test, dv, iv):
+    return {"dependent_variable": dv, "independent_variable": iv, "selected_test": test}
+
+
+@pytest.fixture
+def csv_parts(tmp_path, three_groups):
+    # Split across two files and small chunks so merging is exercised
+    paths = []
+    for i, part in enumerate([three_groups.iloc[::2], three_groups.iloc[1::2]]):
+        path = tmp_path / f"part{i}.csv"
+        part.to_csv(path, index=False)
+        paths.append(str(path))
+    return paths
+
+
+def test_anova_matches_in_memory(csv_parts, three_groups):
+    streamed = stream_execute_test(csv_parts, plan("ANOVA", "outcome", "group"), chunksize=37)
+    groups = [g["outcome"] for _, g in three_groups.groupby("group")]
+    expected = stats.f_oneway(*groups)
+    assert streamed["statistic"] == pytest.approx(expected.statistic, rel=1e-9)
+    assert streamed["p_value"] == pytest.approx(expected.pvalue, rel=1e-9)
+
+
+def test_chi_square_matches_in_memory(csv_parts, three_groups):
+    p = plan("Chi-square", "site", "group")
+    streamed = stream_execute_test(csv_parts, p, chunksize=50)
+    full = execute_test(three_groups, p)
+    assert streamed["statistic"] == pytest.approx(full["statistic"], rel=1e-9)
+    assert streamed["p_value"] == pytest.approx(full["p_value"], rel=1e-9)
+
+
+def test_pearson_matches_scipy(tmp_path, two_groups):
+    path = tmp_path / "data.csv"
+    two_groups.to_csv(path, index=False)
+    streamed = stream_execute_test(str(path), plan("Pearson correlation", "outcome", "age"), chunksize=41)
+    expected = stats.pearsonr(two_groups["outcome"], two_groups["age"])
+    assert streamed["statistic"] == pytest.approx(expected.statistic, rel=1e-9)
+
+
+def test_rank_tests_are_rejected(csv_parts):
+    with pytest.raises(ValueError):
+        stream_execute_test(csv_parts, plan("Kruskal-Wallis", "outcome", "group"))
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+from statsmodels.duration.hazard_regression import PHReg
+from statsmodels.duration.survfunc import SurvfuncRight, survdiff
+
+from core.stratified import execute_stratified
+from core.survival import execute_survival, fit_cox, kaplan_meier, logrank_test
+
+
+@pytest.fixture
+def cohort():
+    rng = np.random.default_rng(4)
+    n = 300
+    arm = rng.choice(["control", "treated"], n)
+    age = rng.normal(60, 8, n)
+    hazard = 0.05 * np.exp(-0.5 * (arm == "treated") + 0.03 * (age - 60))
+    event_time = rng.exponential(1 / hazard)
+    censor = rng.uniform(0, 40, n)
+    return pd.DataFrame({
+        # Rounded to whole months so there are tied event times
+        "months": np.ceil(np.minimum(event_time, censor)),
+        "died": (event_time <= censor).astype(int),
+        "arm": arm,
+        "age": age,
+        "site": rng.choice(["north", "south"], n)
+    })
+
+
+def test_kaplan_meier_matches_statsmodels(cohort):
+    table = kaplan_meier(cohort["months"], cohort["died"])
+    expected = SurvfuncRight(cohort["months"], cohort["died"])
+    # statsmodels lists event times only; censor-only times leave S(t) flat
+    events = table[table["n_event"] > 0]
+    np.testing.assert_allclose(events["time"], expected.surv_times)
+    np.testing.assert_allclose(events["survival"], expected.surv_prob, rtol=1e-10)
+
+
+def test_logrank_matches_statsmodels(cohort):
+    result = logrank_test(cohort, "months", "died", "arm")
+    stat, p = survdiff(cohort["months"], cohort["died"], cohort["arm"])
+    assert result["statistic"] == pytest.approx(stat, rel=1e-8)
+    assert result["p_value"] == pytest.approx(p, rel=1e-8)
+
+    result = logrank_test(cohort, "months", "died", "arm", strata=["site"])
+    stat, p = survdiff(cohort["months"], cohort["died"], cohort["arm"], strata=cohort["site"])
+    assert result["statistic"] == pytest.approx(stat, rel=1e-8)
+
+
+def test_cox_matches_statsmodels_efron(cohort):
+    fit = fit_cox(cohort, "months", "died", ["arm", "age"])
+    reference = PHReg(
+        cohort["months"], np.column_stack([(cohort["arm"] == "treated").astype(float), cohort["age"]]),
+        status=cohort["died"], ties="efron"
+    ).fit()
+    np.testing.assert_allclose(fit["params"].to_numpy(), reference.params, rtol=1e-6)
+    np.testing.assert_allclose(fit["se"].to_numpy(), reference.bse, rtol=1e-6)
+
+    plan = {
+        "dependent_variable": "months", "independent_variable": "arm", "event": "died",
+        "selected_test": "Cox proportional hazards", "covariates": ["age"]
+    }
+    result = execute_survival(cohort, plan)
+    assert result["effect_size"] == pytest.approx(np.exp(reference.params[0]), rel=1e-6)
+
+
+def test_stratified_hazard_ratios_pool_on_the_log_scale(cohort):
+    plan = {
+        "dependent_variable": "months", "independent_variable": "arm", "event": "died",
+        "selected_test": "Cox proportional hazards", "stratify_by": ["site"]
+    }
+    result = execute_stratified(cohort, plan, max_workers=1)
+
+    # Reference: statsmodels Cox fit per site, pooled by hand on log(HR)
+    y, se = [], []
+    for site in ("north", "south"):
+        subset = cohort[cohort["site"] == site]
+        fit = PHReg(subset["months"], (subset["arm"] == "treated").astype(float).to_frame(),
+                    status=subset["died"], ties="efron").fit()
+        y.append(fit.params[0])
+        se.append(fit.bse[0])
+    y, w = np.array(y), 1 / np.array(se) ** 2
+    pooled = np.sum(w * y) / np.sum(w)
+    q = np.sum(w * (y - pooled) ** 2)
+
+    het = result["heterogeneity"]
+    assert het["q"] == pytest.approx(q, rel=1e-5)
+    assert het["pooled_effect"] == pytest.approx(np.exp(pooled), rel=1e-6)
+    half = stats.norm.isf(0.025) / np.sqrt(np.sum(w))
+    assert het["pooled_ci"] == pytest.approx([np.exp(pooled - half), np.exp(pooled + half)], rel=1e-6)
+
+    # Log-rank HRs take the same route: pooled from log(CI) widths, never the ratio scale
+    logrank = execute_stratified(cohort, dict(plan, selected_test="Log-rank test"), max_workers=1)
+    rows = logrank["strata"]
+    y = np.log([r["effect_size"] for r in rows])
+    se = [np.diff(np.log(r["confidence_interval"]))[0] / (2 * stats.norm.isf(0.025)) for r in rows]
+    w = 1 / np.array(se) ** 2
+    assert logrank["heterogeneity"]["pooled_effect"] == pytest.approx(np.exp(np.sum(w * y) / np.sum(w)), rel=1e-10)
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from core.type_inference import classify, infer_variable_types, ordinal_levels
+
+
+def test_sampled_types_match_full_scan():
+    rng = np.random.default_rng(8)
+    n = 60_000
+    df = pd.DataFrame({
+        "bmi": rng.normal(27, 4, n),
+        "pain_score": rng.integers(0, 11, n),
+        "ward": rng.choice(["A", "B", "C"], n),
+        "severity": rng.choice(["mild", "moderate", "severe"], n),
+        "admitted": pd.date_range("2020-01-01", periods=n, freq="h").strftime("%Y-%m-%d %H:%M"),
+        "sbp": rng.normal(130, 15, n).round(1),
+        "ward_code": rng.integers(1000, 1150, n),
+        # ~90% numeric text, right at the threshold the sample has to decide
+        "lab": np.where(rng.random(n) < 0.9, rng.normal(5, 1, n).round(2).astype(str), "<LOD"),
+    })
+
+    sampled = infer_variable_types(df)
+    full = infer_variable_types(df, sample_size=len(df))
+    assert sampled == full
+    assert full["bmi"] == "continuous"
+    assert full["pain_score"] == "ordinal"
+    assert full["ward"] == "categorical"
+    assert full["severity"] == "ordinal"
+    assert full["admitted"] == "datetime"
+    assert full["sbp"] == "continuous"
+    assert full["ward_code"] == "categorical"
+
+
+def test_ordinal_levels_follow_scale_order():
+    assert ordinal_levels(["severe", "Mild", "moderate"]) == ["Mild", "moderate", "severe"]
+    assert ordinal_levels(["Stage III", "Stage I", "Stage II"]) == ["Stage I", "Stage II", "Stage III"]
+    assert ordinal_levels(["red", "green", "blue"]) is None
+
+
+def test_declared_dtypes_win():
+    assert classify(pd.Series(pd.Categorical(["lo", "hi"], categories=["lo", "hi"], ordered=True)))[0] == "ordinal"
+    assert classify(pd.Series([True, False, True]))[0] == "categorical"
+    assert classify(pd.Series(pd.to_datetime(["2021-01-01", "2021-02-01"])))[0] == "datetime"
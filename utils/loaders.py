@@ -0,0 +1,171 @@
+import io
+import pandas as pd
+
+
+SUPPORTED_FORMATS = ["csv", "xlsx", "arrow"]
+
+# Rows per DataFrame chunk when streaming a worksheet; the first chunk is
+# what the app previews while the rest of the sheet loads
+EXCEL_CHUNK_ROWS = 2000
+
+
+def detect_format(filename=None, content_type=None):
+
+    name = (filename or "").lower()
+    ctype = (content_type or "").lower()
+
+    if name.endswith(".csv") or "csv" in ctype:
+        return "csv"
+
+    # Legacy BIFF workbooks (.xls) are not zip/XML, so openpyxl cannot read them
+    if name.endswith(".xls") or (not name.endswith(".xlsx") and "vnd.ms-excel" in ctype):
+        raise ValueError("Legacy .xls workbooks are not supported; save the file as .xlsx or CSV and upload it again.")
+
+    if name.endswith(".xlsx") or "spreadsheet" in ctype or "excel" in ctype:
+        return "xlsx"
+
+    if name.endswith((".arrow", ".feather", ".ipc")) or "arrow" in ctype:
+        return "arrow"
+
+    raise ValueError(f"Unsupported file format: {filename or content_type}")
+
+
+def read_arrow(data: bytes):
+    import pyarrow as pa
+
+    # Accept both the IPC file format (Feather v2) and the streaming format
+    try:
+        table = pa.ipc.open_file(pa.BufferReader(data)).read_all()
+    except pa.ArrowInvalid:
+        table = pa.ipc.open_stream(pa.BufferReader(data)).read_all()
+
+    return table.to_pandas()
+
+
+# ---------------------------
+# Excel (read-only streaming)
+# ---------------------------
+# openpyxl's default mode builds the whole workbook DOM before returning a
+# single cell. Read-only mode parses the sheet XML as a stream, so memory
+# stays at one chunk of rows and only the chosen sheet is touched.
+
+def open_workbook(data: bytes):
+    import openpyxl
+    return openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+
+
+def excel_sheets(data: bytes):
+    wb = open_workbook(data)
+    try:
+        return wb.sheetnames
+    finally:
+        wb.close()
+
+
+def worksheet(wb, sheet=None):
+    if sheet is None:
+        return wb.worksheets[0]
+    if sheet not in wb.sheetnames:
+        raise ValueError(f"Sheet not found: {sheet} (available: {', '.join(wb.sheetnames)})")
+    return wb[sheet]
+
+
+def header_names(cells):
+    names = []
+    seen = {}
+    for i, cell in enumerate(cells):
+        name = str(cell).strip() if cell is not None and str(cell).strip() else f"Unnamed: {i}"
+        # Same de-duplication as pandas: a, a.1, a.2
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def excel_columns(data: bytes, sheet=None, header_row=0):
+    wb = open_workbook(data)
+    try:
+        ws = worksheet(wb, sheet)
+        for i, row in enumerate(ws.iter_rows(values_only=True)):
+            if i == header_row:
+                return header_names(row)
+        return []
+    finally:
+        wb.close()
+
+
+def iter_excel(data: bytes, sheet=None, header_row=0, columns=None, chunk_rows=EXCEL_CHUNK_ROWS):
+    # Yields DataFrame chunks of the selected columns; rows above the
+    # header and fully empty rows are skipped
+    wb = open_workbook(data)
+    try:
+        ws = worksheet(wb, sheet)
+        header = next(ws.iter_rows(min_row=header_row + 1, max_row=header_row + 1, values_only=True), ())
+
+        names = header_names(header)
+        if columns:
+            missing = [c for c in columns if c not in names]
+            if missing:
+                raise ValueError(f"Columns not found in sheet: {', '.join(missing)}")
+            keep = [names.index(c) for c in columns]
+        else:
+            keep = list(range(len(names)))
+        names = [names[i] for i in keep]
+
+        # Only cells inside the selected column span are materialized
+        first = min(keep, default=0)
+        keep = [i - first for i in keep]
+        rows = ws.iter_rows(
+            min_row=header_row + 2,
+            min_col=first + 1,
+            max_col=first + max(keep, default=0) + 1,
+            values_only=True
+        )
+
+        buffer = []
+        yielded = False
+        for row in rows:
+            values = [row[i] if i < len(row) else None for i in keep]
+            if all(v is None for v in values):
+                continue
+            buffer.append(values)
+            if len(buffer) == chunk_rows:
+                yield pd.DataFrame(buffer, columns=names)
+                buffer = []
+                yielded = True
+
+        if buffer or not yielded:
+            yield pd.DataFrame(buffer, columns=names)
+    finally:
+        wb.close()
+
+
+def read_excel(data: bytes, sheet=None, header_row=0, columns=None, on_chunk=None):
+    chunks = []
+    for chunk in iter_excel(data, sheet, header_row, columns):
+        chunks.append(chunk)
+        if on_chunk is not None:
+            on_chunk(chunks)
+
+    if not chunks:
+        return pd.DataFrame()
+
+    # Chunks infer dtypes separately; one pass settles the mixed ones
+    return pd.concat(chunks, ignore_index=True).infer_objects()
+
+
+def load_dataset(data: bytes, fmt: str, sheet=None, header_row=0, columns=None):
+
+    if fmt == "csv":
+        return pd.read_csv(io.BytesIO(data), header=header_row, usecols=columns or None)
+
+    if fmt == "xlsx":
+        return read_excel(data, sheet, header_row, columns)
+
+    if fmt == "arrow":
+        return read_arrow(data)
+
+    raise ValueError(f"Unsupported file format: {fmt}")